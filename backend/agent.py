@@ -1,19 +1,33 @@
 import os
-import json
-from typing import List, Dict, Any, Optional
+import re
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Annotated
 
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage, AIMessage, trim_messages
-from langchain_core.tools import tool
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, RemoveMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.prebuilt import create_react_agent
+from langgraph.prebuilt.chat_agent_executor import AgentState
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
 
-from llm_factory import get_llm
+import deadlines
+from llm_factory import get_llm, get_summary_llm
 
 # ---------------------------------------------------------------------------
-# LLM
+# History settings
 # ---------------------------------------------------------------------------
-llm = get_llm()
+# "compact" folds old turns into a rolling summary; "trim" just drops them.
+HISTORY_MODE = os.getenv("AGENT_HISTORY_MODE", "compact")
+COMPACT_TRIGGER_TOKENS = int(os.getenv("COMPACT_TRIGGER_TOKENS", "3000"))
+COMPACT_KEEP_TOKENS = int(os.getenv("COMPACT_KEEP_TOKENS", "1200"))
+# "fast" lets a successful update_cv_data call finish the turn with a reply
+# built from the payload; "react" always goes back to the model.
+UPDATE_MODE = os.getenv("AGENT_UPDATE_MODE", "fast")
 
 # ---------------------------------------------------------------------------
 # Pydantic Models
@@ -46,22 +60,127 @@ class EducationEntry(BaseModel):
     endDate: Optional[str] = None
 
 
+# ---------------------------------------------------------------------------
+# Server-side CV state (one per thread, stored in the checkpoint)
+# ---------------------------------------------------------------------------
+
+# List sections are merged entry-by-entry; these fields identify "the same" entry.
+_ENTRY_KEYS: Dict[str, tuple] = {
+    "experience": ("title", "company"),
+    "education": ("degree", "school"),
+    "certifications": ("name",),
+    "languages": ("name",),
+}
+
+
+def _entry_key(section: str, entry: Dict[str, Any]) -> Optional[tuple]:
+    fields = _ENTRY_KEYS.get(section, ())
+    key = tuple(str(entry.get(f) or "").strip().lower() for f in fields)
+    return key if any(key) else None
+
+
+def _merge_entries(section: str, current: List[Dict[str, Any]], delta: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged = [dict(e) for e in current]
+    index = {_entry_key(section, e): i for i, e in enumerate(merged)}
+    for entry in delta:
+        key = _entry_key(section, entry)
+        if key is not None and key in index:
+            merged[index[key]].update({k: v for k, v in entry.items() if v is not None})
+        else:
+            if key is not None:
+                index[key] = len(merged)
+            merged.append(dict(entry))
+    return merged
+
+
+def merge_cv_state(current: Optional[Dict[str, Any]], delta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer for the per-thread CV state.
+    personalInfo is merged field-by-field, list sections entry-by-entry and
+    skills as an ordered, case-insensitive union. Never mutates its inputs.
+    """
+    merged = dict(current or {})
+    for section, value in (delta or {}).items():
+        if value is None:
+            continue
+        if section == "personalInfo":
+            merged[section] = {**merged.get(section, {}), **{k: v for k, v in value.items() if v is not None}}
+        elif section == "skills":
+            seen = {s.strip().lower() for s in merged.get(section, [])}
+            skills = list(merged.get(section, []))
+            for skill in value:
+                if skill.strip().lower() not in seen:
+                    seen.add(skill.strip().lower())
+                    skills.append(skill)
+            merged[section] = skills
+        else:
+            merged[section] = _merge_entries(section, merged.get(section, []), value)
+    return merged
+
+
+class CVAgentState(AgentState):
+    cv: Annotated[Dict[str, Any], merge_cv_state]
+    # Rolling summary of turns folded out of `messages` by compaction.
+    summary: str
+
+
+def _clip(text: Any, limit: int = 40) -> str:
+    text = str(text)
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def summarize_cv(cv: Optional[Dict[str, Any]], max_items: int = 5) -> str:
+    """
+    Compact, size-bounded view of the CV state for the system prompt.
+    The model sees what exists — not the full content — so the prompt stays
+    the same size no matter how much has been collected.
+    """
+    if not cv:
+        return "Nothing collected yet."
+
+    lines: List[str] = []
+    info = cv.get("personalInfo") or {}
+    if info:
+        filled = [k for k, v in info.items() if v]
+        missing = [k for k in PersonalInfo.model_fields if k not in filled]
+        lines.append(f"- Personal Info: filled {', '.join(filled) or 'none'}; missing {', '.join(missing) or 'none'}")
+
+    labels = {
+        "experience": lambda e: f"{e.get('title') or '?'} @ {e.get('company') or '?'}",
+        "education": lambda e: f"{e.get('degree') or '?'} @ {e.get('school') or '?'}",
+        "certifications": lambda e: e.get("name") or "?",
+        "languages": lambda e: e.get("name") or "?",
+        "skills": lambda s: s,
+    }
+    for section, label in labels.items():
+        items = cv.get(section) or []
+        if not items:
+            continue
+        shown = "; ".join(_clip(label(item)) for item in items[:max_items])
+        more = f" (+{len(items) - max_items} more)" if len(items) > max_items else ""
+        lines.append(f"- {section.capitalize()} ({len(items)}): {shown}{more}")
+
+    return "\n".join(lines)
+
+
 # ---------------------------------------------------------------------------
 # Tools
 # ---------------------------------------------------------------------------
 
 @tool
 def update_cv_data(
+    tool_call_id: Annotated[str, InjectedToolCallId],
     personalInfo: Optional[PersonalInfo] = None,
     experience: Optional[List[ExperienceEntry]] = None,
     education: Optional[List[EducationEntry]] = None,
     skills: Optional[List[str]] = None,
     certifications: Optional[List[Dict[str, str]]] = None,
     languages: Optional[List[Dict[str, str]]] = None,
-) -> str:
+) -> Command:
     """
     Updates the CV preview with new information.
     Call this whenever you collect or refine any CV data from the user.
+    Send only the sections/entries that are new or changed — saved data is kept.
     ALL field values must be in English regardless of the conversation language.
     """
     updated_sections: List[str] = []
@@ -87,39 +206,57 @@ def update_cv_data(
         payload["languages"] = languages
 
     if not updated_sections:
-        return "No data provided — nothing was updated."
-
-    return f"CV_UPDATE:{json.dumps(payload)} | Updated sections: {', '.join(updated_sections)}."
-
-
-@tool
-def merge_pdfs_tool(file_names: List[str]) -> str:
+        return Command(update={"messages": [ToolMessage(
+            content="No data provided — nothing was updated.",
+            tool_call_id=tool_call_id,
+        )]})
+
+    # The model only sees the short confirmation; the payload travels as an
+    # artifact and is merged into the thread's CV state by the reducer.
+    return Command(update={
+        "cv": payload,
+        "messages": [ToolMessage(
+            content=f"Updated sections: {', '.join(updated_sections)}.",
+            artifact={"cv_update": payload},
+            tool_call_id=tool_call_id,
+        )],
+    })
+
+
+@tool(response_format="content_and_artifact")
+def merge_pdfs_tool(file_names: List[str]) -> tuple:
     """
     Merges multiple uploaded PDF files into one combined PDF.
     Input: list of file names that the user has already uploaded.
     """
     if not file_names or len(file_names) < 2:
-        return "Error: please provide at least 2 PDF files to merge."
+        return "Error: please provide at least 2 PDF files to merge.", None
     try:
         output_name = "merged_output.pdf"
-        return f"Successfully merged {len(file_names)} files into '{output_name}'. DOWNLOAD_PATH:/downloads/{output_name}"
+        return (
+            f"Successfully merged {len(file_names)} files into '{output_name}'.",
+            {"download": f"/downloads/{output_name}"},
+        )
     except Exception as exc:
-        return f"Error merging PDFs: {exc}"
+        return f"Error merging PDFs: {exc}", None
 
 
-@tool
-def convert_pdf_to_docx(file_name: str) -> str:
+@tool(response_format="content_and_artifact")
+def convert_pdf_to_docx(file_name: str) -> tuple:
     """
     Converts an uploaded PDF file to a DOCX file.
     Input: name of the already-uploaded PDF file.
     """
     if not file_name or not file_name.lower().endswith(".pdf"):
-        return "Error: please provide a valid .pdf file name."
+        return "Error: please provide a valid .pdf file name.", None
     try:
         output_name = file_name[:-4] + ".docx"
-        return f"Converted '{file_name}' to '{output_name}'. DOWNLOAD_PATH:/downloads/{output_name}"
+        return (
+            f"Converted '{file_name}' to '{output_name}'.",
+            {"download": f"/downloads/{output_name}"},
+        )
     except Exception as exc:
-        return f"Error converting to DOCX: {exc}"
+        return f"Error converting to DOCX: {exc}", None
 
 
 TOOLS = [update_cv_data, merge_pdfs_tool, convert_pdf_to_docx]
@@ -127,10 +264,22 @@ TOOLS = [update_cv_data, merge_pdfs_tool, convert_pdf_to_docx]
 # ---------------------------------------------------------------------------
 # System prompt
 # ---------------------------------------------------------------------------
+# The order CV Buddy collects sections in. "summary" lives in personalInfo.
+COLLECTION_ORDER = ["personalInfo", "summary", "experience", "education", "skills", "certifications", "languages"]
+SECTION_LABELS = {
+    "personalInfo": "personal info",
+    "summary": "summary",
+    "experience": "experience",
+    "education": "education",
+    "skills": "skills",
+    "certifications": "certifications",
+    "languages": "languages",
+}
+
 SYSTEM_PROMPT = """You are 'CV Buddy', an expert AI career assistant that builds professional CVs through conversation.
 
 RULES:
-1. COLLECT one section at a time: personal info → summary → experience → education → skills → certifications → languages.
+1. COLLECT one section at a time: """ + " → ".join(SECTION_LABELS[s] for s in COLLECTION_ORDER) + """.
 2. RESPOND in the user's language (English, Urdu, Pashto, Arabic, etc.).
 3. ALL data passed to `update_cv_data` tool MUST be in English — translate if needed.
 4. Call `update_cv_data` IMMEDIATELY whenever you have new or refined CV data. Do NOT wait.
@@ -145,8 +294,254 @@ CRITICAL FORMATTING RULES FOR TOOL CALLS:
 - **Certifications**: MUST be a LIST of objects with name, issuer, and optional date. Example: [{"name": "AWS Solutions Architect", "issuer": "Amazon", "date": "2023"}]
 - **Experience & Education**: MUST be LISTS of objects with all required fields.
 - NEVER pass comma-separated strings as skills, languages, certifications, experience, or education. Always convert to proper LIST format.
+- The CV is saved on the server as you go. Only send NEW or CHANGED entries — existing entries with the same title/company, degree/school or name are updated in place.
 """
 
+
+def _compact_tool_calls(messages: list) -> list:
+    """
+    Drops the arguments of earlier `update_cv_data` calls. Their content already
+    lives in the CV state, so re-sending it would grow the prompt every update.
+    """
+    compacted = []
+    for msg in messages:
+        if isinstance(msg, AIMessage) and any(tc["name"] == "update_cv_data" for tc in msg.tool_calls):
+            tool_calls = [
+                {**tc, "args": {}} if tc["name"] == "update_cv_data" else tc
+                for tc in msg.tool_calls
+            ]
+            additional_kwargs = {k: v for k, v in msg.additional_kwargs.items() if k != "tool_calls"}
+            msg = msg.model_copy(update={"tool_calls": tool_calls, "additional_kwargs": additional_kwargs})
+        compacted.append(msg)
+    return compacted
+
+
+def _build_prompt(state: CVAgentState) -> list:
+    """System prompt + compact CV state summary + history with compacted tool calls."""
+    system = f"{SYSTEM_PROMPT}\nCURRENT CV STATE (saved):\n{summarize_cv(state.get('cv'))}\n"
+    if state.get("summary"):
+        system += f"\nEARLIER CONVERSATION (summary):\n{state['summary']}\n"
+    return [SystemMessage(content=system)] + _compact_tool_calls(list(state["messages"]))
+
+# ---------------------------------------------------------------------------
+# Fast path — answer a plain CV update without a second model call
+# ---------------------------------------------------------------------------
+REQUIRED_PERSONAL_FIELDS = ["firstName", "lastName", "jobTitle", "email", "phone"]
+FIELD_LABELS = {
+    "firstName": "first name", "lastName": "last name", "jobTitle": "job title",
+    "email": "email", "phone": "phone number", "address": "address",
+    "linkedin": "LinkedIn", "github": "GitHub",
+}
+NEXT_QUESTIONS = {
+    "personalInfo": "Let's start with your details: your full name, job title, email and phone number?",
+    "summary": "Next, your professional summary. In a sentence or two, what do you do and what are you looking for?",
+    "experience": "Now your work experience. What's your most recent role, the company, and the dates?",
+    "education": "Next, education. What's your highest degree, the school, and the years?",
+    "skills": "What are your key skills? A comma-separated list is fine.",
+    "certifications": "Any certifications? Share the name, issuer and year, or say skip.",
+    "languages": "Which languages do you speak, and at what level?",
+}
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def _missing_personal_fields(cv: Dict[str, Any]) -> List[str]:
+    info = cv.get("personalInfo") or {}
+    return [f for f in REQUIRED_PERSONAL_FIELDS if not info.get(f)]
+
+
+def _section_done(cv: Dict[str, Any], section: str) -> bool:
+    if section == "personalInfo":
+        return not _missing_personal_fields(cv)
+    if section == "summary":
+        return bool((cv.get("personalInfo") or {}).get("summary"))
+    return bool(cv.get(section))
+
+
+def _updated_sections(payload: Dict[str, Any]) -> List[str]:
+    """Payload keys mapped onto COLLECTION_ORDER (a summary arrives inside personalInfo)."""
+    sections = []
+    info = payload.get("personalInfo") or {}
+    if any(k != "summary" for k in info):
+        sections.append("personalInfo")
+    if info.get("summary"):
+        sections.append("summary")
+    sections += [s for s in COLLECTION_ORDER[2:] if payload.get(s)]
+    return sections
+
+
+def next_question(cv: Dict[str, Any], updated: List[str]) -> str:
+    """
+    What to ask next: missing details of a section just touched, else the first
+    unfinished section after the furthest one updated, else an earlier gap.
+    """
+    if "personalInfo" in updated and _missing_personal_fields(cv):
+        missing = [FIELD_LABELS[f] for f in _missing_personal_fields(cv)]
+        return f"Could you also share your {_join(missing)}?"
+
+    furthest = max((COLLECTION_ORDER.index(s) for s in updated), default=-1)
+    for section in COLLECTION_ORDER[furthest + 1:]:
+        if not _section_done(cv, section):
+            return NEXT_QUESTIONS[section]
+
+    earlier = [SECTION_LABELS[s] for s in COLLECTION_ORDER[:furthest + 1] if not _section_done(cv, s)]
+    if earlier:
+        return f"That covers the rest. Want to go back and add your {_join(earlier)}, or is your CV ready?"
+    return "That covers every section. Is there anything you'd like to refine?"
+
+
+def describe_update(payload: Dict[str, Any]) -> str:
+    """One line naming what an update_cv_data payload saved."""
+    parts: List[str] = []
+    info = payload.get("personalInfo") or {}
+    fields = [FIELD_LABELS.get(k, k) for k in info if k != "summary"]
+    if fields:
+        parts.append(f"your {_join(fields)}")
+    if info.get("summary"):
+        parts.append("your professional summary")
+    for section, label in (
+        ("experience", lambda e: f"{e.get('title') or '?'} @ {e.get('company') or '?'}"),
+        ("education", lambda e: f"{e.get('degree') or '?'} @ {e.get('school') or '?'}"),
+        ("certifications", lambda e: e.get("name") or "?"),
+        ("languages", lambda e: e.get("name") or "?"),
+    ):
+        entries = payload.get(section) or []
+        if entries:
+            shown = "; ".join(_clip(label(e)) for e in entries[:3])
+            more = f" (+{len(entries) - 3} more)" if len(entries) > 3 else ""
+            parts.append(f"{SECTION_LABELS[section]} ({shown}{more})")
+    if payload.get("skills"):
+        count = len(payload["skills"])
+        parts.append(f"{count} skill{'s' if count != 1 else ''}")
+    return f"✅ Saved {_join(parts)}."
+
+
+def _needs_reasoning(text: Any) -> bool:
+    """
+    True when the user's message asks for more than recording data: a
+    question, or a non-Latin script the reply has to be written in.
+    """
+    if not isinstance(text, str) or "?" in text or "؟" in text:
+        return True
+    letters = [c for c in text if c.isalpha()]
+    non_latin = sum(1 for c in letters if not c.isascii())
+    return bool(letters) and non_latin / len(letters) > 0.1
+
+
+# Everyday English, including what people say when giving CV details. A
+# message whose own words (not the names, titles and skills it saves) are
+# mostly from here is taken to be English; anything else gets a model reply.
+_ENGLISH_WORDS = frozenset("""
+a about above after again ago all almost also always am an and another any anything are around as at
+back based be because been before being below best between both but by can can't could currently
+did didn't do does doing don't done down during each early either else even ever every few first
+for from full get go going good got had has have having he her here hers him his how i i'd i'll
+i'm i've if in into is it it's its just last late later less like little live lived living lot
+made make many may me mine more most much must my myself near need never new next no none nor not
+now of off ok okay old on once one only or other our out over own part past per please put rather
+really same she should since so some still such sure than thanks thank that that's the their them
+then there these they this those through till to too two under until up us very was we well were
+what when where which while who whom why will with within without would yes yet you your yours
+hi hello hey add added adding change changed put remove removed replace save saved set update
+updated use used using worked work working works job jobs role roles position positions company
+companies employer team teams project projects led lead leading managed manage managing built
+build building developed develop developing designed design responsible handled helped improved
+improve years year months month weeks week days full-time part-time freelance intern internship
+contract remote office present current currently previously recently studied study studying
+graduated graduate degree degrees university college school course courses major minor bachelor
+bachelors master masters diploma certificate certified certification certifications license
+skills skill know knows known speak speaks spoke language languages native fluent fluently
+basic intermediate advanced proficient beginner expert experience experienced name named called
+surname email phone number address city country title summary profile about myself hobbies
+january february march april may june july august september october november december
+""".split())
+
+# Common Roman Urdu / Hindi words; one of them means the user isn't writing English.
+_ROMAN_URDU_HINDI = frozenset("""
+hai hain hoon hun tha thi the mera meri mere mujhe mujh naam aur kya nahi nahin mein ka ki ke ko se
+bhi kaam saal yeh ye woh wo aap ap hum tum apna apni apne kar karta karti karna kiya liye wala wali
+""".split()) - _ENGLISH_WORDS
+
+# Share of a message's own words that must be common English.
+FAST_PATH_ENGLISH_RATIO = 0.6
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _data_words(value: Any) -> set:
+    """Every word in CV values (names, titles, skills), which can be in any language."""
+    if isinstance(value, str):
+        return set(_words(value))
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return set().union(*(_data_words(v) for v in value))
+    return set()
+
+
+def _writes_english(humans: List[HumanMessage], data: set) -> bool:
+    """
+    True when the user is clearly writing English, judged from the latest
+    message with words of its own besides the CV `data` words (a message of
+    bare data decides nothing). Latin-script Spanish, Roman Urdu and the
+    like are not: the reply has to be in their language, so it is the
+    model's to write.
+    """
+    for human in reversed(humans):
+        if not isinstance(human.content, str):
+            return False
+        prose = [w for w in _words(human.content) if w not in data]
+        if not prose:
+            continue
+        if any(w in _ROMAN_URDU_HINDI for w in prose):
+            return False
+        common = sum(1 for w in prose if w in _ENGLISH_WORDS)
+        return common / len(prose) >= FAST_PATH_ENGLISH_RATIO
+    return False
+
+
+def fast_path_reply(state: Dict[str, Any]) -> Optional[AIMessage]:
+    """
+    The turn's closing message when the model's last step was nothing but
+    successful update_cv_data calls and the user, writing in English, asked
+    for nothing more. None means: ask the model.
+    """
+    messages = state.get("messages") or []
+    i = len(messages)
+    while i > 0 and isinstance(messages[i - 1], ToolMessage):
+        i -= 1
+    results = messages[i:]
+    if not results or i == 0:
+        return None
+
+    call = messages[i - 1]
+    if not isinstance(call, AIMessage) or len(call.tool_calls) != len(results):
+        return None
+    if any(tc["name"] != "update_cv_data" for tc in call.tool_calls):
+        return None
+    if any(r.status == "error" or not isinstance(r.artifact, dict) or not r.artifact.get("cv_update")
+           for r in results):
+        return None
+
+    humans = [m for m in messages[:i - 1] if isinstance(m, HumanMessage)]
+    if not humans or _needs_reasoning(humans[-1].content):
+        return None
+
+    payload: Dict[str, Any] = {}
+    for r in results:
+        payload = merge_cv_state(payload, r.artifact["cv_update"])
+    cv = state.get("cv") or {}
+    if not _writes_english(humans, _data_words(payload) | _data_words(cv)):
+        return None
+    return AIMessage(content=f"{describe_update(payload)}\n\n{next_question(cv, _updated_sections(payload))}")
+
+
 # ---------------------------------------------------------------------------
 # Checkpointer — singleton, opened once at startup
 # ---------------------------------------------------------------------------
@@ -168,23 +563,141 @@ async def close_checkpointer() -> None:
     print("✅ Conversation checkpointer closed")
 
 
+# ---------------------------------------------------------------------------
+# Per-thread lock — one writer per thread's checkpoint at a time
+# ---------------------------------------------------------------------------
+@dataclass
+class _ThreadLock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+
+
+_thread_locks: Dict[str, _ThreadLock] = {}
+
+
+@asynccontextmanager
+async def thread_lock(thread_id: str):
+    """
+    Held by everything that reads a thread's state and writes it back: a
+    chat turn, a CV seed, the compaction write. Without it a write made
+    from a stale read (and the pruning after it) can drop another's changes.
+    An entry lives only while someone holds or waits for it.
+    """
+    entry = _thread_locks.setdefault(thread_id, _ThreadLock())
+    entry.users += 1
+    try:
+        async with entry.lock:
+            yield
+    finally:
+        entry.users -= 1
+        if entry.users == 0 and _thread_locks.get(thread_id) is entry:
+            del _thread_locks[thread_id]
+
+
+# "latest" keeps only each thread's newest checkpoint; "all" keeps every graph step.
+CHECKPOINT_HISTORY = os.getenv("AGENT_CHECKPOINT_HISTORY", "latest")
+
+
+def prune_checkpoints(thread_id: str) -> int:
+    """
+    Drops a thread's superseded checkpoints, with their channel blobs and
+    pending writes, from the in-memory saver. Only the latest state is ever
+    read back, but MemorySaver keeps one checkpoint per graph step of every
+    turn. Returns the number of checkpoints removed.
+
+    Call it holding thread_lock(thread_id): a turn running unlocked may still
+    need the blobs this drops. Without the lock held it does nothing.
+    """
+    saver = _checkpointer
+    if CHECKPOINT_HISTORY != "latest" or not isinstance(saver, MemorySaver):
+        return 0
+    entry = _thread_locks.get(thread_id)
+    if entry is None or not entry.lock.locked():
+        return 0
+    latest = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+    if latest is None:
+        return 0
+    keep_ns = latest.config["configurable"].get("checkpoint_ns", "")
+    keep_id = latest.config["configurable"]["checkpoint_id"]
+    versions = latest.checkpoint["channel_versions"]
+
+    removed = 0
+    for ns, checkpoints in saver.storage.get(thread_id, {}).items():
+        for checkpoint_id in [c for c in checkpoints if (ns, c) != (keep_ns, keep_id)]:
+            del checkpoints[checkpoint_id]
+            removed += 1
+    for key in [k for k in saver.writes if k[0] == thread_id and k[1:] != (keep_ns, keep_id)]:
+        del saver.writes[key]
+    for key in [k for k in saver.blobs if k[0] == thread_id and (k[1] != keep_ns or versions.get(k[2]) != k[3])]:
+        del saver.blobs[key]
+    return removed
+
+
+def checkpoint_stats(top: int = 10) -> dict:
+    """
+    Serialized bytes the in-memory saver holds (checkpoints, channel blobs,
+    pending writes), in total and for the `top` largest threads.
+    """
+    saver = _checkpointer
+    if not isinstance(saver, MemorySaver):
+        return {"threads": 0, "checkpoints": 0, "bytes": 0, "largest": []}
+
+    sizes: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    for thread_id, namespaces in list(saver.storage.items()):
+        for checkpoints in list(namespaces.values()):
+            for checkpoint, metadata, _ in list(checkpoints.values()):
+                sizes[thread_id] = sizes.get(thread_id, 0) + len(checkpoint[1]) + len(metadata[1])
+                counts[thread_id] = counts.get(thread_id, 0) + 1
+    for (thread_id, *_), (_, blob) in list(saver.blobs.items()):
+        sizes[thread_id] = sizes.get(thread_id, 0) + len(blob)
+    for (thread_id, *_), writes in list(saver.writes.items()):
+        sizes[thread_id] = sizes.get(thread_id, 0) + sum(len(value[1]) for _, _, value, _ in writes.values())
+
+    largest = sorted(sizes, key=sizes.get, reverse=True)[:top]
+    return {
+        "threads": len(sizes),
+        "checkpoints": sum(counts.values()),
+        "bytes": sum(sizes.values()),
+        "largest": [
+            {"thread_id": t, "checkpoints": counts.get(t, 0), "bytes": sizes[t]} for t in largest
+        ],
+    }
+
+
 # ---------------------------------------------------------------------------
 # Agent — built lazily, cached after first use
 # ---------------------------------------------------------------------------
 _agent = None
 
 
+def _fast_path_model(tool_model):
+    """
+    create_react_agent "dynamic model": picked per model step — a fixed
+    reply when the fast path applies, otherwise the tool-bound chain.
+    """
+    def select(state, runtime):
+        reply = fast_path_reply(state)
+        return RunnableLambda(lambda _: reply) if reply is not None else tool_model
+    return select
+
+
 def _build_agent():
     if _checkpointer is None:
         raise RuntimeError(
             "Checkpointer is not initialised. "
             "Call `await init_checkpointer()` at application startup."
         )
+    model = get_llm()
+    if UPDATE_MODE == "fast":
+        model = _fast_path_model(model.bind_tools(TOOLS))
+
     # LangGraph 1.0.x: use prompt= for system prompt.
     return create_react_agent(
-        llm,
+        model,
         TOOLS,
-        prompt=SYSTEM_PROMPT,
+        prompt=_build_prompt,
+        state_schema=CVAgentState,
         checkpointer=_checkpointer,
     )
 
@@ -196,19 +709,25 @@ def _get_agent():
     return _agent
 
 
+def warm_up() -> None:
+    """Builds the shared LLM and the agent graph ahead of the first request."""
+    _get_agent()
+
+
 # ---------------------------------------------------------------------------
 # Context trimming helper
 # ---------------------------------------------------------------------------
 def _trim(messages: list, max_tokens: int = 6000) -> list:
     """
     Trims message history to keep context window manageable.
+    Uses a local approximate counter — no tokenizer download, no LLM needed.
     """
     try:
         return trim_messages(
             messages,
             max_tokens=max_tokens,
             strategy="last",
-            token_counter=llm,
+            token_counter=count_tokens_approximately,
             include_system=True,
             allow_partial=False,
             start_on="human",
@@ -218,6 +737,107 @@ def _trim(messages: list, max_tokens: int = 6000) -> list:
         return messages
 
 
+# ---------------------------------------------------------------------------
+# Compaction — fold old turns into a rolling summary (runs after the reply)
+# ---------------------------------------------------------------------------
+SUMMARY_PROMPT = """You maintain the running memory of a CV-building chat between a user and 'CV Buddy'.
+Merge the PREVIOUS SUMMARY with the NEW TURNS into one updated summary.
+Keep every fact the user gave (names, dates, employers, schools, achievements, preferences,
+conversation language) and which CV sections are done or still pending.
+Drop greetings and filler. Write in English, as terse bullet points, under 200 words."""
+
+# Threads with a compaction already in flight in this worker.
+_compacting: set = set()
+
+
+def _split_for_compaction(messages: list, keep_tokens: int) -> tuple:
+    """
+    Splits history into (folded, kept). `kept` is the most recent suffix that
+    fits in `keep_tokens` and starts on a user turn, so tool calls are never
+    separated from their results.
+    """
+    kept = trim_messages(
+        messages,
+        max_tokens=keep_tokens,
+        strategy="last",
+        token_counter=count_tokens_approximately,
+        allow_partial=False,
+        start_on="human",
+    )
+    return messages[: len(messages) - len(kept)], kept
+
+
+def _transcript(messages: list) -> str:
+    lines = []
+    for msg in messages:
+        content = msg.content if isinstance(msg.content, str) else str(msg.content)
+        if isinstance(msg, HumanMessage):
+            lines.append(f"User: {content}")
+        elif isinstance(msg, AIMessage):
+            if content:
+                lines.append(f"Assistant: {content}")
+            for tc in msg.tool_calls:
+                lines.append(f"Assistant called {tc['name']}")
+        elif isinstance(msg, ToolMessage):
+            lines.append(f"Tool result: {content}")
+    return "\n".join(lines)
+
+
+async def _summarize(previous: str, messages: list) -> str:
+    result = await get_summary_llm().ainvoke([
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"PREVIOUS SUMMARY:\n{previous or 'None'}\n\nNEW TURNS:\n{_transcript(messages)}"),
+    ])
+    return result.content.strip()
+
+
+async def compact_thread(thread_id: str) -> bool:
+    """
+    Folds older turns of a thread into its rolling summary once the history
+    exceeds COMPACT_TRIGGER_TOKENS. Meant to run as a background task after
+    the reply has been sent. Returns True if the thread was compacted.
+    """
+    if HISTORY_MODE != "compact" or thread_id in _compacting:
+        return False
+
+    _compacting.add(thread_id)
+    try:
+        # Runs after the reply was sent; the request's deadline doesn't apply.
+        with deadlines.detached():
+            agent = _get_agent()
+            config = {"configurable": {"thread_id": thread_id}}
+            async with thread_lock(thread_id):
+                snapshot = await agent.aget_state(config)
+            values = snapshot.values or {}
+            messages = values.get("messages", [])
+
+            if count_tokens_approximately(messages) <= COMPACT_TRIGGER_TOKENS:
+                return False
+
+            folded, _ = _split_for_compaction(messages, COMPACT_KEEP_TOKENS)
+            if not folded:
+                return False
+
+            # The summary call runs unlocked, so turns aren't held up by it;
+            # the write then lands on the latest state, whatever ran meanwhile.
+            summary = await _summarize(values.get("summary", ""), folded)
+            async with thread_lock(thread_id):
+                current = (await agent.aget_state(config)).values or {}
+                present = {m.id for m in current.get("messages", [])}
+                # Remove by id (not wholesale) so turns added meanwhile are kept.
+                await agent.aupdate_state(config, {
+                    "summary": summary,
+                    "messages": [RemoveMessage(id=m.id) for m in folded if m.id in present],
+                })
+                prune_checkpoints(thread_id)
+            return True
+    except Exception as exc:
+        print(f"COMPACTION ERROR (thread={thread_id}): {exc}")
+        return False
+    finally:
+        _compacting.discard(thread_id)
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -243,66 +863,91 @@ async def get_agent_response(
     agent = _get_agent()
     config = {"configurable": {"thread_id": thread_id}}
 
-    try:
-        # 1) Load existing history for the thread
-        state_history = await agent.aget_state(config)
-        messages = state_history.values.get("messages", []) if state_history.values else []
+    # Read, trim, invoke and prune as one step; see thread_lock.
+    async with thread_lock(thread_id):
+        try:
+            # 1) Load existing history for the thread
+            state_history = await agent.aget_state(config)
+            messages = state_history.values.get("messages", []) if state_history.values else []
+
+            # 2) Trim history (prevents unbounded growth / slowness over time).
+            # In "compact" mode this is only a safety ceiling; compact_thread()
+            # normally keeps the thread well below it.
+            trimmed_history = _trim(messages, max_tokens=6000)
+            dropped = messages[: len(messages) - len(trimmed_history)]
+
+            # 3) ✅ Persist trimmed history back into the checkpoint state.
+            # `messages` merges by id, so dropped messages must be removed explicitly.
+            try:
+                if dropped:
+                    await agent.aupdate_state(config, {"messages": [RemoveMessage(id=m.id) for m in dropped]})
+            except Exception:
+                # If aupdate_state isn't supported, continue without failing.
+                # (Long-term performance may still degrade on very long threads.)
+                pass
 
-        # 2) Trim history (prevents unbounded growth / slowness over time)
-        trimmed_history = _trim(messages, max_tokens=6000)
+            # 4) Invoke with ONLY the new user message
+            state = await agent.ainvoke(
+                {"messages": [HumanMessage(content=user_message)]},
+                config=config,
+            )
 
-        # 3) ✅ Persist trimmed history back into the checkpoint state (best fix)
-        # Note: availability depends on LangGraph version.
-        try:
-            await agent.aupdate_state(config, {"messages": trimmed_history})
-        except Exception:
-            # If aupdate_state isn't supported, continue without failing.
-            # (Long-term performance may still degrade on very long threads.)
-            pass
-
-        # 4) Invoke with ONLY the new user message
-        state = await agent.ainvoke(
-            {"messages": [HumanMessage(content=user_message)]},
-            config=config,
-        )
+        except deadlines.DeadlineExceeded:
+            # Left for the app's handler (504), not reported as a failure.
+            raise
+        except Exception as exc:
+            raise RuntimeError(f"Agent invocation failed (thread={thread_id}): {exc}") from exc
 
-    except Exception as exc:
-        raise RuntimeError(f"Agent invocation failed (thread={thread_id}): {exc}") from exc
+        prune_checkpoints(thread_id)
 
     # Extract the last AI text reply
     ai_messages = [m for m in state["messages"] if isinstance(m, AIMessage)]
     reply_text: str = ai_messages[-1].content if ai_messages else ""
 
-    # Parse CV update and download path from ONLY the last 10 messages
-    # (tool outputs from the current turn, not the entire history)
-    cv_update: Optional[Dict] = None
-    download_path: Optional[str] = None
-
-    recent_messages = state["messages"][-10:]
-    for msg in reversed(recent_messages):
-        content = getattr(msg, "content", "")
-        if not isinstance(content, str):
-            continue
-
-        if "CV_UPDATE:" in content and cv_update is None:
-            try:
-                json_part = content.split("CV_UPDATE:")[1].split(" | ")[0].strip()
-                cv_update = json.loads(json_part)
-            except (IndexError, json.JSONDecodeError):
-                pass
-
-        if "DOWNLOAD_PATH:" in content and download_path is None:
-            try:
-                download_path = content.split("DOWNLOAD_PATH:")[1].split()[0].strip()
-            except IndexError:
-                pass
-
-        # Stop early once both are found
-        if cv_update is not None and download_path is not None:
-            break
+    cv_update, download_path = _collect_turn_artifacts(state["messages"], state.get("cv"))
 
     return {
         "reply": reply_text,
         "cv_update": cv_update,
         "download": download_path,
     }
+
+
+async def seed_cv(thread_id: str, cv: Dict[str, Any]) -> None:
+    """
+    Merges CV data obtained outside the chat (e.g. an imported file) into a
+    thread's CV state, so the agent continues from it instead of re-asking.
+    """
+    agent = _get_agent()
+    config = {"configurable": {"thread_id": thread_id}}
+    # Recorded as if the tools node wrote it, like an update_cv_data call; the
+    # next user message starts a fresh run from there.
+    async with thread_lock(thread_id):
+        await agent.aupdate_state(config, {"cv": cv}, as_node="tools")
+        prune_checkpoints(thread_id)
+
+
+def _collect_turn_artifacts(messages: list, cv: Optional[Dict[str, Any]]) -> tuple:
+    """
+    Reads tool artifacts produced since the last user message.
+    Returns (cv_update, download_path); cv_update holds the merged server-side
+    value of every section touched this turn, ready for the frontend store.
+    """
+    turn_start = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            turn_start = i
+            break
+
+    touched: List[str] = []
+    download_path: Optional[str] = None
+    for msg in messages[turn_start:]:
+        if not isinstance(msg, ToolMessage) or not isinstance(msg.artifact, dict):
+            continue
+        for section in msg.artifact.get("cv_update") or {}:
+            if section not in touched:
+                touched.append(section)
+        download_path = msg.artifact.get("download") or download_path
+
+    cv_update = {section: (cv or {})[section] for section in touched if section in (cv or {})} or None
+    return cv_update, download_path
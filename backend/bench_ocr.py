@@ -0,0 +1,150 @@
+"""
+OCR preprocessing benchmark: time and character accuracy, raw vs preprocessed.
+
+A fixture set is a directory of images, each with a `<name>.txt` file holding
+the expected text. Generate a synthetic phone-photo-like set with:
+
+    python bench_ocr.py --generate fixtures/ocr
+
+then run:
+
+    python bench_ocr.py fixtures/ocr [--engine auto] [--preprocess '{"deskew": false}']
+
+"raw" disables preprocessing; "preprocessed" uses --preprocess if given,
+otherwise each engine's own preprocessing.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from typing import Optional
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from image_preprocessing import PreprocessOptions
+from ocr_service import ENGINES, ENGINE_ALIASES, extract_text_from_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp")
+
+SAMPLE_LINES = [
+    "INVOICE No. INV-2024-0187",
+    "Date: 14 March 2024",
+    "Bill To: Acme Trading Company",
+    "42 Harbour Road, Karachi",
+    "Description          Qty   Amount",
+    "Consulting services    12   1,440.00",
+    "Software licence        1     299.00",
+    "Support (monthly)       3     150.00",
+    "Subtotal                    1,889.00",
+    "Tax 17%                       321.13",
+    "Total Due                   2,210.13",
+    "Payment within 30 days. Thank you!",
+]
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def char_accuracy(expected: str, actual: str) -> float:
+    expected, actual = normalize(expected), normalize(actual)
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return max(0.0, 1 - edit_distance(expected, actual) / len(expected))
+
+
+def generate_fixtures(directory: str, count: int = 6, seed: int = 7) -> None:
+    """Renders text pages, then skews, darkens, blurs and upsizes them to ~12 MP."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    font = ImageFont.load_default(size=40)
+    for n in range(count):
+        lines = rng.sample(SAMPLE_LINES, k=8)
+        page = Image.new("L", (1700, 2200), 255)
+        draw = ImageDraw.Draw(page)
+        for i, line in enumerate(lines):
+            draw.text((180, 300 + i * 90), line, fill=0, font=font)
+
+        background = rng.randint(120, 170)
+        photo = page.rotate(rng.uniform(-6, 6), resample=Image.BICUBIC, expand=True, fillcolor=255)
+        photo = photo.point(lambda p: int(background + (p / 255) * (235 - background)))
+        photo = photo.filter(ImageFilter.GaussianBlur(1.2)).resize((3024, 4032), Image.BICUBIC)
+
+        name = os.path.join(directory, f"page_{n:02d}")
+        photo.convert("RGB").save(name + ".jpg", quality=85)
+        with open(name + ".txt", "w") as f:
+            f.write("\n".join(lines))
+    print(f"Wrote {count} fixtures to {directory}")
+
+
+def load_fixtures(directory: str):
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        truth = os.path.join(directory, stem + ".txt")
+        if ext.lower() in IMAGE_EXTENSIONS and os.path.exists(truth):
+            with open(os.path.join(directory, name), "rb") as f, open(truth) as t:
+                yield name, f.read(), t.read()
+
+
+def engine_available(engine: str) -> bool:
+    engine = ENGINE_ALIASES.get(engine, engine)
+    if engine == "auto":
+        return any(e.available() for e in ENGINES.values() if "image" in e.inputs)
+    return engine in ENGINES and ENGINES[engine].available()
+
+
+def run(directory: str, options: Optional[PreprocessOptions], engine: str = "auto") -> None:
+    if not engine_available(engine):
+        print(f"OCR engine '{engine}' is not available — install tesseract-ocr and/or tesserocr.")
+        return
+
+    configs = {"raw": PreprocessOptions.disabled(), "preprocessed": options}
+    totals = {label: {"time": 0.0, "accuracy": 0.0} for label in configs}
+    count = 0
+
+    print(f"{'file':<20} {'config':<13} {'time (s)':>9} {'accuracy':>9}")
+    for name, image_bytes, expected in load_fixtures(directory):
+        count += 1
+        for label, config in configs.items():
+            start = time.perf_counter()
+            text = extract_text_from_image(image_bytes, engine, config)
+            elapsed = time.perf_counter() - start
+            accuracy = char_accuracy(expected, text)
+            totals[label]["time"] += elapsed
+            totals[label]["accuracy"] += accuracy
+            print(f"{name:<20} {label:<13} {elapsed:>9.2f} {accuracy:>8.1%}")
+
+    if not count:
+        print(f"No fixtures found in {directory} (need image + .txt pairs).")
+        return
+
+    print()
+    for label, total in totals.items():
+        print(f"{label:<13} mean time {total['time'] / count:6.2f} s   "
+              f"mean accuracy {total['accuracy'] / count:6.1%}   (n={count})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default="fixtures/ocr")
+    parser.add_argument("--generate", action="store_true", help="write a synthetic fixture set and exit")
+    parser.add_argument("--preprocess", default=None, help='"default", "fast" or a JSON object of options')
+    parser.add_argument("--engine", default="tesseract-accurate", help="auto, tesseract-fast or tesseract-accurate")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_fixtures(args.directory)
+        sys.exit(0)
+    options = PreprocessOptions.from_spec(args.preprocess) if args.preprocess else None
+    run(args.directory, options, args.engine)
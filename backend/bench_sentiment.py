@@ -0,0 +1,111 @@
+"""
+Sentiment cascade benchmark: how many texts the local classifier answers on
+its own, how often those answers agree with the labels (and with the LLM),
+and the latency the cascade saves over sending everything to the LLM.
+
+A fixture set is a JSONL file of {"text": ..., "label": "Positive" | "Neutral" | "Negative"}:
+
+    python bench_sentiment.py [fixtures/sentiment.jsonl] [--threshold 0.4] [--llm] [--llm-latency-ms 800]
+
+Without --llm, LLM latency is the --llm-latency-ms estimate and escalated
+texts are assumed to be answered correctly, so the cascade accuracy is an
+upper bound. With --llm (needs an API key) every text also goes to the LLM
+chain, and its latency and agreement are measured.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import sentiment
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sentiment.jsonl")
+
+
+def load_fixtures(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_local(text: str, repeat: int = 200) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        score = sentiment.classify(text)
+    return score, (time.perf_counter() - started) / repeat
+
+
+async def time_llm(text: str) -> tuple:
+    started = time.perf_counter()
+    label = await sentiment.classify_with_llm(text)
+    return label, time.perf_counter() - started
+
+
+def pct(part: int, whole: int) -> str:
+    return f"{100 * part / whole:5.1f}%" if whole else "    -"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local-vs-LLM sentiment cascade benchmark")
+    parser.add_argument("fixtures", nargs="?", default=DEFAULT_FIXTURES)
+    parser.add_argument("--threshold", type=float, default=sentiment.MIN_CONFIDENCE,
+                        help="local confidence needed to skip the LLM")
+    parser.add_argument("--llm", action="store_true", help="also run every text through the LLM chain")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0,
+                        help="assumed LLM latency when --llm is not given")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    rows = []
+    for item in fixtures:
+        score, seconds = time_local(item["text"])
+        rows.append({**item, "local": score.label, "confidence": score.confidence, "local_s": seconds,
+                     "handled": score.confidence >= args.threshold})
+
+    if args.llm:
+        async def run_llm():
+            for row in rows:
+                row["llm"], row["llm_s"] = await time_llm(row["text"])
+        asyncio.run(run_llm())
+
+    total = len(rows)
+    handled = [r for r in rows if r["handled"]]
+    escalated = [r for r in rows if not r["handled"]]
+    local_correct = sum(r["local"] == r["label"] for r in rows)
+    handled_correct = sum(r["local"] == r["label"] for r in handled)
+    local_us = statistics.mean(r["local_s"] for r in rows) * 1e6
+
+    print(f"fixtures: {total}   threshold: {args.threshold}")
+    print(f"local only        accuracy {pct(local_correct, total)}   mean {local_us:6.1f} µs")
+    print(f"handled locally   {len(handled):>3} ({pct(len(handled), total)})   "
+          f"agreement with labels {pct(handled_correct, len(handled))}")
+    print(f"escalated to LLM  {len(escalated):>3} ({pct(len(escalated), total)})")
+
+    if args.llm:
+        llm_s = statistics.mean(r["llm_s"] for r in rows)
+        llm_correct = sum(r["llm"] == r["label"] for r in rows)
+        agree = sum(r["local"] == r["llm"] for r in handled)
+        cascade_correct = handled_correct + sum(r["llm"] == r["label"] for r in escalated)
+        print(f"LLM only          accuracy {pct(llm_correct, total)}   mean {llm_s * 1000:6.0f} ms")
+        print(f"local vs LLM      agreement on handled texts {pct(agree, len(handled))}")
+        print(f"cascade           accuracy {pct(cascade_correct, total)}")
+    else:
+        llm_s = args.llm_latency_ms / 1000
+        cascade_correct = handled_correct + len(escalated)
+        print(f"cascade           accuracy ≤ {pct(cascade_correct, total)}   (LLM assumed right on escalations)")
+
+    cascade_s = local_us / 1e6 + len(escalated) / total * llm_s
+    print(f"mean latency      LLM only {llm_s * 1000:6.0f} ms   cascade {cascade_s * 1000:6.0f} ms   "
+          f"saved {pct(int(round((llm_s - cascade_s) / llm_s * 1000)), 1000)}")
+
+    if args.show_misses:
+        for r in handled:
+            if r["local"] != r["label"]:
+                print(f"  miss: {r['local']:<8} (conf {r['confidence']:.2f}) expected {r['label']:<8} {r['text']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
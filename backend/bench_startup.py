@@ -0,0 +1,54 @@
+"""
+Worker cold-start benchmark.
+
+Measures, in fresh interpreter processes (like a recycled gunicorn worker):
+  - import:  `import main` (what blocks the worker before it can accept requests)
+  - warm-up: building the shared LLM chain + agent graph (what /ready waits for)
+
+Usage:
+    python bench_startup.py [runs]
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+import agent
+agent.warm_up()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "warm_up": t2 - t1}))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ)
+    # Provider clients are built but never called, so a placeholder key is enough.
+    if not any(env.get(k) for k in ("GROQ_API_KEY", "GEMINI_API_KEY", "OPENROUTER_API_KEY")):
+        env["GROQ_API_KEY"] = "bench-placeholder"
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int = 5) -> None:
+    samples = [run_once() for _ in range(runs)]
+    for key in ("import", "warm_up"):
+        values = [s[key] * 1000 for s in samples]
+        print(f"{key:>8}: median {statistics.median(values):7.1f} ms   "
+              f"min {min(values):7.1f} ms   max {max(values):7.1f} ms   (n={runs})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,172 @@
+"""
+One-shot import of an existing CV (PDF or image) into CV Builder data.
+
+The OCR'd text is split on recognised section headings and each group of
+sections is extracted by its own LLM call, concurrently, straight into the
+agent's schemas. Short CVs, or CVs without recognisable headings, go
+through a single call instead. The result has the same shape as an
+`update_cv_data` payload, i.e. the `cv_update` the frontend already applies.
+"""
+import os
+import re
+import json
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from pydantic import BaseModel
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from llm_factory import get_llm
+from agent import PersonalInfo, ExperienceEntry, EducationEntry
+
+# CVs longer than this (characters) are extracted section-parallel.
+PARALLEL_MIN_CHARS = int(os.getenv("CV_IMPORT_PARALLEL_CHARS", "4000"))
+
+# Heading line (case-insensitive, whole line) -> section.
+SECTION_HEADINGS = {
+    "summary": r"(professional\s+|career\s+)?(summary|profile|objective|about(\s+me)?)",
+    "experience": r"(work\s+|professional\s+|relevant\s+)?(experience|employment(\s+history)?|work\s+history|career\s+history)",
+    "education": r"education(\s+(and|&)\s+training)?|academic\s+(background|qualifications)|qualifications",
+    "skills": r"(technical\s+|key\s+|core\s+)?(skills|competencies|expertise|technologies|tools)",
+    "certifications": r"certifications?|certificates|licen[sc]es(\s+(and|&)\s+certifications)?|courses",
+    "languages": r"languages?(\s+skills)?",
+}
+_HEADINGS = [(section, re.compile(pattern, re.IGNORECASE)) for section, pattern in SECTION_HEADINGS.items()]
+
+
+class ImportedPersonal(BaseModel):
+    personalInfo: Optional[PersonalInfo] = None
+
+
+class ImportedExperience(BaseModel):
+    experience: List[ExperienceEntry] = []
+
+
+class ImportedEducation(BaseModel):
+    education: List[EducationEntry] = []
+
+
+class ImportedExtras(BaseModel):
+    skills: List[str] = []
+    certifications: List[Dict[str, str]] = []
+    languages: List[Dict[str, str]] = []
+
+
+class ImportedCV(ImportedPersonal, ImportedExperience, ImportedEducation, ImportedExtras):
+    pass
+
+
+def _fields(model) -> str:
+    return "{" + ", ".join(f'"{name}": "..."' for name in model.model_fields) + "}"
+
+
+# Extraction groups: the sections each call reads, its schema, and the JSON it must return.
+GROUPS = {
+    "personal": (("header", "summary"), ImportedPersonal,
+                 f'"personalInfo": {_fields(PersonalInfo)}'),
+    "experience": (("experience",), ImportedExperience,
+                   f'"experience": [{_fields(ExperienceEntry)}]'),
+    "education": (("education",), ImportedEducation,
+                  f'"education": [{_fields(EducationEntry)}]'),
+    "extras": (("skills", "certifications", "languages"), ImportedExtras,
+               '"skills": ["..."], "certifications": [{"name": "...", "issuer": "...", "date": "..."}], '
+               '"languages": [{"name": "...", "level": "..."}]'),
+}
+
+
+def _heading(line: str) -> Optional[str]:
+    cleaned = line.strip().strip(":#*•-_=|").strip()
+    if not cleaned or len(cleaned) > 40:
+        return None
+    for section, pattern in _HEADINGS:
+        if pattern.fullmatch(cleaned):
+            return section
+    return None
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """
+    Splits CV text on heading lines. Text before the first heading is
+    "header" (name, contact details); unrecognised headings stay with the
+    section above them.
+    """
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for line in text.splitlines():
+        section = _heading(line)
+        if section:
+            current = section
+            sections.setdefault(current, [])
+        else:
+            sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if "".join(lines).strip()}
+
+
+def _prompt(spec: str) -> str:
+    return f"""You convert CV text into structured data for a CV builder.
+Extract only what the text contains. Omit fields that are not present; never invent data.
+ALL values must be in English: translate if needed.
+Experience descriptions: keep the candidate's achievements as short bullet points, one per line.
+Skills: a LIST of short items. Certifications and languages: LISTS of objects.
+Return ONLY valid JSON. No markdown, no explanation.
+Structure:
+{{{spec}}}"""
+
+
+def _drop_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _drop_nulls(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_drop_nulls(v) for v in value if v not in (None, "", [], {})]
+    return value
+
+
+async def _extract(schema, spec: str, text: str) -> Dict[str, Any]:
+    result = await get_llm().ainvoke([
+        SystemMessage(content=_prompt(spec)),
+        HumanMessage(content=text),
+    ])
+    cleaned = result.content.strip().removeprefix("```json").removesuffix("```").strip()
+    parsed = schema.model_validate(_drop_nulls(json.loads(cleaned)))
+    return _drop_nulls(parsed.model_dump(exclude_none=True))
+
+
+def _plan(text: str) -> List[tuple]:
+    """(schema, spec, text) per LLM call."""
+    sections = split_sections(text)
+    found = set(sections) - {"header"}
+    if len(text) <= PARALLEL_MIN_CHARS or not found:
+        spec = ", ".join(group[2] for group in GROUPS.values())
+        return [(ImportedCV, spec, text)]
+
+    calls = []
+    for names, schema, spec in GROUPS.values():
+        chunk = "\n\n".join(sections[n] for n in names if n in sections)
+        if chunk:
+            calls.append((schema, spec, chunk))
+    return calls
+
+
+async def import_cv_text(text: str) -> Dict[str, Any]:
+    """
+    Structured CV data from raw CV text, in `cv_update` shape. A group whose
+    response can't be parsed is skipped, so the rest still imports; raises
+    only if every call failed.
+    """
+    calls = _plan(text)
+    results = await asyncio.gather(
+        *(_extract(schema, spec, chunk) for schema, spec, chunk in calls),
+        return_exceptions=True,
+    )
+
+    cv_update: Dict[str, Any] = {}
+    errors = []
+    for outcome in results:
+        if isinstance(outcome, Exception):
+            errors.append(outcome)
+            print(f"CV IMPORT SECTION ERROR: {outcome}")
+        else:
+            cv_update.update(outcome)
+    if errors and len(errors) == len(results):
+        raise errors[0]
+    return cv_update
@@ -0,0 +1,88 @@
+"""
+A user's saved CVs.
+
+Listings are keyset-paginated on (created_at, id), newest first, which the
+(user_id, created_at) index serves directly, and never load the `content`
+column (deferred on the model). Cursors are opaque to clients.
+"""
+import json
+import base64
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, undefer
+
+import models
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(cv: models.CV) -> str:
+    return base64.urlsafe_b64encode(f"cv:{cv.id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Raises ValueError for anything that isn't a cursor from encode_cursor."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    prefix, cv_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+    if prefix != "cv":
+        raise ValueError("not a CV cursor")
+    return int(cv_id)
+
+
+def metadata(cv: models.CV) -> dict:
+    return {
+        "id": cv.id,
+        "filename": cv.filename,
+        "created_at": cv.created_at.isoformat() if cv.created_at else None,
+        "updated_at": cv.updated_at.isoformat() if cv.updated_at else None,
+    }
+
+
+def list_cvs(
+    db: Session,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[models.CV], Optional[str]]:
+    """One page of CVs (content not loaded) and the cursor for the next page, if any."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = db.query(models.CV).filter(models.CV.user_id == user_id)
+    if cursor:
+        cv_id = decode_cursor(cursor)
+        # Compare against the stored created_at of the last row seen (a primary
+        # key lookup) rather than a timestamp round-tripped through the client,
+        # so precision and timezone formatting can't skip or repeat rows.
+        last_created_at = (
+            select(models.CV.created_at).where(models.CV.id == cv_id).scalar_subquery()
+        )
+        query = query.filter(or_(
+            models.CV.created_at < last_created_at,
+            and_(models.CV.created_at == last_created_at, models.CV.id < cv_id),
+        ))
+
+    # One extra row tells us whether another page exists.
+    rows = query.order_by(models.CV.created_at.desc(), models.CV.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def get_cv(db: Session, user_id: int, cv_id: int) -> Optional[models.CV]:
+    return (
+        db.query(models.CV)
+        .options(undefer(models.CV.content))
+        .filter(models.CV.id == cv_id, models.CV.user_id == user_id)
+        .first()
+    )
+
+
+def latest_cv(db: Session, user_id: int, with_content: bool = True) -> Optional[models.CV]:
+    query = db.query(models.CV).filter(models.CV.user_id == user_id)
+    if with_content:
+        query = query.options(undefer(models.CV.content))
+    return query.order_by(models.CV.created_at.desc(), models.CV.id.desc()).first()
+
+
+def cv_content(cv: models.CV) -> Optional[dict]:
+    return json.loads(cv.content) if cv.content else None
@@ -0,0 +1,162 @@
+"""
+Whole-CV polish for /cv/improve/batch.
+
+The CV's free-text fields (summary, experience descriptions) are grouped
+by section, a few per LLM call, and the calls run concurrently with at
+most POLISH_CONCURRENCY in flight. Improved fields are yielded one by one
+as each call finishes, so the editor can fill them in while the rest are
+still running.
+
+Each improved field comes with a hash of its new text. A client that sends
+those hashes back on the next run has every field it hasn't edited since
+skipped, so re-polishing a CV only spends calls on what changed.
+"""
+import os
+import json
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+import deadlines
+from llm_factory import get_llm
+from agent import PersonalInfo, ExperienceEntry
+
+# LLM calls in flight at once for one CV.
+POLISH_CONCURRENCY = int(os.getenv("CV_POLISH_CONCURRENCY", "3"))
+# Max fields per LLM call; a section with more is split across calls.
+POLISH_GROUP_FIELDS = int(os.getenv("CV_POLISH_GROUP_FIELDS", "4"))
+
+# Section -> how its text is described to the editor prompt.
+SECTION_LABELS = {
+    "summary": "professional summary",
+    "experience": "work experience",
+}
+
+
+@dataclass
+class PolishField:
+    path: str              # "personalInfo.summary", "experience.2.description"
+    section: str
+    text: str
+    context: Optional[str] = None  # e.g. "Backend Engineer at Acme"
+
+
+def content_hash(text: str) -> str:
+    """Hash of `text`, ignoring whitespace differences."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def collect_fields(cv: Dict[str, Any]) -> List[PolishField]:
+    """Non-empty free-text fields of a CV in the agent's schema. Raises ValueError on a malformed CV."""
+    try:
+        personal = PersonalInfo.model_validate(cv.get("personalInfo") or {})
+        experience = [ExperienceEntry.model_validate(entry) for entry in cv.get("experience") or []]
+    except Exception as e:
+        raise ValueError(f"CV does not match the CV Builder schema: {e}") from e
+
+    fields = []
+    if personal.summary and personal.summary.strip():
+        fields.append(PolishField("personalInfo.summary", "summary", personal.summary, personal.jobTitle))
+    for i, entry in enumerate(experience):
+        if entry.description and entry.description.strip():
+            context = " at ".join(part for part in (entry.title, entry.company) if part) or None
+            fields.append(PolishField(f"experience.{i}.description", "experience", entry.description, context))
+    return fields
+
+
+def group_fields(fields: Iterable[PolishField], per_call: Optional[int] = None) -> List[List[PolishField]]:
+    """Fields grouped by section, in order, at most `per_call` (POLISH_GROUP_FIELDS) to a group."""
+    per_call = max(per_call or POLISH_GROUP_FIELDS, 1)
+    by_section: Dict[str, List[PolishField]] = {}
+    for field in fields:
+        by_section.setdefault(field.section, []).append(field)
+    return [
+        section_fields[i:i + per_call]
+        for section_fields in by_section.values()
+        for i in range(0, len(section_fields), per_call)
+    ]
+
+
+def _prompt(section: str) -> str:
+    return f"""You are a professional CV editor.
+Improve each of the following texts from the {SECTION_LABELS.get(section, section)} section of one resume.
+Make each more professional, impactful, and concise. Use active verbs.
+Keep every fact, name, date and number; keep bullet points as bullet points.
+Return ONLY valid JSON mapping each id to its improved text. No markdown, no explanation.
+Structure:
+{{"f0": "improved text", "f1": "improved text"}}"""
+
+
+async def improve_group(group: List[PolishField]) -> Dict[str, str]:
+    """One LLM call for a group of fields from the same section. Returns path -> improved text."""
+    items = {
+        f"f{i}": {"text": field.text, **({"role": field.context} if field.context else {})}
+        for i, field in enumerate(group)
+    }
+    result = await get_llm().ainvoke([
+        SystemMessage(content=_prompt(group[0].section)),
+        HumanMessage(content=json.dumps(items, ensure_ascii=False)),
+    ])
+    cleaned = result.content.strip().removeprefix("```json").removesuffix("```").strip()
+    improved = json.loads(cleaned)
+    return {
+        field.path: improved[f"f{i}"].strip()
+        for i, field in enumerate(group)
+        if isinstance(improved.get(f"f{i}"), str) and improved[f"f{i}"].strip()
+    }
+
+
+async def _run_group(group: List[PolishField], limit: asyncio.Semaphore) -> List[dict]:
+    async with limit:
+        try:
+            improved = await improve_group(group)
+            error = "Missing from the response"
+        except deadlines.DeadlineExceeded as e:
+            improved, error = {}, str(e)
+        except Exception as e:
+            print(f"CV POLISH ERROR ({group[0].section}, {len(group)} fields): {e}")
+            improved, error = {}, "Could not improve this field"
+    return [
+        {"path": field.path, "improved_text": improved[field.path], "hash": content_hash(improved[field.path])}
+        if field.path in improved else {"path": field.path, "error": error}
+        for field in group
+    ]
+
+
+async def polish_fields(
+    fields: List[PolishField],
+    polished_hashes: Iterable[str] = (),
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Yields one event per field: skipped ones first, then improved (or
+    failed) ones as their call finishes, and finally a summary event with
+    "done": true.
+    """
+    skip = set(polished_hashes)
+    todo = []
+    counts = {"improved": 0, "skipped": 0, "failed": 0}
+    for field in fields:
+        if content_hash(field.text) in skip:
+            counts["skipped"] += 1
+            yield {"path": field.path, "skipped": True}
+        else:
+            todo.append(field)
+
+    groups = group_fields(todo)
+    limit = asyncio.Semaphore(max(concurrency or POLISH_CONCURRENCY, 1))
+    tasks = [asyncio.ensure_future(_run_group(group, limit)) for group in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for event in await next_done:
+                counts["failed" if "error" in event else "improved"] += 1
+                yield event
+    finally:
+        # The client went away mid-stream: don't keep paying for calls.
+        for task in tasks:
+            task.cancel()
+
+    yield {"done": True, **counts, "calls": len(groups), "partial": bool(deadlines.cut_short())}
@@ -33,3 +33,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def run_migrations(connection) -> None:
+    """Upgrades the database behind `connection` to the latest revision in migrations/."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+
+def init_db():
+    """
+    Creates any missing tables, then applies migrations (migrations/) to
+    tables that already existed. Run once per deploy (`python init_db.py`),
+    not from every worker at import time.
+    """
+    import models  # noqa: F401 — registers the tables on Base
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        run_migrations(connection)
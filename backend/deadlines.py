@@ -0,0 +1,121 @@
+"""
+Per-request time budgets.
+
+Each request gets a deadline on arrival (from the X-Request-Timeout header,
+else its route's default), held in a context variable so it follows the
+request into awaited calls and `asyncio.to_thread` workers. Long-running
+work checks it between steps: the LLM chain skips tiers that can't finish
+in the time left, OCR stops between pages, and handlers return what they
+have instead of running into gunicorn's worker timeout.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+DEADLINE_HEADER = "X-Request-Timeout"
+# Response header listing the steps that were cut short (e.g. "ocr,llm").
+PARTIAL_HEADER = "X-Partial-Response"
+
+# Hard ceiling for any request. gunicorn kills a worker at 120 s; the rest
+# is headroom for returning the partial response.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "100"))
+
+# Path prefix -> default budget in seconds; first match wins.
+ROUTE_DEADLINES = (
+    ("/chat", 90.0),
+    ("/refine", 45.0),
+    ("/cv/improve/batch", 90.0),
+    ("/cv/improve", 30.0),
+    ("/analyze", 20.0),
+)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the work could finish."""
+
+
+@dataclass
+class Budget:
+    expires_at: float
+    # Steps that stopped early because of this budget. Shared by reference,
+    # so worker threads running in a copy of the context can add to it.
+    cut: List[str] = field(default_factory=list)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("request_budget", default=None)
+
+
+def budget_for(path: str, header_value: Optional[str] = None) -> float:
+    """
+    Seconds allowed for a request: the header's value if it's a positive
+    number, else the route default, never more than REQUEST_DEADLINE_SECONDS.
+    """
+    seconds = next(
+        (limit for prefix, limit in ROUTE_DEADLINES if path.startswith(prefix)),
+        REQUEST_DEADLINE_SECONDS,
+    )
+    if header_value:
+        try:
+            requested = float(header_value)
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            seconds = requested
+    return min(seconds, REQUEST_DEADLINE_SECONDS)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Runs the block under a budget of `seconds` (or the enclosing one, if tighter)."""
+    expires_at = time.monotonic() + seconds
+    outer = _budget.get()
+    if outer is not None and outer.expires_at < expires_at:
+        expires_at = outer.expires_at
+    budget = Budget(expires_at)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+        if outer is not None:
+            outer.cut.extend(step for step in budget.cut if step not in outer.cut)
+
+
+@contextmanager
+def detached():
+    """Runs the block with no budget, e.g. background work started by a request."""
+    token = _budget.set(None)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None outside a request."""
+    budget = _budget.get()
+    return None if budget is None else budget.remaining()
+
+
+def has_time(reserve: float = 0.0) -> bool:
+    """True if more than `reserve` seconds are left (always true without a budget)."""
+    left = remaining()
+    return left is None or left > reserve
+
+
+def note_cut(step: str) -> None:
+    """Records that `step` returned a partial result because time ran out."""
+    budget = _budget.get()
+    if budget is not None and step not in budget.cut:
+        budget.cut.append(step)
+
+
+def cut_short() -> List[str]:
+    budget = _budget.get()
+    return list(budget.cut) if budget is not None else []
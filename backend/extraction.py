@@ -0,0 +1,357 @@
+"""
+Structured field extraction from OCR'd documents.
+
+Small documents are packed several to a prompt (up to a token budget) so a
+batch of receipts costs a handful of LLM calls instead of one per file. Any
+document the batched response doesn't return cleanly is retried on its own.
+
+Fields with a recognisable shape (emails, dates, amounts, IBANs, ...) are
+read by pattern first (field_patterns.py). The LLM is only asked for what
+those don't settle, and a document whose schema they settle skips it.
+"""
+import os
+import json
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from pydantic import BaseModel, ValidationError
+from langchain_core.prompts import ChatPromptTemplate
+
+import deadlines
+import field_patterns
+from llm_factory import get_llm
+from retrieval import retrieve, tokenize
+
+# Max document tokens packed into one extraction prompt.
+BATCH_TOKEN_BUDGET = int(os.getenv("EXTRACTION_BATCH_TOKENS", "6000"))
+# Max documents per prompt — keeps the JSON response short enough to stay reliable.
+BATCH_MAX_DOCUMENTS = int(os.getenv("EXTRACTION_BATCH_MAX_DOCS", "10"))
+# Max characters of raw document text sent with a /refine correction.
+REFINE_CONTEXT_CHARS = int(os.getenv("REFINE_CONTEXT_CHARS", "2400"))
+# Summary of a document whose requested fields were all read by pattern.
+PATTERN_SUMMARY = "Fields read by pattern matching"
+
+
+class Document(BaseModel):
+    id: str
+    filename: str
+    text: str
+    # Fields already read by pattern, and other pattern hits, sent with the text.
+    known: Dict[str, Any] = {}
+    hints: Dict[str, List[str]] = {}
+
+
+class DocumentExtraction(BaseModel):
+    id: str
+    summary: str
+    fields: Dict[str, Any]
+
+
+class FieldDiff(BaseModel):
+    set: Dict[str, Any] = {}
+    remove: List[str] = []
+    summary: Optional[str] = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) — good enough for packing."""
+    return len(text) // 4 + 1
+
+
+def instruction_for(schema: Optional[str]) -> str:
+    if schema:
+        return (
+            f"Extract SPECIFICALLY the following fields: {schema}. "
+            "Do not invent fields not asked for. "
+            "Each requested field MUST be its own separate key in the 'fields' dictionary."
+        )
+    return (
+        "Identify ALL distinct entities such as Names, Dates, Amounts, Addresses, "
+        "Phone Numbers, Invoice Numbers, Vendor Names, Items, Quantities, Totals, "
+        "and any other distinct fields. "
+        "CRITICAL: Each piece of information MUST be its own SEPARATE key in the 'fields' dictionary. "
+        "Do NOT combine multiple values into a single key or a single text blob."
+    )
+
+
+def _remaining_schema(schema: Optional[str], doc: Document) -> Optional[str]:
+    """`schema` without the fields already read by pattern."""
+    if not schema or not doc.known:
+        return schema
+    return ", ".join(name for name in field_patterns.parse_schema(schema) if name not in doc.known)
+
+
+def _render_text(doc: Document) -> str:
+    """Document text, preceded by the pattern results the LLM can lean on."""
+    notes = []
+    if doc.known:
+        notes.append(f"[Already extracted, do not return: {json.dumps(doc.known, ensure_ascii=False)}]")
+    if doc.hints:
+        notes.append(f"[Pattern matches that may help: {json.dumps(doc.hints, ensure_ascii=False)}]")
+    return "\n".join(notes + [doc.text]) if notes else doc.text
+
+
+def _parse_json(content: str) -> Any:
+    cleaned = content.strip().removeprefix("```json").removesuffix("```").strip()
+    return json.loads(cleaned)
+
+
+def _result(doc: Document, summary: str, fields: Dict[str, Any]) -> dict:
+    return {"filename": doc.filename, "summary": summary, "fields": fields, "raw_text": doc.text}
+
+
+# ---------- Single document ----------
+
+async def extract_document(doc: Document, schema: Optional[str] = None) -> dict:
+    """One LLM call for one document."""
+    system_prompt = f"""You are an AI data extraction assistant.
+Analyze the following text extracted from a document.
+{instruction_for(_remaining_schema(schema, doc))}
+Return ONLY valid JSON. No markdown, no explanation.
+Structure:
+{{{{
+    "summary": "Brief one-line summary of the document",
+    "fields": {{{{
+        "field_name_1": "value_1",
+        "field_name_2": "value_2"
+    }}}}
+}}}}"""
+
+    chain = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{text}"),
+    ]) | get_llm()
+
+    result = await chain.ainvoke({"text": _render_text(doc)})
+    try:
+        data = _parse_json(result.content)
+        return _result(doc, data.get("summary", ""), data.get("fields", {}))
+    except Exception:
+        return _result(doc, "Error parsing LLM response", {"raw_response": result.content})
+
+
+# ---------- Batched documents ----------
+
+def pack_documents(
+    docs: List[Document],
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_documents: int = BATCH_MAX_DOCUMENTS,
+) -> List[List[Document]]:
+    """
+    Greedily packs documents, in order, into batches whose combined size stays
+    within `token_budget`. A document larger than the budget gets its own batch.
+    """
+    batches: List[List[Document]] = []
+    current: List[Document] = []
+    used = 0
+    for doc in docs:
+        size = estimate_tokens(doc.text)
+        if current and (used + size > token_budget or len(current) >= max_documents):
+            batches.append(current)
+            current, used = [], 0
+        current.append(doc)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _render_batch(docs: List[Document]) -> str:
+    return "\n\n".join(
+        f'<document id="{doc.id}">\n{_render_text(doc)}\n</document>' for doc in docs
+    )
+
+
+async def extract_batch(docs: List[Document], schema: Optional[str] = None) -> List[dict]:
+    """
+    One LLM call for several documents. Items missing from the response or
+    failing validation fall back to a per-document call.
+    """
+    if len(docs) == 1:
+        return [await extract_document(docs[0], schema)]
+
+    system_prompt = f"""You are an AI data extraction assistant.
+You will receive {len(docs)} separate documents, each wrapped in <document id="..."> tags.
+Treat every document independently — never mix values between documents.
+For EACH document: {instruction_for(schema)}
+Skip any field a document lists as already extracted.
+Return ONLY valid JSON. No markdown, no explanation.
+Structure:
+{{{{
+    "documents": [
+        {{{{
+            "id": "the document id",
+            "summary": "Brief one-line summary of the document",
+            "fields": {{{{
+                "field_name_1": "value_1"
+            }}}}
+        }}}}
+    ]
+}}}}
+Return exactly one entry per document id."""
+
+    chain = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{documents}"),
+    ]) | get_llm()
+
+    extracted: Dict[str, DocumentExtraction] = {}
+    try:
+        result = await chain.ainvoke({"documents": _render_batch(docs)})
+        for item in _parse_json(result.content).get("documents", []):
+            try:
+                parsed = DocumentExtraction.model_validate(item)
+            except ValidationError:
+                continue
+            extracted.setdefault(parsed.id, parsed)
+    except deadlines.DeadlineExceeded:
+        raise  # no time left for per-document retries
+    except Exception as e:
+        print(f"BATCH EXTRACTION ERROR ({len(docs)} docs): {e}")
+
+    results: List[Optional[dict]] = []
+    retry: List[int] = []
+    for i, doc in enumerate(docs):
+        item = extracted.get(doc.id)
+        if item is None:
+            retry.append(i)
+            results.append(None)
+        else:
+            results.append(_result(doc, item.summary, item.fields))
+
+    if retry:
+        fallbacks = await asyncio.gather(
+            *(extract_document(docs[i], schema) for i in retry),
+            return_exceptions=True,
+        )
+        for i, fallback in zip(retry, fallbacks):
+            if isinstance(fallback, deadlines.DeadlineExceeded):
+                fallback = _result(docs[i], "Timed out", {"error": str(fallback)})
+            elif isinstance(fallback, Exception):
+                raise fallback
+            results[i] = fallback
+    return results
+
+
+def _with_patterns(result: dict, prefill: field_patterns.Prefill) -> dict:
+    """Merges the pattern-read fields into `result` (they win), in schema order, and records the hits."""
+    fields = {**result["fields"], **prefill.known_values()}
+    ordered = {name: fields.pop(name) for name in prefill.fields if name in fields}
+    return {**result, "fields": {**ordered, **fields},
+            "matches": [match.as_dict() for match in prefill.matches]}
+
+
+async def extract_documents(docs: List[Document], schema: Optional[str] = None) -> List[dict]:
+    """
+    Extracts all documents, packed into batches that run concurrently. Keeps
+    input order. Documents whose schema is settled by pattern skip the LLM.
+    """
+    # Tens of ms on long multi-page text; keep it off the event loop.
+    prefills = await asyncio.to_thread(lambda: [field_patterns.prefill(doc.text, schema) for doc in docs])
+    finished: Dict[str, dict] = {}
+    pending: List[Document] = []
+    for doc, prefill in zip(docs, prefills):
+        if prefill.complete:
+            finished[doc.id] = _result(doc, PATTERN_SUMMARY, {})
+        else:
+            pending.append(doc.model_copy(update={"known": prefill.known_values(), "hints": prefill.hints}))
+
+    extracted = iter(await _extract_pending(pending, schema))
+    for doc in pending:
+        finished[doc.id] = next(extracted)
+    return [_with_patterns(finished[doc.id], prefill) for doc, prefill in zip(docs, prefills)]
+
+
+async def _extract_pending(docs: List[Document], schema: Optional[str]) -> List[dict]:
+    batches = pack_documents(docs)
+    batch_results = await asyncio.gather(
+        *(extract_batch(batch, schema) for batch in batches),
+        return_exceptions=True,
+    )
+
+    results: List[dict] = []
+    for batch, outcome in zip(batches, batch_results):
+        if isinstance(outcome, deadlines.DeadlineExceeded):
+            # Keep the text so the document can still be refined or re-run.
+            results.extend(
+                {"filename": doc.filename, "summary": "Timed out",
+                 "fields": {"error": str(outcome)}, "raw_text": doc.text}
+                for doc in batch
+            )
+        elif isinstance(outcome, Exception):
+            results.extend(
+                {"filename": doc.filename, "summary": "Processing Error",
+                 "fields": {"error": str(outcome)}, "raw_text": ""}
+                for doc in batch
+            )
+        else:
+            results.extend(outcome)
+    return results
+
+
+# ---------- Refinement ----------
+
+def touched_fields(fields: Dict[str, Any], instructions: str) -> List[str]:
+    """Field keys whose words appear in the instructions."""
+    words = set(tokenize(instructions))
+    return [key for key in fields if set(tokenize(key)) & words]
+
+
+def apply_diff(fields: Dict[str, Any], diff: FieldDiff) -> Dict[str, Any]:
+    updated = {key: value for key, value in fields.items() if key not in diff.remove}
+    updated.update(diff.set)
+    return updated
+
+
+async def refine_fields(
+    fields: Dict[str, Any],
+    raw_text: str,
+    instructions: str,
+    summary: Optional[str] = None,
+) -> dict:
+    """
+    Applies a user correction. Only the passages of `raw_text` relevant to the
+    instructions and the fields they mention are sent, and the LLM answers with
+    a field-level diff that is merged into `fields` here.
+    """
+    touched = touched_fields(fields, instructions)
+    query = " ".join([instructions] + [f"{key} {fields[key]}" for key in touched])
+    # The index is built per call (a few ms per 100 KB), off the event loop.
+    passages = await asyncio.to_thread(retrieve, raw_text, query, REFINE_CONTEXT_CHARS)
+
+    system_prompt = """You are an expert data refinement assistant.
+Your goal is to correct structured data based on user instructions and excerpts of the raw document text.
+Only the excerpts relevant to the instructions are provided, not the whole document.
+Return ONLY the changes, as valid JSON. No markdown, no explanation.
+Structure:
+{{
+    "set": {{"key": "new or corrected value"}},
+    "remove": ["key to delete"],
+    "summary": "Updated one-line summary, or null if unchanged"
+}}
+Leave every field the instructions do not affect out of "set"."""
+
+    human_prompt = """CURRENT FIELDS:
+{fields}
+
+DOCUMENT EXCERPTS:
+{passages}
+
+USER INSTRUCTIONS:
+{instructions}"""
+
+    chain = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", human_prompt),
+    ]) | get_llm()
+
+    result = await chain.ainvoke({
+        "fields": json.dumps(fields, ensure_ascii=False),
+        "passages": "\n...\n".join(passages) or "(no document text)",
+        "instructions": instructions,
+    })
+    diff = FieldDiff.model_validate(_parse_json(result.content))
+    return {
+        "summary": diff.summary if diff.summary is not None else (summary or ""),
+        "fields": apply_diff(fields, diff),
+    }
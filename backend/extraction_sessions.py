@@ -0,0 +1,135 @@
+"""
+Server-side extraction sessions.
+
+/upload stores each document's raw text (zlib-compressed) and extracted
+fields under a session id, and returns only a short preview. /refine and
+/export then reference the session instead of posting the text back.
+Sessions live in the database so every gunicorn worker sees them, and
+expire after EXTRACTION_SESSION_TTL seconds.
+"""
+import os
+import json
+import zlib
+import secrets
+import datetime
+from typing import List, Dict, Any, Iterator, Optional
+
+from sqlalchemy.orm import Session, defer
+
+import models
+
+SESSION_TTL_SECONDS = int(os.getenv("EXTRACTION_SESSION_TTL", str(24 * 3600)))
+# Characters of raw text returned by /upload for display.
+PREVIEW_CHARS = int(os.getenv("EXTRACTION_PREVIEW_CHARS", "500"))
+# Rows fetched from the database at a time when a session is exported.
+EXPORT_FETCH_ROWS = int(os.getenv("EXTRACTION_EXPORT_FETCH_ROWS", "500"))
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress_text(data: Optional[bytes]) -> str:
+    return zlib.decompress(data).decode("utf-8") if data else ""
+
+
+def preview(result: dict, session_id: str, position: int) -> dict:
+    """Client-facing copy of a stored result: raw text cut to PREVIEW_CHARS."""
+    text = result.get("raw_text") or ""
+    return {
+        **result,
+        "raw_text": text[:PREVIEW_CHARS],
+        "raw_text_truncated": len(text) > PREVIEW_CHARS,
+        "session_id": session_id,
+        "document": position,
+    }
+
+
+def create_session(db: Session, results: List[dict]) -> tuple:
+    """Stores extraction results in order. Returns (session_id, expires_at)."""
+    session_id = secrets.token_hex(16)
+    expires_at = _now() + datetime.timedelta(seconds=SESSION_TTL_SECONDS)
+    db.add_all(
+        models.ExtractionDocument(
+            session_id=session_id,
+            position=position,
+            filename=result.get("filename"),
+            summary=result.get("summary"),
+            fields=json.dumps(result.get("fields") or {}, ensure_ascii=False),
+            raw_text=compress_text(result.get("raw_text") or ""),
+            expires_at=expires_at,
+        )
+        for position, result in enumerate(results)
+    )
+    db.commit()
+    return session_id, expires_at
+
+
+def _live(db: Session, session_id: str):
+    return (
+        db.query(models.ExtractionDocument)
+        .filter(models.ExtractionDocument.session_id == session_id)
+        .filter(models.ExtractionDocument.expires_at > _now())
+    )
+
+
+def get_document(db: Session, session_id: str, position: int) -> Optional[models.ExtractionDocument]:
+    return _live(db, session_id).filter(models.ExtractionDocument.position == position).first()
+
+
+def document_text(doc: models.ExtractionDocument) -> str:
+    return decompress_text(doc.raw_text)
+
+
+def document_fields(doc: models.ExtractionDocument) -> Dict[str, Any]:
+    return json.loads(doc.fields) if doc.fields else {}
+
+
+def update_document(db: Session, doc: models.ExtractionDocument, summary: str, fields: Dict[str, Any]) -> None:
+    doc.summary = summary
+    doc.fields = json.dumps(fields, ensure_ascii=False)
+    db.commit()
+
+
+class SessionResults:
+    """
+    Filename, summary and fields of every document, in upload order. Each
+    iteration runs its own query and streams rows EXPORT_FETCH_ROWS at a
+    time, so the export's two passes (columns, then rows) hold one batch in
+    memory, not the session. Text is not loaded.
+    """
+
+    def __init__(self, db: Session, session_id: str):
+        self._db = db
+        self._session_id = session_id
+
+    def __iter__(self) -> Iterator[dict]:
+        rows = (
+            _live(self._db, self._session_id)
+            .options(defer(models.ExtractionDocument.raw_text))
+            .order_by(models.ExtractionDocument.position)
+            .yield_per(EXPORT_FETCH_ROWS)
+        )
+        for row in rows:
+            yield {"filename": row.filename, "summary": row.summary or "", "fields": document_fields(row)}
+
+
+def session_results(db: Session, session_id: str) -> Optional[SessionResults]:
+    """The session's results for export, or None if it doesn't exist or has expired."""
+    if not db.query(_live(db, session_id).exists()).scalar():
+        return None
+    return SessionResults(db, session_id)
+
+
+def purge_expired(db: Session) -> int:
+    deleted = (
+        db.query(models.ExtractionDocument)
+        .filter(models.ExtractionDocument.expires_at <= _now())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
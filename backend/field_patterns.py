@@ -0,0 +1,266 @@
+"""
+Deterministic field pre-extraction for /upload.
+
+Before a document goes to the LLM, compiled patterns pick out the values
+that have an unambiguous shape: emails, phone numbers, dates, currency
+amounts, invoice numbers and IBANs (checksum-verified). Every hit keeps
+its span in the OCR text and a confidence.
+
+When a schema is given, requested fields are matched to a kind by name
+("due_date" -> date, "total_amount" -> amount) and to a hit by the label in
+front of it on the same line ("Due date: ...", "Total: ..."). Fields
+resolved this way are not asked of the LLM; if every field is resolved,
+the document skips the LLM altogether. Anything left ambiguous (two
+different totals, a date with no label) is passed to the LLM as a hint.
+"""
+import os
+import re
+import bisect
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, List, Optional
+
+from retrieval import tokenize
+
+# Fields resolved at or above this confidence are taken as-is, without the LLM.
+MIN_CONFIDENCE = float(os.getenv("EXTRACTION_PATTERN_CONFIDENCE", "0.85"))
+# Characters before a hit, on the same line, searched for its label.
+LABEL_CHARS = 40
+# Candidate values per kind passed to the LLM as hints.
+MAX_HINTS = 10
+
+KINDS = ("iban", "email", "date", "invoice_number", "amount", "phone")
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_CURRENCY = r"(?:[$€£¥₹]|usd|eur|gbp|chf|jpy|cad|aud|inr|pkr|aed|sar)"
+_NUMBER = r"\d{1,3}(?:[,.]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+
+_EMAIL = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b")
+_IBAN = re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]){11,30}\b")
+_DATES = (
+    (re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b"), 0.95),
+    (re.compile(r"\b\d{1,2}[./-]\d{1,2}[./-](?:\d{4}|\d{2})\b"), 0.85),
+    (re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH},?\s+\d{{4}}\b", re.I), 0.9),
+    (re.compile(rf"\b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b", re.I), 0.9),
+)
+_AMOUNT_WITH_CURRENCY = re.compile(
+    rf"(?<![\w.,]){_CURRENCY}\s?(?:{_NUMBER})(?![\w.,]*\d)|(?<![\w.,])(?:{_NUMBER})\s?{_CURRENCY}(?!\w)", re.I,
+)
+_AMOUNT_BARE = re.compile(r"(?<![\w.,])(?:\d{1,3}(?:[,.]\d{3})+|\d+)[.,]\d{2}(?![\w.,]*\d)")
+_INVOICE_NUMBER = re.compile(
+    r"\b(?:invoice|inv|bill|receipt)\s*(?:no\.?|number|num|nr\.?|id|#)?\s*[:#]?\s*"
+    r"(?P<value>(?=[A-Z0-9/-]*\d)[A-Z0-9][A-Z0-9/-]{2,})\b", re.I,
+)
+_PHONE = re.compile(r"(?<![\w+])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{1,4}\)[\s.-]?)?\d{2,4}(?:[\s.-]?\d{2,4}){1,4}(?!\w)")
+
+# Line words that make a bare number an amount, or a digit run a phone number.
+_AMOUNT_LABELS = {"total", "subtotal", "amount", "tax", "vat", "gst", "due", "balance", "price",
+                  "sum", "paid", "fee", "cost", "charge", "net", "gross"}
+_PHONE_LABELS = {"phone", "tel", "telephone", "mobile", "cell", "fax", "call", "contact", "ph", "whatsapp"}
+
+# Field-name words -> kind, checked in this order ("invoice_date" is a date, "phone_number" a phone).
+_FIELD_KINDS = (
+    ("email", {"email", "mail"}),
+    ("iban", {"iban"}),
+    ("phone", _PHONE_LABELS - {"call", "contact"}),
+    ("date", {"date", "dated", "dob"}),
+    ("amount", _AMOUNT_LABELS - {"due", "net", "gross"} | {"payable", "grand"}),
+    ("invoice_number", {"invoice", "inv", "bill", "receipt"}),
+)
+# Name words that say nothing about which hit is meant ("amount", "number").
+_GENERIC_WORDS = {"date", "amount", "number", "no", "num", "nr", "id", "address", "the", "of"}
+
+
+@dataclass
+class PatternMatch:
+    kind: str
+    value: str
+    start: int
+    end: int
+    confidence: float
+    field: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+@dataclass
+class Prefill:
+    fields: List[str]                # requested field names, in schema order
+    known: Dict[str, PatternMatch]   # fields resolved without the LLM
+    hints: Dict[str, List[str]]      # kind -> candidate values for everything else
+    matches: List[PatternMatch]
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name in self.fields if name not in self.known]
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.fields) and not self.missing
+
+    def known_values(self) -> Dict[str, str]:
+        return {name: match.value for name, match in self.known.items()}
+
+
+def parse_schema(schema: Optional[str]) -> List[str]:
+    """'invoice_number, total; vendor' -> ['invoice_number', 'total', 'vendor']."""
+    names = [name.strip() for name in re.split(r"[,;\n]", schema or "")]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _label_words(text: str, start: int) -> set:
+    line_start = text.rfind("\n", 0, start) + 1
+    return set(tokenize(text[max(line_start, start - LABEL_CHARS):start]))
+
+
+# IBAN lengths for common countries; others just need 15-34 characters.
+IBAN_LENGTHS = {
+    "AE": 23, "AT": 20, "BE": 16, "CH": 21, "CZ": 24, "DE": 22, "DK": 18, "ES": 24, "FI": 18,
+    "FR": 27, "GB": 22, "GR": 27, "IE": 22, "IT": 27, "LU": 20, "NL": 18, "NO": 15, "PK": 24,
+    "PL": 28, "PT": 25, "SA": 24, "SE": 24, "TR": 26,
+}
+
+
+def _iban_valid(iban: str) -> bool:
+    if len(iban) != IBAN_LENGTHS.get(iban[:2], len(iban)) or not 15 <= len(iban) <= 34:
+        return False
+    digits = "".join(str(int(c, 36)) for c in iban[4:] + iban[:4])
+    return int(digits) % 97 == 1
+
+
+def _ibans(text: str) -> List[PatternMatch]:
+    found = []
+    for m in _IBAN.finditer(text):
+        # The run can swallow an uppercase word that follows ("... 00 BIC"):
+        # take the longest prefix that passes the checksum.
+        positions = [m.start() + i for i, c in enumerate(m.group()) if c != " "]
+        compact = m.group().replace(" ", "")
+        for length in range(len(compact), 14, -1):
+            if _iban_valid(compact[:length]):
+                found.append(PatternMatch("iban", compact[:length], m.start(), positions[length - 1] + 1, 0.99))
+                break
+    return found
+
+
+def _dates(text: str) -> List[PatternMatch]:
+    found = []
+    for pattern, confidence in _DATES:
+        for m in pattern.finditer(text):
+            numbers = [int(n) for n in re.findall(r"\d+", m.group())]
+            if pattern is _DATES[1][0] and not (all(1 <= n <= 31 for n in numbers[:2]) and min(numbers[:2]) <= 12):
+                continue
+            if pattern is _DATES[0][0] and not (1 <= numbers[1] <= 12 and 1 <= numbers[2] <= 31):
+                continue
+            found.append(PatternMatch("date", m.group(), m.start(), m.end(), confidence))
+    return found
+
+
+def _amounts(text: str) -> List[PatternMatch]:
+    found = [PatternMatch("amount", m.group().strip(), m.start(), m.end(), 0.9)
+             for m in _AMOUNT_WITH_CURRENCY.finditer(text)]
+    for m in _AMOUNT_BARE.finditer(text):
+        if _label_words(text, m.start()) & _AMOUNT_LABELS:
+            found.append(PatternMatch("amount", m.group(), m.start(), m.end(), 0.85))
+    return found
+
+
+def _invoice_numbers(text: str) -> List[PatternMatch]:
+    return [PatternMatch("invoice_number", m.group("value"), m.start("value"), m.end("value"), 0.95)
+            for m in _INVOICE_NUMBER.finditer(text)]
+
+
+def _phones(text: str) -> List[PatternMatch]:
+    found = []
+    for m in _PHONE.finditer(text):
+        digits = re.sub(r"\D", "", m.group())
+        if not 7 <= len(digits) <= 15:
+            continue
+        if _label_words(text, m.start()) & _PHONE_LABELS:
+            found.append(PatternMatch("phone", m.group(), m.start(), m.end(), 0.95))
+        elif m.group()[0] in "+(":
+            found.append(PatternMatch("phone", m.group(), m.start(), m.end(), 0.85))
+    return found
+
+
+def find_matches(text: str) -> List[PatternMatch]:
+    """All pattern hits, in text order. Where hits overlap, the kind earlier in KINDS wins."""
+    finders = {
+        "iban": _ibans,
+        "email": lambda t: [PatternMatch("email", m.group(), m.start(), m.end(), 0.98) for m in _EMAIL.finditer(t)],
+        "date": _dates,
+        "invoice_number": _invoice_numbers,
+        "amount": _amounts,
+        "phone": _phones,
+    }
+    accepted: List[PatternMatch] = []  # sorted by start, never overlapping
+    starts: List[int] = []
+    for kind in KINDS:
+        for match in sorted(finders[kind](text), key=lambda m: -m.confidence):
+            i = bisect.bisect_left(starts, match.start)
+            if i > 0 and accepted[i - 1].end > match.start:
+                continue
+            if i < len(accepted) and accepted[i].start < match.end:
+                continue
+            accepted.insert(i, match)
+            starts.insert(i, match.start)
+    return accepted
+
+
+def kind_for(field: str) -> Optional[str]:
+    """The pattern kind a requested field name refers to, if any."""
+    words = set(tokenize(field))
+    for kind, names in _FIELD_KINDS:
+        if words & names:
+            return kind
+    return None
+
+
+def _resolve(field: str, kind: str, candidates: List[PatternMatch], text: str) -> Optional[PatternMatch]:
+    qualifiers = set(tokenize(field)) - _GENERIC_WORDS
+    if kind != "amount":
+        # For amounts the kind words are the qualifiers ("tax", "total").
+        qualifiers -= dict(_FIELD_KINDS)[kind]
+    if kind == "amount" and qualifiers & {"total", "grand", "payable"}:
+        qualifiers |= {"total", "due", "payable"}
+
+    labelled = [m for m in candidates if qualifiers & _label_words(text, m.start)] if qualifiers else candidates
+    # Amounts and dates play several roles in one document; without a label
+    # a qualified name ("tax", "due_date") can't be matched safely.
+    if not labelled and kind in ("amount", "date") and qualifiers:
+        return None
+    pool = labelled or candidates
+    values = {re.sub(r"\s+", " ", m.value) for m in pool}
+    if len(values) != 1:
+        return None
+    best = max(pool, key=lambda m: m.confidence)
+    return replace(best, field=field)
+
+
+def prefill(text: str, schema: Optional[str] = None) -> Prefill:
+    """Pattern hits for `text`, and the requested fields they settle."""
+    matches = find_matches(text)
+    fields = parse_schema(schema)
+    by_kind: Dict[str, List[PatternMatch]] = {}
+    for match in matches:
+        by_kind.setdefault(match.kind, []).append(match)
+
+    known: Dict[str, PatternMatch] = {}
+    for field in fields:
+        kind = kind_for(field)
+        if kind and by_kind.get(kind):
+            resolved = _resolve(field, kind, by_kind[kind], text)
+            if resolved and resolved.confidence >= MIN_CONFIDENCE:
+                known[field] = resolved
+
+    # Hits record the field they settled; values already used aren't hints.
+    settled = {(m.start, m.end): m for m in known.values()}
+    matches = [settled.get((m.start, m.end), m) for m in matches]
+    used = {m.value for m in known.values()}
+    hints: Dict[str, List[str]] = {}
+    for match in matches:
+        if match.value in used:
+            continue
+        values = hints.setdefault(match.kind, [])
+        if match.value not in values and len(values) < MAX_HINTS:
+            values.append(match.value)
+    return Prefill(fields=fields, known=known, hints=hints, matches=matches)
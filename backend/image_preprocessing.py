@@ -0,0 +1,183 @@
+"""
+Image preprocessing ahead of Tesseract.
+
+Phone photos arrive at 12 MP+, rotated via EXIF, skewed and low-contrast.
+`preprocess_image` normalises them with Pillow only:
+
+    EXIF rotation → grayscale → crop to content → deskew → downscale → binarize
+
+Analysis (crop box, skew angle) runs on a small thumbnail so the pipeline
+itself stays cheap even on very large inputs.
+"""
+import json
+import logging
+from typing import Optional
+
+from PIL import Image, ImageFilter, ImageOps
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Long edge of a portrait A4/Letter page, used to turn a DPI into a pixel budget.
+PAGE_LONG_EDGE_INCHES = 11.7
+# Size of the thumbnail used for crop / skew analysis.
+ANALYSIS_SIZE = 800
+
+
+class PreprocessOptions(BaseModel):
+    exif_transpose: bool = True
+    grayscale: bool = True
+    crop: bool = True
+    deskew: bool = True
+    binarize: bool = True
+    # Downscale so the long edge matches this DPI on a full page; None keeps the size.
+    target_dpi: Optional[int] = 300
+    max_skew_degrees: float = 10.0
+    skew_step_degrees: float = 0.5
+    # Margin kept around the detected content, as a fraction of the image size.
+    crop_margin: float = 0.02
+
+    @classmethod
+    def from_spec(cls, spec: Optional[str]) -> "PreprocessOptions":
+        """
+        Parses a per-request setting: None/"default", "none"/"off", "fast",
+        or a JSON object overriding individual fields.
+        """
+        if spec is None or spec.strip() in ("", "default"):
+            return cls()
+        spec = spec.strip()
+        if spec in ("none", "off"):
+            return cls.disabled()
+        if spec == "fast":
+            return cls(deskew=False, crop=False, target_dpi=200)
+        return cls.model_validate(json.loads(spec))
+
+    @classmethod
+    def disabled(cls) -> "PreprocessOptions":
+        return cls(exif_transpose=False, grayscale=False, crop=False,
+                   deskew=False, binarize=False, target_dpi=None)
+
+
+# ---------- Individual stages ----------
+
+def otsu_threshold(image: Image.Image) -> int:
+    """Otsu's threshold from the histogram of a grayscale ("L") image."""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg, weight_bg, best, threshold = 0.0, 0, -1.0, 127
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, level
+    return threshold
+
+
+def binarize(image: Image.Image) -> Image.Image:
+    """Stretches contrast, then thresholds with Otsu. Returns a grayscale 0/255 image."""
+    image = ImageOps.autocontrast(image.convert("L"), cutoff=1)
+    threshold = otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0)
+
+
+def _ink_mask(thumbnail: Image.Image) -> Image.Image:
+    """White-on-black mask of dark content with speckle noise removed."""
+    mask = binarize(thumbnail)
+    return ImageOps.invert(mask).filter(ImageFilter.MedianFilter(3))
+
+
+def find_content_box(image: Image.Image, margin: float = 0.02) -> Optional[tuple]:
+    """Bounding box of the text/ink region in full-size coordinates, or None."""
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    box = _ink_mask(thumbnail).getbbox()
+    if not box:
+        return None
+
+    scale_x = image.width / thumbnail.width
+    scale_y = image.height / thumbnail.height
+    pad_x, pad_y = int(image.width * margin), int(image.height * margin)
+    return (
+        max(0, int(box[0] * scale_x) - pad_x),
+        max(0, int(box[1] * scale_y) - pad_y),
+        min(image.width, int(box[2] * scale_x) + pad_x),
+        min(image.height, int(box[3] * scale_y) + pad_y),
+    )
+
+
+def _row_profile_score(mask: Image.Image) -> float:
+    """Variance of per-row ink density; peaks when text lines are horizontal."""
+    rows = list(mask.resize((1, mask.height), Image.BOX).tobytes())
+    mean = sum(rows) / len(rows)
+    return sum((r - mean) ** 2 for r in rows) / len(rows)
+
+
+def estimate_skew(image: Image.Image, max_degrees: float = 10.0, step: float = 0.5) -> float:
+    """
+    Projection-profile skew estimate in degrees (counter-clockwise positive).
+    Coarse search over ±max_degrees, then refined around the best angle.
+    """
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    mask = _ink_mask(thumbnail)
+
+    def best_angle(candidates):
+        return max(candidates, key=lambda a: _row_profile_score(mask.rotate(a, resample=Image.NEAREST, expand=True)))
+
+    coarse_step = max(step, 2.0)
+    steps = int(max_degrees / coarse_step)
+    angle = best_angle([i * coarse_step for i in range(-steps, steps + 1)])
+    fine_steps = int(coarse_step / step)
+    return best_angle([angle + i * step for i in range(-fine_steps, fine_steps + 1)])
+
+
+def downscale_to_dpi(image: Image.Image, target_dpi: int) -> Image.Image:
+    """Shrinks (never enlarges) so the long edge fits `target_dpi` on a full page."""
+    max_side = int(target_dpi * PAGE_LONG_EDGE_INCHES)
+    if max(image.size) <= max_side:
+        return image
+    image = image.copy()
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return image
+
+
+# ---------- Pipeline ----------
+
+def preprocess_image(image: Image.Image, options: Optional[PreprocessOptions] = None) -> Image.Image:
+    """Runs the enabled stages in order and returns the image to hand to Tesseract."""
+    options = options or PreprocessOptions()
+
+    if options.exif_transpose:
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if options.grayscale or options.binarize:
+        image = image.convert("L")
+
+    if options.crop:
+        box = find_content_box(image, options.crop_margin)
+        if box:
+            image = image.crop(box)
+
+    if options.deskew:
+        angle = estimate_skew(image, options.max_skew_degrees, options.skew_step_degrees)
+        if abs(angle) >= options.skew_step_degrees:
+            fill = 255 if image.mode == "L" else (255, 255, 255)
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+    if options.target_dpi:
+        image = downscale_to_dpi(image, options.target_dpi)
+
+    if options.binarize:
+        image = binarize(image)
+
+    return image
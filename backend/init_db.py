@@ -0,0 +1,11 @@
+"""
+Creates missing tables and applies migrations. Run once per deploy, before
+starting the workers:
+
+    python init_db.py
+"""
+from database import init_db
+
+if __name__ == "__main__":
+    init_db()
+    print("✅ Database schema is up to date")
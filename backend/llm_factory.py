@@ -1,6 +1,13 @@
 import os
+import time
+import asyncio
 import logging
+import threading
+from typing import Optional
 from dotenv import load_dotenv
+from langchain_core.runnables import Runnable, RunnableWithFallbacks
+
+import deadlines
 
 # Load environment variables
 load_dotenv()
@@ -9,9 +16,388 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ---------------------------------------------------------------------------
+# Process-wide registry — each chain is built once per worker, on first use
+# ---------------------------------------------------------------------------
+_registry = {}
+_registry_lock = threading.RLock()
+
+
+def _get_or_build(name: str, builder):
+    llm = _registry.get(name)
+    if llm is None:
+        with _registry_lock:
+            llm = _registry.get(name)
+            if llm is None:
+                llm = _registry[name] = builder()
+    return llm
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP clients — every Groq / OpenAI-compatible tier (all OpenRouter
+# models included) sends through the same keep-alive pool, so a fallback hop
+# to an already-contacted host skips the TCP + TLS handshake.
+# ---------------------------------------------------------------------------
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "90"))
+
+
+class _RequestTrace:
+    """httpcore trace callback for one request; notes whether it opened a connection."""
+
+    def __init__(self, stats: "ConnectionStats"):
+        self.stats = stats
+        self.opened_connection = False
+
+    def record(self, event: str) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.opened_connection = True
+            self.stats._add("connections_opened")
+        elif event == "connection.start_tls.complete":
+            self.stats._add("tls_handshakes")
+
+    def __call__(self, event, info):
+        self.record(event)
+
+
+class _AsyncRequestTrace(_RequestTrace):
+    async def __call__(self, event, info):
+        self.record(event)
+
+
+class ConnectionStats:
+    """
+    Per-worker counters for the shared clients, fed by httpx event hooks and
+    httpcore's trace extension. A request that got a response without opening
+    a connection reused a pooled one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = {
+                "requests": 0, "responses": 0, "connections_opened": 0,
+                "tls_handshakes": 0, "reused_requests": 0,
+            }
+            self.http_versions = {}
+
+    def _add(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def _on_request(self, request, trace: _RequestTrace) -> None:
+        self._add("requests")
+        request.extensions["trace"] = trace
+
+    def _on_response(self, response) -> None:
+        trace = response.request.extensions.get("trace")
+        with self._lock:
+            self.counts["responses"] += 1
+            if isinstance(trace, _RequestTrace) and not trace.opened_connection:
+                self.counts["reused_requests"] += 1
+            version = response.http_version
+            self.http_versions[version] = self.http_versions.get(version, 0) + 1
+
+    def sync_hooks(self) -> dict:
+        def on_request(request):
+            self._on_request(request, _RequestTrace(self))
+
+        return {"request": [on_request], "response": [self._on_response]}
+
+    def async_hooks(self) -> dict:
+        async def on_request(request):
+            self._on_request(request, _AsyncRequestTrace(self))
+
+        async def on_response(response):
+            self._on_response(response)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            responses = counts["responses"]
+            return {
+                **counts,
+                "failed_requests": counts["requests"] - responses,
+                "reuse_ratio": round(counts["reused_requests"] / responses, 3) if responses else None,
+                "http_versions": dict(self.http_versions),
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("h2 not installed; LLM HTTP clients fall back to HTTP/1.1 keep-alive.")
+        return False
+
+
+def _client_options() -> dict:
+    import httpx
+    return {
+        "http2": _http2_available(),
+        "timeout": llm_timeout(),
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def llm_timeout():
+    """Connect/read timeouts. Passed to the models too: the SDKs set a timeout on every request."""
+    import httpx
+    return httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+def get_http_client():
+    """Process-wide sync client, for `.invoke()` calls (e.g. from worker threads)."""
+    import httpx
+    return _get_or_build(
+        "http_sync",
+        lambda: httpx.Client(event_hooks=connection_stats.sync_hooks(), **_client_options()),
+    )
+
+
+def get_async_http_client():
+    """Process-wide async client, for `.ainvoke()` calls on the server's event loop."""
+    import httpx
+    return _get_or_build(
+        "http_async",
+        lambda: httpx.AsyncClient(event_hooks=connection_stats.async_hooks(), **_client_options()),
+    )
+
+
+def _http_kwargs() -> dict:
+    """Constructor arguments that put a ChatGroq / ChatOpenAI model on the shared clients."""
+    return {
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+        "timeout": llm_timeout(),
+    }
+
+
+async def close_http_clients() -> None:
+    with _registry_lock:
+        sync_client = _registry.pop("http_sync", None)
+        async_client = _registry.pop("http_async", None)
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+
+# ---------------------------------------------------------------------------
+# Deadline-aware fallbacks — a tier is only tried if its usual latency fits in
+# what is left of the request's budget, and it is never allowed to run past it.
+# ---------------------------------------------------------------------------
+# Least time a tier is expected to need, and the assumed latency of a tier not seen yet.
+LLM_MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "3"))
+# A tier's latency above that floor halves every this many seconds without a
+# new call, so a tier skipped after a few slow calls gets tried again.
+LLM_LATENCY_HALF_LIFE_SECONDS = float(os.getenv("LLM_LATENCY_HALF_LIFE_SECONDS", "120"))
+# Weight of the newest call in a tier's moving-average latency.
+_LATENCY_ALPHA = 0.3
+# Tier name -> (moving-average seconds, time.monotonic() it was last updated)
+_tier_latency = {}
+_latency_lock = threading.Lock()
+
+
+def tier_name(tier) -> str:
+    bound = getattr(tier, "bound", tier)  # bind_tools() wraps a model in a RunnableBinding
+    return getattr(bound, "model_name", None) or getattr(bound, "model", None) or type(bound).__name__
+
+
+def _decayed(name: str, now: float) -> Optional[float]:
+    entry = _tier_latency.get(name)
+    if entry is None:
+        return None
+    seconds, updated = entry
+    excess = seconds - LLM_MIN_ATTEMPT_SECONDS
+    if excess <= 0 or LLM_LATENCY_HALF_LIFE_SECONDS <= 0:
+        return seconds
+    return LLM_MIN_ATTEMPT_SECONDS + excess * 0.5 ** ((now - updated) / LLM_LATENCY_HALF_LIFE_SECONDS)
+
+
+def record_latency(name: str, seconds: float) -> None:
+    now = time.monotonic()
+    with _latency_lock:
+        previous = _decayed(name, now)
+        average = seconds if previous is None else previous + _LATENCY_ALPHA * (seconds - previous)
+        _tier_latency[name] = (average, now)
+
+
+def expected_seconds(tier) -> float:
+    now = time.monotonic()
+    with _latency_lock:
+        return max(LLM_MIN_ATTEMPT_SECONDS, _decayed(tier_name(tier), now) or 0.0)
+
+
+def tier_latencies() -> dict:
+    """Moving-average latency per tier in this worker, in seconds, as of now."""
+    now = time.monotonic()
+    with _latency_lock:
+        return {name: round(_decayed(name, now), 2) for name in _tier_latency}
+
+
+class _DeadlineTier(Runnable):
+    """One attempt in a DeadlineFallbacks chain; times the tier and caps it at the time left."""
+
+    def __init__(self, tier):
+        self.tier = tier
+
+    def invoke(self, input, config=None, **kwargs):
+        started = time.monotonic()
+        output = self.tier.invoke(input, config, **kwargs)
+        record_latency(tier_name(self.tier), time.monotonic() - started)
+        return output
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        name = tier_name(self.tier)
+        given = deadlines.remaining()
+        started = time.monotonic()
+        try:
+            output = await asyncio.wait_for(self.tier.ainvoke(input, config, **kwargs), given)
+        except asyncio.TimeoutError:
+            # Cut off, not finished: it was at least as slow as the time it was given.
+            record_latency(name, given)
+            raise deadlines.DeadlineExceeded(f"{name} did not answer within the request deadline")
+        elapsed = time.monotonic() - started
+        record_latency(name, elapsed if given is None else min(elapsed, given))
+        return output
+
+
+class DeadlineFallbacks(RunnableWithFallbacks):
+    """
+    `with_fallbacks()` under the request deadline: tiers whose usual latency
+    doesn't fit in the time left are skipped, each attempt is capped at the
+    time left, and a chain that ran out of time raises DeadlineExceeded.
+    If every tier was skipped but some time is left, the one expected to be
+    fastest is still tried. Outside a request (no deadline) it behaves like
+    plain fallbacks.
+    """
+
+    @property
+    def runnables(self):
+        tried = False
+        for tier in super().runnables:
+            left = deadlines.remaining()
+            if left is not None and left < expected_seconds(tier):
+                logger.warning(f"Deadline: skipping {tier_name(tier)} ({left:.1f}s left, needs ~{expected_seconds(tier):.1f}s)")
+                continue
+            tried = True
+            yield _DeadlineTier(tier)
+        left = deadlines.remaining()
+        if not tried and left is not None and left > 0:
+            yield _DeadlineTier(min(super().runnables, key=expected_seconds))
+
+    def _out_of_time(self) -> bool:
+        left = deadlines.remaining()
+        return left is not None and all(left < expected_seconds(tier) for tier in super().runnables)
+
+    def _deadline_error(self) -> "deadlines.DeadlineExceeded":
+        deadlines.note_cut("llm")
+        return deadlines.DeadlineExceeded("No LLM tier could answer within the request deadline")
+
+    def invoke(self, input, config=None, **kwargs):
+        try:
+            return super().invoke(input, config, **kwargs)
+        except Exception as e:
+            if self._out_of_time():
+                raise self._deadline_error() from e
+            raise
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        try:
+            return await super().ainvoke(input, config, **kwargs)
+        except Exception as e:
+            if self._out_of_time():
+                raise self._deadline_error() from e
+            raise
+
+
 def get_llm():
     """
-    Returns an LLM instance with a robust multi-tier fallback chain.
+    Returns the process-wide LLM, building it on first call.
+    Provider SDKs are imported only then, so importing this module is cheap
+    and every caller in the worker shares the same clients.
+    """
+    return _get_or_build("default", _build_llm)
+
+
+def get_summary_llm():
+    """
+    Returns a small, cheap model for background work such as summarising
+    old conversation turns. Falls back to the main chain if none is configured.
+    """
+    return _get_or_build("summary", _build_summary_llm)
+
+
+def is_llm_ready() -> bool:
+    """True once the shared LLM has been built in this process."""
+    return "default" in _registry
+
+
+def _chain(fallback_chain: list):
+    """The first model is the primary, the rest are fallbacks, all within the request deadline."""
+    return DeadlineFallbacks(runnable=fallback_chain[0], fallbacks=fallback_chain[1:])
+
+
+def _build_summary_llm():
+    fallback_chain = []
+
+    groq_key = os.getenv("GROQ_API_KEY")
+    if groq_key:
+        try:
+            from langchain_groq import ChatGroq
+            fallback_chain.append(ChatGroq(
+                groq_api_key=groq_key,
+                model_name="llama-3.1-8b-instant",
+                temperature=0,
+                max_retries=1,
+                **_http_kwargs()
+            ))
+        except Exception as e:
+            logger.error(f"Failed to load Groq summary model: {e}")
+
+    openrouter_key = os.getenv("OPENROUTER_API_KEY")
+    if openrouter_key:
+        try:
+            from langchain_openai import ChatOpenAI
+            fallback_chain.append(ChatOpenAI(
+                base_url="https://openrouter.ai/api/v1",
+                api_key=openrouter_key,
+                model="google/gemini-2.0-flash-lite-001",
+                temperature=0,
+                default_headers={"HTTP-Referer": "https://cv-buddy.ai", "X-Title": "CV Buddy"},
+                **_http_kwargs()
+            ))
+        except Exception as e:
+            logger.error(f"Failed to load OpenRouter summary model: {e}")
+
+    if not fallback_chain:
+        logger.info("No cheap summary model configured; using the main chain.")
+        return get_llm()
+
+    logger.info(f"Configuring summary LLM with {len(fallback_chain)} stage(s).")
+    return _chain(fallback_chain)
+
+
+def _build_llm():
+    """
+    Builds an LLM instance with a robust multi-tier fallback chain.
     Tier 1: Groq (Primary)
     Tier 2: Google Gemini (Native)
     Tier 3: OpenRouter (Stability Backup)
@@ -29,14 +415,16 @@ def get_llm():
                 groq_api_key=groq_key,
                 model_name="llama-3.3-70b-versatile",
                 temperature=0.7,
-                max_retries=1
+                max_retries=1,
+                **_http_kwargs()
             ))
             # Secondary Qwen 2.5 (High Performance)
             fallback_chain.append(ChatGroq(
                 groq_api_key=groq_key,
                 model_name="qwen-2.5-32b",
                 temperature=0.7,
-                max_retries=1
+                max_retries=1,
+                **_http_kwargs()
             ))
             logger.info("Tier 1 (Groq Models) added to chain.")
         except Exception as e:
@@ -47,6 +435,7 @@ def get_llm():
     if gemini_key:
         try:
             from langchain_google_genai import ChatGoogleGenerativeAI
+            # Google's SDK brings its own transport; it can't use the shared httpx clients.
             fallback_chain.append(ChatGoogleGenerativeAI(
                 model="gemini-1.5-flash",
                 google_api_key=gemini_key,
@@ -67,7 +456,8 @@ def get_llm():
                 api_key=openrouter_key,
                 model="google/gemini-2.0-flash-lite-001",
                 temperature=0.7,
-                default_headers={"HTTP-Referer": "https://cv-buddy.ai", "X-Title": "CV Buddy"}
+                default_headers={"HTTP-Referer": "https://cv-buddy.ai", "X-Title": "CV Buddy"},
+                **_http_kwargs()
             ))
             
             # Tier 4 (Power Free Pool & Specific User Requests)
@@ -86,7 +476,8 @@ def get_llm():
                     api_key=openrouter_key,
                     model=model_id,
                     temperature=0.7,
-                    default_headers={"HTTP-Referer": "https://cv-buddy.ai", "X-Title": "CV Buddy"}
+                    default_headers={"HTTP-Referer": "https://cv-buddy.ai", "X-Title": "CV Buddy"},
+                    **_http_kwargs()
                 ))
             
             logger.info(f"OpenRouter Tiers added to chain ({len(user_requested_models) + 1} models).")
@@ -97,10 +488,8 @@ def get_llm():
         raise ValueError("No valid LLM API keys found. Please set GROQ_API_KEY, GEMINI_API_KEY, or OPENROUTER_API_KEY.")
 
     if len(fallback_chain) == 1:
-        logger.info(f"Using single model: {fallback_chain[0].model_name if hasattr(fallback_chain[0], 'model_name') else 'LLM'}")
-        return fallback_chain[0]
-    
+        logger.info(f"Using single model: {tier_name(fallback_chain[0])}")
+        return _chain(fallback_chain)
+
     logger.info(f"Configuring LLM with {len(fallback_chain)} fallback stages.")
-    # The first model is the primary, the rest are fallbacks
-    primary = fallback_chain[0]
-    return primary.with_fallbacks(fallback_chain[1:])
+    return _chain(fallback_chain)
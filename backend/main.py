@@ -6,17 +6,33 @@ import json
 import asyncio
 from functools import lru_cache
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, status, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header, status, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import deadlines
+
+# ---------------------------------------------------------------------------
+# Request deadline — every request runs under a time budget (header or route
+# default) that LLM and OCR calls check; see deadlines.py
+# ---------------------------------------------------------------------------
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        seconds = deadlines.budget_for(request.url.path, request.headers.get(deadlines.DEADLINE_HEADER))
+        with deadlines.deadline(seconds) as budget:
+            response = await call_next(request)
+        if budget.cut:
+            response.headers[deadlines.PARTIAL_HEADER] = ",".join(budget.cut)
+        return response
+
 # ---------------------------------------------------------------------------
 # Security Headers Middleware
 # ---------------------------------------------------------------------------
@@ -27,21 +43,76 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["X-Frame-Options"] = "SAMEORIGIN"
         response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Cache-Control"] = "public, max-age=3600"
-        # ✅ Enable gzip compression via header
-        response.headers["Content-Encoding"] = "gzip"
+        # Routes that set their own caching policy (e.g. exports) keep it.
+        response.headers.setdefault("Cache-Control", "public, max-age=3600")
+        # Compression is done by GZipMiddleware; never claim gzip on a plain body.
         return response
 
 # ---------------------------------------------------------------------------
 # Lifespan — opens / closes the SQLite checkpointer cleanly
 # ---------------------------------------------------------------------------
-from agent import init_checkpointer, close_checkpointer
+from agent import init_checkpointer, close_checkpointer, warm_up
+import database
+import ocr_service
+import llm_factory
+import extraction_sessions
+import cv_library
+import memory_diagnostics
+
+# Flipped by the warm-up task; /ready reports 503 until then.
+_ready = False
+
+
+async def _warm_up() -> None:
+    """Builds the LLM clients, agent graph and OCR engine off the event loop."""
+    global _ready
+    try:
+        await asyncio.to_thread(warm_up)
+        await asyncio.to_thread(ocr_service.warm_up)
+        _ready = True
+        print("✅ Worker warm-up complete")
+    except Exception as e:
+        print(f"WARM-UP ERROR: {e}")
+
+
+# Seconds between sweeps of expired extraction sessions.
+SESSION_PURGE_INTERVAL = int(os.getenv("EXTRACTION_SESSION_PURGE_INTERVAL", "600"))
+
+
+def _purge_sessions_once() -> None:
+    db = database.SessionLocal()
+    try:
+        deleted = extraction_sessions.purge_expired(db)
+        if deleted:
+            print(f"🧹 Purged {deleted} expired extraction documents")
+    finally:
+        db.close()
+
+
+async def _purge_sessions() -> None:
+    """Deletes expired extraction sessions. Reads check expiry too, so this only frees space."""
+    while True:
+        await asyncio.sleep(SESSION_PURGE_INTERVAL)
+        try:
+            await asyncio.to_thread(_purge_sessions_once)
+        except Exception as e:
+            print(f"SESSION PURGE ERROR: {e}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_checkpointer()   # ✅ runs BEFORE first request
+    # Schema creation normally runs once per deploy (init_db.py);
+    # DB_AUTO_CREATE=true keeps the old behaviour for local development.
+    if os.getenv("DB_AUTO_CREATE", "false").lower() == "true":
+        await asyncio.to_thread(database.init_db)
+    warm_up_task = asyncio.create_task(_warm_up())
+    purge_task = asyncio.create_task(_purge_sessions())
     yield
+    warm_up_task.cancel()
+    purge_task.cancel()
     await close_checkpointer()  # ✅ runs on shutdown
+    await llm_factory.close_http_clients()
 
 # ---------------------------------------------------------------------------
 # App
@@ -50,6 +121,9 @@ app = FastAPI(lifespan=lifespan)  # 🔑 must pass lifespan here
 
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(DeadlineMiddleware)
+# ✅ Real gzip compression for responses over 1 KB
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "*")
 app.add_middleware(
@@ -58,24 +132,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[deadlines.PARTIAL_HEADER],
 )
 
+
+@app.exception_handler(deadlines.DeadlineExceeded)
+async def deadline_exceeded(request, exc):
+    return JSONResponse(status_code=504, content={"detail": f"Request took too long: {exc}"})
+
 # ---------------------------------------------------------------------------
 # Lazy imports (after app is created to avoid circular issues)
 # ---------------------------------------------------------------------------
 from llm_factory import get_llm
-from agent import get_agent_response
+from agent import get_agent_response, compact_thread, seed_cv, checkpoint_stats
 from ocr_service import get_available_engines, extract_text_from_pdf, extract_text_from_image
-
-llm = get_llm()
+from image_preprocessing import PreprocessOptions
+from extraction import Document, extract_documents, refine_fields
+from export_service import MEDIA_TYPES, iter_export
+from cv_import import import_cv_text
+from turns import TurnScheduler, TurnQueueFull
+import sentiment
+import cv_polish
 
 # ---------------------------------------------------------------------------
 # Auth / DB
 # ---------------------------------------------------------------------------
 from sqlalchemy.orm import Session
-import models, auth, database
-
-models.Base.metadata.create_all(bind=database.engine)
+import models, auth
 
 # ---------------------------------------------------------------------------
 # Schemas
@@ -96,6 +179,9 @@ class Token(BaseModel):
 class CVSaveRequest(BaseModel):
     content: dict
     filename: str = "My CV"
+    # Update this CV; or, with as_new, add another. Neither: overwrite the latest.
+    id: Optional[int] = None
+    as_new: bool = False
 
 class UserCreate(BaseModel):
     email: str
@@ -116,34 +202,130 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
-class TextInput(BaseModel):
+class AnalyzeRequest(BaseModel):
     text: str
+    # "auto": local classifier, LLM when unsure; "local" / "llm" force one.
+    mode: str = "auto"
 
 class ImproveRequest(BaseModel):
     text: str
     section: str = "general"
 
+class CVPolishRequest(BaseModel):
+    cv: Dict[str, Any]
+    # Hashes returned by earlier polish runs; fields whose text still matches are skipped.
+    polished_hashes: List[str] = []
+
 class ExtractedData(BaseModel):
     filename: str
     summary: str
     fields: Dict[str, Any]
     raw_text: str
 
+# ---------------------------------------------------------------------------
+# /ready  (readiness probe — 200 only after warm-up, once the LLM is built)
+# ---------------------------------------------------------------------------
+
+@app.get("/ready")
+async def readiness():
+    if not (_ready and llm_factory.is_llm_ready()):
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+
+# ---------------------------------------------------------------------------
+# /llm/stats, /debug/memory  (per-worker diagnostics, admin token required)
+# ---------------------------------------------------------------------------
+
+TRACEMALLOC_GROUPINGS = ("lineno", "filename", "traceback")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias=memory_diagnostics.ADMIN_HEADER)):
+    if not memory_diagnostics.admin_token_matches(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def require_memory_admin(x_admin_token: Optional[str] = Header(None, alias=memory_diagnostics.ADMIN_HEADER)):
+    # /debug/memory* are also opt-in: tracemalloc slows the whole worker.
+    if not memory_diagnostics.MEMORY_DIAGNOSTICS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    require_admin(x_admin_token)
+
+
+@app.get("/llm/stats", dependencies=[Depends(require_admin)])
+async def llm_http_stats():
+    """Connection reuse on the shared LLM HTTP clients and per-tier latency, for this worker since start."""
+    return {**llm_factory.connection_stats.snapshot(), "tier_latency": llm_factory.tier_latencies()}
+
+
+def _grouping(group_by: str) -> str:
+    if group_by not in TRACEMALLOC_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(TRACEMALLOC_GROUPINGS)}")
+    return group_by
+
+
+@app.get("/debug/memory", dependencies=[Depends(require_memory_admin)])
+async def memory_gauges(threads: int = 10):
+    """RSS, Python heap and conversation checkpoint sizes for the worker that answers."""
+    return memory_diagnostics.gauges(checkpoint_stats(top=threads))
+
+
+@app.post("/debug/memory/tracemalloc/start", dependencies=[Depends(require_memory_admin)])
+async def start_tracemalloc(frames: int = memory_diagnostics.TRACEMALLOC_FRAMES):
+    return memory_diagnostics.start_tracing(frames)
+
+
+@app.post("/debug/memory/tracemalloc/stop", dependencies=[Depends(require_memory_admin)])
+async def stop_tracemalloc():
+    return memory_diagnostics.stop_tracing()
+
+
+@app.get("/debug/memory/tracemalloc/top", dependencies=[Depends(require_memory_admin)])
+async def tracemalloc_top(limit: int = 20, group_by: str = "lineno"):
+    try:
+        return memory_diagnostics.top_allocations(limit, _grouping(group_by))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/debug/memory/tracemalloc/diff", dependencies=[Depends(require_memory_admin)])
+async def tracemalloc_diff(limit: int = 20, group_by: str = "lineno"):
+    """Growth since the previous diff (or since tracing started)."""
+    try:
+        return memory_diagnostics.diff_since_baseline(limit, _grouping(group_by))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 # ---------------------------------------------------------------------------
 # /chat
 # ---------------------------------------------------------------------------
 
+async def _run_chat_turn(thread_id: str, messages: List[str]) -> dict:
+    # Messages sent while the previous turn was running are answered together.
+    return await get_agent_response(user_message="\n\n".join(messages), thread_id=thread_id)
+
+
+# One turn at a time per thread; see turns.py.
+chat_turns = TurnScheduler(_run_chat_turn)
+
+
+def _internal_thread_id(current_user: Optional[models.User], thread_id: Optional[str]) -> str:
+    # Use user ID to isolate history if they are logged in.
+    # This ensures that even if two users have the same local thread_id,
+    # their data is perfectly separated on the server.
+    user_prefix = f"user_{current_user.id}_" if current_user else "guest_"
+    return f"{user_prefix}{thread_id or 'default'}"
+
+
 @app.post("/chat")
 async def chat_with_agent(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: Optional[models.User] = Depends(auth.get_current_user_optional)
 ):
     try:
-        # 1) Use user ID to isolate history if they are logged in.
-        # This ensures that even if two users have the same local thread_id,
-        # their data is perfectly separated on the server.
-        user_prefix = f"user_{current_user.id}_" if current_user else "guest_"
-        internal_thread_id = f"{user_prefix}{request.thread_id or 'default'}"
+        internal_thread_id = _internal_thread_id(current_user, request.thread_id)
 
         # Find the last user message — only this gets sent to the agent.
         # The checkpointer already holds prior history; re-sending it would duplicate it.
@@ -160,19 +342,25 @@ async def chat_with_agent(
                 "download": None,
             }
 
-        # ✅ Correct signature: just a string + thread_id
-        result = await get_agent_response(
-            user_message=last_user_msg.content,
-            thread_id=internal_thread_id,
-        )
+        result = await chat_turns.submit(internal_thread_id, last_user_msg.content)
+
+        # Fold old turns into the thread summary after the reply is sent.
+        # Its write takes agent.thread_lock, so it can't interleave with a turn.
+        background_tasks.add_task(compact_thread, internal_thread_id)
 
         return {
             "role": "assistant",
             "content": result["reply"],
             "cv_update": result["cv_update"],   # dict or None
             "download": result["download"],      # path string or None
+            # Messages this reply answers (more than 1 if sent while a reply was pending).
+            "coalesced": result["coalesced"],
         }
 
+    except TurnQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Please wait for a reply: {e}", headers={"Retry-After": "2"})
+    except deadlines.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"CHAT ERROR: {e}")
         raise HTTPException(status_code=500, detail=f"AI Agent Error: {str(e)}")
@@ -196,23 +384,61 @@ async def list_ocr_engines():
 async def upload_files(
     files: List[UploadFile] = File(...),
     schema: str = Form(None),
-    ocr_engine: str = Form("tesseract"),
+    ocr_engine: str = Form("auto"),
+    preprocess: str = Form(None),
+    db: Session = Depends(database.get_db),
 ):
-    tasks = [process_single_file(f, schema, ocr_engine) for f in files]
-    results = await asyncio.gather(*tasks)
-    return results
+    # "default", "fast", "none", or a JSON object of PreprocessOptions fields.
+    # Unset means each OCR engine uses its own preprocessing.
+    try:
+        preprocess_options = PreprocessOptions.from_spec(preprocess) if preprocess else None
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid preprocess options: {e}")
 
+    ocr_results = await asyncio.gather(
+        *(ocr_single_file(f, ocr_engine, preprocess_options) for f in files)
+    )
 
-async def process_single_file(
-    file: UploadFile, schema: str = None, ocr_engine: str = "tesseract"
+    # Documents with text go to the LLM together, packed into as few prompts as fit.
+    docs = [
+        Document(id=f"doc{i}", filename=r["filename"], text=r["raw_text"])
+        for i, r in enumerate(ocr_results) if r["summary"] is None
+    ]
+    extracted = iter(await extract_documents(docs, schema))
+    results = [next(extracted) if r["summary"] is None else r for r in ocr_results]
+
+    # Full text stays server-side; the client gets a preview and refers to
+    # documents by (session_id, position) from then on.
+    session_id, expires_at = extraction_sessions.create_session(db, results)
+    return {
+        "session_id": session_id,
+        "expires_at": expires_at.isoformat(),
+        # True if OCR or extraction stopped early to stay within the deadline.
+        "partial": bool(deadlines.cut_short()),
+        "results": [
+            extraction_sessions.preview(result, session_id, i)
+            for i, result in enumerate(results)
+        ],
+    }
+
+
+async def ocr_single_file(
+    file: UploadFile,
+    ocr_engine: str = "auto",
+    preprocess: Optional[PreprocessOptions] = None,
 ) -> dict:
+    """
+    Reads and OCRs one upload. Returns the text as `raw_text` with `summary`
+    None, or a finished error result.
+    """
     try:
         content = await file.read()
 
         if file.content_type.startswith("image/"):
-            text = extract_text_from_image(content, engine=ocr_engine)
+            # OCR is CPU-bound; keep it off the event loop.
+            text = await asyncio.to_thread(extract_text_from_image, content, ocr_engine, preprocess)
         elif file.content_type == "application/pdf":
-            text = extract_text_from_pdf(content, engine=ocr_engine)
+            text = await asyncio.to_thread(extract_text_from_pdf, content, ocr_engine, preprocess)
         else:
             return {"filename": file.filename, "summary": "Error",
                     "fields": {"error": "Unsupported file type"}, "raw_text": ""}
@@ -221,123 +447,105 @@ async def process_single_file(
             return {"filename": file.filename, "summary": "Error",
                     "fields": {"error": "No text extracted"}, "raw_text": ""}
 
-        if schema:
-            instruction_text = (
-                f"Extract SPECIFICALLY the following fields: {schema}. "
-                "Do not invent fields not asked for. "
-                "Each requested field MUST be its own separate key in the 'fields' dictionary."
-            )
-        else:
-            instruction_text = (
-                "Identify ALL distinct entities such as Names, Dates, Amounts, Addresses, "
-                "Phone Numbers, Invoice Numbers, Vendor Names, Items, Quantities, Totals, "
-                "and any other distinct fields. "
-                "CRITICAL: Each piece of information MUST be its own SEPARATE key in the 'fields' dictionary. "
-                "Do NOT combine multiple values into a single key or a single text blob."
-            )
-
-        system_prompt = f"""You are an AI data extraction assistant.
-Analyze the following text extracted from a document.
-{instruction_text}
-Return ONLY valid JSON. No markdown, no explanation.
-Structure:
-{{{{
-    "summary": "Brief one-line summary of the document",
-    "fields": {{{{
-        "field_name_1": "value_1",
-        "field_name_2": "value_2"
-    }}}}
-}}}}"""
-
-        chain = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{text}"),
-        ]) | llm
-
-        result = await chain.ainvoke({"text": text})
-
-        cleaned = result.content.strip().removeprefix("```json").removesuffix("```").strip()
-        try:
-            data = json.loads(cleaned)
-            return {
-                "filename": file.filename,
-                "summary": data.get("summary", ""),
-                "fields": data.get("fields", {}),
-                "raw_text": text,
-            }
-        except Exception:
-            return {
-                "filename": file.filename,
-                "summary": "Error parsing LLM response",
-                "fields": {"raw_response": result.content},
-                "raw_text": text,
-            }
+        return {"filename": file.filename, "summary": None, "fields": {}, "raw_text": text}
 
     except Exception as e:
         return {"filename": file.filename, "summary": "Processing Error",
                 "fields": {"error": str(e)}, "raw_text": ""}
 
 
+# ---------------------------------------------------------------------------
+# /export  (streaming CSV / XLSX of extraction results)
+# ---------------------------------------------------------------------------
+
+class ExportItem(BaseModel):
+    filename: str
+    summary: str = ""
+    fields: Dict[str, Any] = {}
+
+class ExportRequest(BaseModel):
+    # Either an /upload session id, or the results themselves.
+    session_id: Optional[str] = None
+    results: Optional[List[ExportItem]] = None
+    format: str = "csv"
+
+
+@app.post("/export")
+async def export_results(request: ExportRequest, db: Session = Depends(database.get_db)):
+    if request.format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'xlsx'")
+
+    if request.session_id:
+        rows = extraction_sessions.session_results(db, request.session_id)
+        if rows is None:
+            raise HTTPException(status_code=404, detail="Extraction session not found or expired")
+    elif request.results is not None:
+        rows = [item.model_dump() for item in request.results]
+    else:
+        raise HTTPException(status_code=400, detail="Provide session_id or results")
+    filename = f"extraction_{datetime.datetime.now():%Y%m%d_%H%M%S}.{request.format}"
+    return StreamingResponse(
+        iter_export(rows, request.format),
+        media_type=MEDIA_TYPES[request.format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
+
+
 class RefineRequest(BaseModel):
-    current_data: Dict[str, Any]
-    raw_text: str
     instructions: str
+    # Session documents: text (and, unless overridden, fields) come from the server.
+    session_id: Optional[str] = None
+    document: int = 0
+    # Without a session the client sends everything, as before.
+    current_data: Optional[Dict[str, Any]] = None
+    raw_text: Optional[str] = None
+    summary: Optional[str] = None
 
 # ---------------------------------------------------------------------------
 # /refine (Intelligent correction)
 # ---------------------------------------------------------------------------
 
 @app.post("/refine")
-async def refine_extraction(request: RefineRequest):
-    try:
-        system_prompt = f"""You are an expert data refinement assistant.
-Your goal is to correct and improve structured data based on user instructions and the raw text provided.
-
-CURRENT DATA:
-{json.dumps(request.current_data, indent=2)}
-
-USER INSTRUCTIONS:
-{request.instructions}
-
-RAW DOCUMENT TEXT:
-{request.raw_text}
-
-Analyze the instructions and the raw text to produce a CORRECTED version of the 'fields' and 'summary'.
-Return ONLY valid JSON. No markdown, no explanation.
-Structure:
-{{{{
-    "summary": "Brief updated summary",
-    "fields": {{{{
-        "key": "updated_value"
-    }}}}
-}}}}"""
-
-        chain = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Refine the extraction based on my instructions."),
-        ]) | llm
-
-        result = await chain.ainvoke({})
-        cleaned = result.content.strip().removeprefix("```json").removesuffix("```").strip()
-        return json.loads(cleaned)
+async def refine_extraction(request: RefineRequest, db: Session = Depends(database.get_db)):
+    doc = None
+    if request.session_id:
+        doc = extraction_sessions.get_document(db, request.session_id, request.document)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="Extraction session not found or expired")
+        fields = request.current_data if request.current_data is not None else extraction_sessions.document_fields(doc)
+        summary = request.summary if request.summary is not None else doc.summary
+        raw_text = extraction_sessions.document_text(doc)
+    elif request.current_data is not None and request.raw_text is not None:
+        fields, summary, raw_text = request.current_data, request.summary, request.raw_text
+    else:
+        raise HTTPException(status_code=400, detail="Provide session_id, or current_data and raw_text")
 
+    try:
+        refined = await refine_fields(fields, raw_text, request.instructions, summary)
+    except deadlines.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"REFINE ERROR: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    if doc is not None:
+        extraction_sessions.update_document(db, doc, refined["summary"], refined["fields"])
+    return refined
+
 
 # ---------------------------------------------------------------------------
 # /analyze  (sentiment)
 # ---------------------------------------------------------------------------
 
 @app.post("/analyze")
-async def analyze_sentiment(data: TextInput):
-    chain = ChatPromptTemplate.from_messages([
-        ("system", "You are a sentiment analysis assistant. Reply with only one word: Positive, Neutral, or Negative."),
-        ("human", "Text: {text}"),
-    ]) | llm
-    result = await chain.ainvoke({"text": data.text})
-    return {"sentiment": result.content.strip()}
+async def analyze_sentiment(data: AnalyzeRequest):
+    """Local lexicon classifier first; low-confidence texts go to the LLM (see sentiment.py)."""
+    if data.mode not in sentiment.MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(sentiment.MODES)}")
+    return await sentiment.analyze(data.text, data.mode)
 
 
 # ---------------------------------------------------------------------------
@@ -354,11 +562,76 @@ Return ONLY the improved text, no explanations."""
     chain = ChatPromptTemplate.from_messages([
         ("system", system_prompt),
         ("human", "{text}"),
-    ]) | llm
+    ]) | get_llm()
     result = await chain.ainvoke({"text": request.text})
     return {"improved_text": result.content.strip()}
 
 
+@app.post("/cv/improve/batch")
+async def improve_cv_batch(request: CVPolishRequest):
+    """
+    Polishes every free-text field of a CV (agent schema) in a few
+    concurrent, section-grouped LLM calls. Streams NDJSON, one line per
+    field as it finishes ({"path", "improved_text", "hash"}, {"path",
+    "skipped"} or {"path", "error"}), then {"done": true, ...counts}.
+    """
+    try:
+        fields = cv_polish.collect_fields(request.cv)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        async for event in cv_polish.polish_fields(fields, request.polished_hashes):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-store",
+            # Deliver each line as it is written: no gzip or nginx buffering.
+            "Content-Encoding": "identity",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+# ---------------------------------------------------------------------------
+# /cv/import  (existing CV file -> CV Builder data)
+# ---------------------------------------------------------------------------
+
+@app.post("/cv/import")
+async def import_cv(
+    file: UploadFile = File(...),
+    thread_id: Optional[str] = Form(None),
+    ocr_engine: str = Form("auto"),
+    current_user: Optional[models.User] = Depends(auth.get_current_user_optional),
+):
+    """
+    OCRs an uploaded CV and extracts it in one pass. Returns `cv_update` like
+    /chat does; with a thread_id the chat thread's CV state is updated too.
+    """
+    ocr = await ocr_single_file(file, ocr_engine)
+    if ocr["summary"] is not None:
+        raise HTTPException(status_code=422, detail=ocr["fields"].get("error", "Could not read file"))
+
+    try:
+        cv_update = await import_cv_text(ocr["raw_text"])
+    except deadlines.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"CV IMPORT ERROR: {e}")
+        raise HTTPException(status_code=500, detail=f"CV import failed: {e}")
+
+    if not cv_update:
+        raise HTTPException(status_code=422, detail="No CV data found in the file")
+
+    if thread_id:
+        await seed_cv(_internal_thread_id(current_user, thread_id), cv_update)
+
+    return {"filename": file.filename, "cv_update": cv_update, "partial": bool(deadlines.cut_short())}
+
+
 # ---------------------------------------------------------------------------
 # Auth routes
 # ---------------------------------------------------------------------------
@@ -422,25 +695,29 @@ async def save_cv(
     current_user: models.User = Depends(auth.get_current_user),
 ):
     content_str = json.dumps(cv_data.content)
-    existing = (
-        db.query(models.CV)
-        .filter(models.CV.user_id == current_user.id)
-        .order_by(models.CV.created_at.desc())
-        .first()
-    )
+    if cv_data.id is not None:
+        existing = cv_library.get_cv(db, current_user.id, cv_data.id)
+        if existing is None:
+            raise HTTPException(status_code=404, detail="CV not found")
+    elif cv_data.as_new:
+        existing = None
+    else:
+        existing = cv_library.latest_cv(db, current_user.id, with_content=False)
 
     if existing:
         existing.content = content_str
         existing.filename = cv_data.filename
+        cv = existing
     else:
-        db.add(models.CV(
+        cv = models.CV(
             user_id=current_user.id,
             filename=cv_data.filename,
             content=content_str,
-        ))
+        )
+        db.add(cv)
 
     db.commit()
-    return {"status": "success", "message": "CV saved successfully"}
+    return {"status": "success", "message": "CV saved successfully", "id": cv.id}
 
 
 @app.get("/cv/load")
@@ -448,14 +725,38 @@ async def load_cv(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    cv = (
-        db.query(models.CV)
-        .filter(models.CV.user_id == current_user.id)
-        .order_by(models.CV.created_at.desc())
-        .first()
-    )
+    cv = cv_library.latest_cv(db, current_user.id)
 
     if not cv or not cv.content:
         return {"content": None}
 
-    return {"content": json.loads(cv.content), "filename": cv.filename}
\ No newline at end of file
+    return {"content": cv_library.cv_content(cv), "filename": cv.filename, "id": cv.id}
+
+
+@app.get("/cv/list")
+async def list_cvs(
+    limit: int = cv_library.DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """The user's CVs, newest first, metadata only. Pass `next_cursor` back to page."""
+    try:
+        cvs, next_cursor = cv_library.list_cvs(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"items": [cv_library.metadata(cv) for cv in cvs], "next_cursor": next_cursor}
+
+
+@app.get("/cv/{cv_id}")
+async def get_cv(
+    cv_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    cv = cv_library.get_cv(db, current_user.id, cv_id)
+    if cv is None:
+        raise HTTPException(status_code=404, detail="CV not found")
+
+    return {**cv_library.metadata(cv), "content": cv_library.cv_content(cv)}
@@ -0,0 +1,141 @@
+"""
+Opt-in memory diagnostics for long-lived workers.
+
+Gauges (RSS, Python heap, conversation checkpoints) are cheap and can be
+read at any time; tracemalloc is only started on request, since tracing
+every allocation slows the worker down. Everything is per worker process:
+call repeatedly (or hit the worker port directly) to see each one.
+
+Enabled by MEMORY_DIAGNOSTICS=1, and the endpoints require
+MEMORY_ADMIN_TOKEN in the X-Admin-Token header.
+"""
+import os
+import gc
+import sys
+import hmac
+import resource
+import threading
+import tracemalloc
+from typing import Optional
+
+MEMORY_DIAGNOSTICS = os.getenv("MEMORY_DIAGNOSTICS", "0") == "1"
+ADMIN_TOKEN = os.getenv("MEMORY_ADMIN_TOKEN", "")
+ADMIN_HEADER = "X-Admin-Token"
+# Frames kept per traced allocation; more frames, more overhead.
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_baseline: Optional[tracemalloc.Snapshot] = None
+_lock = threading.Lock()
+
+
+def admin_token_matches(token: Optional[str]) -> bool:
+    """True if an admin token is configured and `token` matches it."""
+    if not (ADMIN_TOKEN and token):
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def token_valid(token: Optional[str]) -> bool:
+    """True if diagnostics are on and `token` matches the admin token."""
+    return MEMORY_DIAGNOSTICS and admin_token_matches(token)
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux); elsewhere the peak, which is all that's available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def heap_stats() -> dict:
+    stats = {
+        "allocated_blocks": sys.getallocatedblocks(),
+        "gc_objects": len(gc.get_objects()),
+        "gc_counts": list(gc.get_count()),
+        "tracing": tracemalloc.is_tracing(),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        stats.update(traced_bytes=current, traced_peak_bytes=peak)
+    return stats
+
+
+def gauges(checkpoints: Optional[dict] = None) -> dict:
+    """Point-in-time memory readings for this worker."""
+    result = {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "heap": heap_stats(),
+    }
+    if checkpoints is not None:
+        result["checkpoints"] = checkpoints
+    return result
+
+
+# ---------- tracemalloc ----------
+
+def start_tracing(frames: int = TRACEMALLOC_FRAMES) -> dict:
+    """Starts tracing (if needed) and takes the baseline that diffs compare against."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _baseline = tracemalloc.take_snapshot()
+        return {"pid": os.getpid(), "tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+def stop_tracing() -> dict:
+    global _baseline
+    with _lock:
+        _baseline = None
+        tracemalloc.stop()
+        return {"pid": os.getpid(), "tracing": False}
+
+
+def _stat(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+
+
+def top_allocations(limit: int = 20, group_by: str = "lineno") -> dict:
+    """Largest live allocations since tracing started, grouped by line or file."""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running; start it first")
+    snapshot = tracemalloc.take_snapshot()
+    return {
+        "pid": os.getpid(),
+        "top": [_stat(stat) for stat in snapshot.statistics(group_by)[:limit]],
+    }
+
+
+def diff_since_baseline(limit: int = 20, group_by: str = "lineno") -> dict:
+    """Allocation growth since the baseline, biggest first. Then makes the current snapshot the baseline."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing() or _baseline is None:
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = tracemalloc.take_snapshot()
+        changes = snapshot.compare_to(_baseline, group_by)
+        _baseline = snapshot
+    return {
+        "pid": os.getpid(),
+        "size_diff_bytes": sum(stat.size_diff for stat in changes),
+        "top": [
+            {**_stat(stat), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+            for stat in changes[:limit]
+        ],
+    }
@@ -0,0 +1,51 @@
+"""
+Alembic environment.
+
+Tables are created by `Base.metadata.create_all` (see database.init_db), so a
+fresh database already matches the models; revisions here change tables that
+existing deployments created earlier, and must be safe to run on both.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+import database
+import models  # noqa: F401 — registers the tables on Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = database.Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=database.SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # init_db passes its own connection; the alembic CLI uses the app engine.
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+    else:
+        with database.engine.connect() as connection:
+            _run(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,22 @@
+"""Composite (user_id, created_at) index on cvs for the CV library listing
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_cvs_user_id_created_at", "cvs", ["user_id", "created_at"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cvs_user_id_created_at", table_name="cvs", if_exists=True)
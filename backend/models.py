@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, LargeBinary, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from database import Base
 
@@ -21,14 +21,30 @@ class User(Base):
 
 class CV(Base):
     __tablename__ = "cvs"
+    # Serves per-user listings newest-first (migration 0001 adds it to existing databases).
+    __table_args__ = (Index("ix_cvs_user_id_created_at", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("KBIT_Users.id"))
     filename = Column(String, nullable=True)
-    content = Column(Text, nullable=True)
+    # Deferred: only loaded when a query asks for it with undefer().
+    content = deferred(Column(Text, nullable=True))
     original_pdf_path = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("User", back_populates="cvs")
 
+
+class ExtractionDocument(Base):
+    """One document of an /upload session. Raw text is zlib-compressed."""
+    __tablename__ = "extraction_documents"
+
+    session_id = Column(String(32), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    filename = Column(String, nullable=True)
+    summary = Column(Text, nullable=True)
+    fields = Column(Text, nullable=True)
+    raw_text = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -2,73 +2,430 @@ import pytesseract
 from PIL import Image
 import pypdf
 import io
+import os
+import queue
+import atexit
 import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional
+
+import deadlines
+from image_preprocessing import PreprocessOptions, preprocess_image
+
+try:
+    # Optional: in-process Tesseract bindings (no subprocess / temp files per image).
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
 logger = logging.getLogger(__name__)
 
-def get_available_engines() -> list[dict]:
-    """Return a list of available OCR engines with metadata."""
-    engines = []
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Warm API handles per worker process; each one holds a loaded language model.
+OCR_API_POOL_SIZE = int(os.getenv("OCR_API_POOL_SIZE", "2"))
+
+_TESSDATA_CANDIDATES = (
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+)
+
+
+def _tessdata_path() -> Optional[str]:
+    path = os.getenv("TESSDATA_PREFIX")
+    if path:
+        return path
+    return next((p for p in _TESSDATA_CANDIDATES if os.path.isdir(p)), None)
+
+
+# ---------- Persistent in-process Tesseract ----------
+
+class TesseractAPIPool:
+    """
+    Reusable tesserocr.PyTessBaseAPI handles for this worker process.
+    Loading the language model is paid once per handle instead of once per
+    image. A handle is not thread-safe, so each call checks one out exclusively.
+    """
+
+    def __init__(self, size: int, lang: str, path: Optional[str] = None):
+        self.lang = lang
+        self.path = path
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._handles: list = []
+        self._lock = threading.Lock()
+
+    def _new_handle(self):
+        kwargs = {"lang": self.lang}
+        if self.path:
+            kwargs["path"] = self.path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        with self._lock:
+            self._handles.append(api)
+        return api
+
+    def _discard(self, api) -> None:
+        with self._lock:
+            if api in self._handles:
+                self._handles.remove(api)
+        api.End()
+
+    @contextmanager
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                api = self._idle.get_nowait()
+            except queue.Empty:
+                api = self._new_handle()
+            try:
+                yield api
+            except Exception:
+                # Don't hand a handle in an unknown state to the next caller.
+                self._discard(api)
+                raise
+            else:
+                api.Clear()
+                self._idle.put(api)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            handles, self._handles = self._handles, []
+        for api in handles:
+            api.End()
+
+
+_api_pool: Optional[TesseractAPIPool] = None
+_api_pool_lock = threading.Lock()
+
+
+def _get_api_pool() -> TesseractAPIPool:
+    global _api_pool
+    if _api_pool is None:
+        with _api_pool_lock:
+            if _api_pool is None:
+                _api_pool = TesseractAPIPool(OCR_API_POOL_SIZE, OCR_LANG, _tessdata_path())
+                atexit.register(_api_pool.close)
+    return _api_pool
 
-    # Tesseract — check if binary is reachable
+
+@lru_cache(maxsize=1)
+def tesseract_api_available() -> bool:
+    """True if tesserocr is installed and can load OCR_LANG."""
+    if tesserocr is None:
+        return False
+    try:
+        path = _tessdata_path()
+        _, languages = tesserocr.get_languages(path) if path else tesserocr.get_languages()
+        return OCR_LANG in languages
+    except Exception:
+        return False
+
+
+def warm_up() -> None:
+    """Loads one API handle so the first OCR request doesn't pay for it."""
+    if tesseract_api_available():
+        with _get_api_pool().acquire():
+            pass
+
+
+@lru_cache(maxsize=1)
+def tesseract_binary_available() -> bool:
+    """True if the `tesseract` executable used by pytesseract is reachable."""
     try:
         pytesseract.get_tesseract_version()
-        engines.append({
-            "id": "tesseract",
-            "name": "Tesseract OCR",
-            "description": "Fast, open-source OCR by Google. Great for clean printed text.",
-        })
+        return True
     except Exception:
-        pass
+        return False
+
+
+def tesseract_available() -> bool:
+    return tesseract_api_available() or tesseract_binary_available()
+
+
+# ---------- Tesseract TSV (text + word confidence in one pass) ----------
+
+def parse_tsv(tsv: str) -> tuple:
+    """
+    Rebuilds text from Tesseract TSV output and returns (text, confidence).
+    Confidence is the mean word confidence (0–100) weighted by word length;
+    0 when no words were recognised.
+    """
+    lines: list = []
+    current_line, current_key, current_block = [], None, None
+    weighted, chars = 0.0, 0
+
+    for row in tsv.splitlines():
+        cols = row.split("\t")
+        if len(cols) < 12 or not cols[0].isdigit() or cols[0] != "5":
+            continue
+        word = cols[11].strip()
+        if not word:
+            continue
+        key = (cols[2], cols[3], cols[4])  # block, paragraph, line
+        if key != current_key:
+            if current_line:
+                lines.append(" ".join(current_line))
+            if current_block is not None and cols[2] != current_block:
+                lines.append("")
+            current_line, current_key, current_block = [], key, cols[2]
+        current_line.append(word)
+
+        conf = float(cols[10])
+        if conf >= 0:
+            weighted += conf * len(word)
+            chars += len(word)
+
+    if current_line:
+        lines.append(" ".join(current_line))
+    return "\n".join(lines), (weighted / chars if chars else 0.0)
+
+
+def _tesseract_tsv(image: Image.Image, psm: int) -> str:
+    """Runs Tesseract once, preferring the warm in-process handle."""
+    if tesseract_api_available():
+        with _get_api_pool().acquire() as api:
+            api.SetPageSegMode(psm)
+            api.SetImage(image)
+            return api.GetTSVText(0)
+    return pytesseract.image_to_data(image, lang=OCR_LANG, config=f"--psm {psm}")
+
 
-    # Fallback: always keep at least tesseract as an option label
+# ---------- Engine registry ----------
+
+@dataclass(frozen=True)
+class PageResult:
+    text: str
+    confidence: float  # 0–100
+    engine: str
+
+
+@dataclass(frozen=True)
+class OCREngine:
+    id: str
+    name: str
+    description: str
+    # Relative cost per page; auto mode tries the cheapest engine first.
+    cost: int
+    # What the engine can read: "pdf-text" (a PDF page's text layer) and/or "image".
+    inputs: tuple
+    available: Callable[[], bool]
+    # OCR engines: (image, preprocess override) -> PageResult
+    ocr: Optional[Callable[[Image.Image, Optional[PreprocessOptions]], PageResult]] = None
+
+
+def _tesseract_engine(engine_id: str, psm: int, preprocess: PreprocessOptions):
+    def run(image: Image.Image, override: Optional[PreprocessOptions] = None) -> PageResult:
+        prepared = preprocess_image(image, override or preprocess)
+        text, confidence = parse_tsv(_tesseract_tsv(prepared, psm))
+        return PageResult(text, confidence, engine_id)
+    return run
+
+
+ENGINES: dict = {}
+
+
+def register_engine(engine: OCREngine) -> None:
+    ENGINES[engine.id] = engine
+
+
+register_engine(OCREngine(
+    id="pdf-text",
+    name="PDF text layer",
+    description="Reads the text embedded in digital PDFs. Instant, but finds nothing in scans.",
+    cost=0,
+    inputs=("pdf-text",),
+    available=lambda: True,
+))
+register_engine(OCREngine(
+    id="tesseract-fast",
+    name="Tesseract (fast)",
+    description="Low-DPI, sparse-text Tesseract pass. Good for clean prints and screenshots.",
+    cost=1,
+    inputs=("image",),
+    available=tesseract_available,
+    ocr=_tesseract_engine("tesseract-fast", psm=11, preprocess=PreprocessOptions(
+        crop=False, deskew=False, binarize=False, target_dpi=150)),
+))
+register_engine(OCREngine(
+    id="tesseract-accurate",
+    name="Tesseract (accurate)",
+    description="Full preprocessing (deskew, crop, binarize) at 300 DPI. Best for phone photos and scans.",
+    cost=3,
+    inputs=("image",),
+    available=tesseract_available,
+    ocr=_tesseract_engine("tesseract-accurate", psm=3, preprocess=PreprocessOptions()),
+))
+
+# Older engine ids still sent by clients.
+ENGINE_ALIASES = {"tesseract": "tesseract-accurate", "tesseract-api": "tesseract-accurate"}
+
+# Pages whose mean word confidence is below this escalate to the next engine.
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "85"))
+# A PDF page with less native text than this is treated as scanned.
+PDF_TEXT_MIN_CHARS = 20
+# Seconds of the request's budget that OCR leaves for the LLM step after it.
+# Past that point no further pages are read or escalated (the first always is).
+OCR_DEADLINE_RESERVE = float(os.getenv("OCR_DEADLINE_RESERVE", "15"))
+
+
+def _engines_for(kind: str, engine: str) -> list:
+    """Engines to try for one page of `kind`, cheapest first."""
+    engine = ENGINE_ALIASES.get(engine, engine)
+    candidates = sorted(
+        (e for e in ENGINES.values() if kind in e.inputs and e.available()),
+        key=lambda e: e.cost,
+    )
+    if engine == "auto":
+        return candidates
+    return [e for e in candidates if e.id == engine]
+
+
+def ocr_image(
+    image: Image.Image,
+    engine: str = "auto",
+    preprocess: Optional[PreprocessOptions] = None,
+    min_confidence: Optional[float] = None,
+) -> PageResult:
+    """
+    OCR one page image. In auto mode, escalates through the image engines by
+    cost until one reaches `min_confidence`, keeping the most confident result.
+    """
+    threshold = OCR_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    engines = _engines_for("image", engine)
     if not engines:
-        engines.append({
-            "id": "tesseract",
-            "name": "Tesseract OCR (default)",
-            "description": "Default OCR engine.",
-        })
+        raise RuntimeError(f"OCR engine '{engine}' is not available")
+
+    best: Optional[PageResult] = None
+    for candidate in engines:
+        if best is not None and not deadlines.has_time(OCR_DEADLINE_RESERVE):
+            deadlines.note_cut("ocr")
+            logger.info(f"OCR: out of time, keeping {best.engine} result")
+            break
+        result = candidate.ocr(image, preprocess)
+        if best is None or result.confidence > best.confidence:
+            best = result
+        if result.confidence >= threshold:
+            break
+        logger.info(f"OCR: {candidate.id} confidence {result.confidence:.0f} < {threshold:.0f}, escalating")
+    return best
 
+
+def get_available_engines() -> list[dict]:
+    """Return a list of available OCR engines with metadata."""
+    engines = [{
+        "id": "auto",
+        "name": "Auto (recommended)",
+        "description": "Starts with the cheapest engine and escalates pages with low OCR confidence.",
+    }]
+    in_process = tesseract_api_available()
+    for engine in sorted(ENGINES.values(), key=lambda e: e.cost):
+        if not engine.available():
+            continue
+        entry = {
+            "id": engine.id,
+            "name": engine.name,
+            "description": engine.description,
+            "cost": engine.cost,
+            "inputs": list(engine.inputs),
+        }
+        if engine.ocr is not None:
+            entry["in_process"] = in_process
+        engines.append(entry)
     return engines
 
 
 # ---------- Image OCR ----------
 
-def extract_text_from_image_tesseract(image_bytes: bytes) -> str:
-    """Extract text from an image using Tesseract OCR."""
+def extract_text_from_image(
+    image_bytes: bytes,
+    engine: str = "auto",
+    preprocess: Optional[PreprocessOptions] = None,
+) -> str:
+    """
+    OCR an image with the selected engine ('auto', 'tesseract-fast', 'tesseract-accurate').
+    `preprocess`, if given, replaces the engine's own preprocessing.
+    """
     try:
         image = Image.open(io.BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image)
-        return text
+        return ocr_image(image, engine, preprocess).text
     except Exception as e:
         return f"Error extracting text with Tesseract: {str(e)}"
 
-def extract_text_from_image(image_bytes: bytes, engine: str = "tesseract") -> str:
-    """
-    Dispatch image OCR to the selected engine.
-    Supported engines: 'tesseract'
-    """
-    return extract_text_from_image_tesseract(image_bytes)
-
 
 # ---------- PDF text extraction ----------
 
-def extract_text_from_pdf(pdf_bytes: bytes, engine: str = "tesseract") -> str:
+def _pdf_page_images(page) -> list:
+    """Embedded images of a PDF page, largest first (a scanned page is one big image)."""
+    try:
+        images = [img.image for img in page.images]
+    except Exception:
+        return []
+    return sorted(images, key=lambda im: im.width * im.height, reverse=True)
+
+
+def _pdf_text_layer(page) -> PageResult:
+    text = page.extract_text() or ""
+    return PageResult(text, 100.0 if len(text.strip()) >= PDF_TEXT_MIN_CHARS else 0.0, "pdf-text")
+
+
+def extract_pdf_page(
+    page,
+    engine: str = "auto",
+    preprocess: Optional[PreprocessOptions] = None,
+    min_confidence: Optional[float] = None,
+) -> PageResult:
+    """Reads one PDF page: text layer first, OCR of its scan image if that's not enough."""
+    threshold = OCR_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    native: Optional[PageResult] = None
+
+    if _engines_for("pdf-text", engine):
+        native = _pdf_text_layer(page)
+        if native.confidence >= threshold or engine == "pdf-text":
+            return native
+
+    images = _pdf_page_images(page)
+    if not images or not _engines_for("image", engine):
+        # Nothing to OCR — the text layer is all there is.
+        return native or _pdf_text_layer(page)
+
+    result = ocr_image(images[0], engine, preprocess, threshold)
+    if native and native.text.strip() and not result.text.strip():
+        return native
+    return result
+
+
+def extract_text_from_pdf(
+    pdf_bytes: bytes,
+    engine: str = "auto",
+    preprocess: Optional[PreprocessOptions] = None,
+) -> str:
     """
-    Extract text from a PDF byte stream.
-    Tries native extraction first. If the PDF appears scanned,
-    falls back to OCR on rendered pages.
+    Extract text from a PDF byte stream, page by page.
+    Uses the native text layer where it exists and OCRs scanned pages.
+    If the request runs low on time, stops between pages and notes how many
+    were read.
     """
     try:
         pdf_file = io.BytesIO(pdf_bytes)
         reader = pypdf.PdfReader(pdf_file)
+        pages = reader.pages
         text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        for i, page in enumerate(pages):
+            if i and not deadlines.has_time(OCR_DEADLINE_RESERVE):
+                deadlines.note_cut("ocr")
+                text += f"[Stopped after {i} of {len(pages)} pages: request time limit reached]\n"
+                break
+            text += extract_pdf_page(page, engine, preprocess).text + "\n"
 
-        # If very little text was extracted, it might be a scanned PDF.
         if len(text.strip()) < 10:
-            return "[Make sure your PDF contains selectable text. Scanned PDFs support coming soon.]"
+            return "[No text found. Make sure the PDF contains selectable text or clearly scanned pages.]"
 
         return text
     except Exception as e:
@@ -0,0 +1,136 @@
+"""
+Local lexical retrieval over OCR'd document text.
+
+Raw text is split into overlapping line-based chunks and indexed with Okapi
+BM25, so callers like /refine can send the LLM only the passages that matter
+instead of the whole document. An index is built for each call and not
+kept: documents live in the server-side sessions, not in worker memory,
+and indexing takes a few milliseconds per 100 KB of text.
+"""
+import re
+import math
+from collections import Counter
+from typing import List, Tuple
+
+# Target chunk size; chunks break on line boundaries where possible.
+CHUNK_CHARS = 600
+# Trailing lines repeated at the start of the next chunk, so a value is never
+# cut off from the label on the line above it.
+CHUNK_OVERLAP_LINES = 1
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; underscores split too, so field keys match prose."""
+    return _TOKEN.findall(text.lower())
+
+
+def _split_long_line(line: str, max_chars: int) -> List[str]:
+    pieces, current = [], ""
+    for word in line.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(
+    text: str,
+    max_chars: int = CHUNK_CHARS,
+    overlap_lines: int = CHUNK_OVERLAP_LINES,
+) -> List[str]:
+    """Packs consecutive non-empty lines into chunks of about `max_chars`."""
+    lines: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        lines.extend(_split_long_line(line, max_chars) if len(line) > max_chars else [line])
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current = current[-overlap_lines:] if overlap_lines else []
+            size = sum(len(l) + 1 for l in current)
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of passages."""
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(p)) for p in passages]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(passages)) if passages else 0.0
+
+        doc_freq: Counter = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(passages)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        scores = []
+        for tf, length in zip(self._term_freqs, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """Top-`k` (passage index, score) pairs with a positive score, best first."""
+        ranked = sorted(enumerate(self.scores(query)), key=lambda item: -item[1])
+        return [(i, score) for i, score in ranked[:k] if score > 0]
+
+
+def retrieve(text: str, query: str, max_chars: int) -> List[str]:
+    """
+    Best-matching passages of `text` for `query`, up to `max_chars` in total,
+    returned in document order. Text that already fits is returned whole.
+    """
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    index = BM25Index(chunk_text(text))
+    picked: List[int] = []
+    used = 0
+    for i, _ in index.search(query, k=len(index.passages)):
+        size = len(index.passages[i])
+        if picked and used + size > max_chars:
+            continue
+        picked.append(i)
+        used += size
+        if used >= max_chars:
+            break
+    if not picked:
+        # Nothing matched lexically: fall back to the top of the document,
+        # where headers (vendor, dates, numbers) usually sit.
+        for i, passage in enumerate(index.passages):
+            if picked and used + len(passage) > max_chars:
+                break
+            picked.append(i)
+            used += len(passage)
+    return [index.passages[i] for i in sorted(picked)]
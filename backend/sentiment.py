@@ -0,0 +1,195 @@
+"""
+Sentiment for /analyze: a lexicon classifier first, the LLM only when needed.
+
+The local classifier scores words from a small weighted lexicon, adjusting
+for negation ("not good"), intensifiers ("very", "slightly"), contrast
+("..., but ...") and exclamation marks, in the spirit of VADER. It runs in
+microseconds. In "auto" mode its label stands when it is confident; texts
+with weak or mixed signals, or with no sentiment words at all, go to the
+LLM chain. "local" and "llm" force one engine.
+"""
+import os
+import re
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from llm_factory import get_llm
+
+LABELS = ("Positive", "Neutral", "Negative")
+MODES = ("auto", "local", "llm")
+
+# Local results below this confidence (0-1) escalate to the LLM in auto mode.
+MIN_CONFIDENCE = float(os.getenv("SENTIMENT_MIN_CONFIDENCE", "0.4"))
+
+# Word -> valence, roughly -4..4.
+LEXICON: Dict[str, float] = {
+    # positive
+    "good": 1.9, "great": 3.1, "excellent": 2.7, "amazing": 2.8, "awesome": 3.1, "fantastic": 2.6,
+    "wonderful": 2.7, "brilliant": 2.8, "outstanding": 3.0, "superb": 3.1, "perfect": 2.7,
+    "love": 3.2, "enjoy": 2.2, "happy": 2.7, "glad": 2.0, "pleased": 2.0,
+    "delighted": 2.9, "satisfied": 1.8, "impressed": 2.1, "impressive": 2.3, "nice": 1.8,
+    "helpful": 1.9, "useful": 1.7, "easy": 1.6, "fast": 1.2, "quick": 1.2, "smooth": 1.4,
+    "reliable": 1.8, "recommend": 1.8, "best": 3.2, "better": 1.9, "beautiful": 2.9,
+    "clean": 1.3, "clear": 1.2, "friendly": 2.2, "polite": 1.5, "professional": 1.3,
+    "thank": 1.5, "thanks": 1.9, "appreciate": 2.0, "grateful": 2.1, "success": 2.7,
+    "successful": 2.7, "win": 2.8, "won": 2.7, "effective": 2.1, "efficient": 1.8,
+    "convenient": 1.6, "comfortable": 1.8, "fun": 2.3, "exciting": 2.2, "excited": 1.9,
+    "wow": 2.8, "cool": 1.3, "solid": 1.5, "fine": 0.8, "ok": 0.9, "okay": 0.9, "decent": 1.2,
+    "fair": 1.0, "worth": 1.2, "valuable": 2.1, "accurate": 1.6, "intuitive": 1.8,
+    "flawless": 2.9, "incredible": 2.6, "lovely": 2.8, "proud": 2.1, "promoted": 1.6,
+    "hired": 1.2, "resolved": 1.2, "fixed": 1.0, "improved": 1.8, "improvement": 1.6,
+    "positive": 2.3, "pleasant": 2.3, "affordable": 1.4, "responsive": 1.5, "stable": 1.2,
+    "works": 1.0, "worked": 1.0, ":)": 2.0, ":-)": 2.0, ":d": 2.3,
+    # negative
+    "bad": -2.5, "terrible": -2.1, "awful": -2.0, "horrible": -2.5, "worst": -3.1, "worse": -2.1,
+    "poor": -2.1, "hate": -2.7, "dislike": -1.6, "angry": -2.3, "annoyed": -1.9, "annoying": -1.9,
+    "frustrated": -2.1, "frustrating": -2.1, "disappointed": -1.9, "disappointing": -2.2,
+    "sad": -2.1, "unhappy": -1.8, "upset": -1.6, "useless": -1.8, "broken": -1.7, "broke": -1.4,
+    "slow": -1.2, "crash": -1.7, "crashed": -1.7, "crashes": -1.7, "bug": -1.2, "buggy": -1.8,
+    "error": -1.3, "errors": -1.3, "fail": -2.0, "failed": -2.0, "fails": -2.0, "failure": -2.3,
+    "problem": -1.7, "problems": -1.7, "issue": -1.1, "issues": -1.1, "wrong": -2.1,
+    "rude": -2.0, "unprofessional": -1.8, "waste": -1.8, "wasted": -1.8, "expensive": -1.0,
+    "overpriced": -1.7, "confusing": -1.4, "confused": -1.1, "difficult": -1.2,
+    "complicated": -1.1, "ugly": -2.3, "nightmare": -2.4, "scam": -2.7, "refund": -0.8,
+    "cancel": -0.9, "cancelled": -1.0, "complaint": -1.7, "complain": -1.5, "delay": -1.2,
+    "delayed": -1.4, "late": -1.0, "lost": -1.3, "missing": -1.2, "damaged": -1.9,
+    "unreliable": -1.9, "unacceptable": -2.3, "ridiculous": -2.0, "pathetic": -2.5,
+    "mediocre": -1.2, "lacking": -1.2, "worried": -1.7, "afraid": -2.0, "stress": -1.8,
+    "stressful": -1.9, "rejected": -1.7, "rejection": -1.8, "fired": -2.2,
+    "sucks": -1.5, "garbage": -2.2, "trash": -1.9, "disaster": -3.1, "mess": -1.5,
+    "inaccurate": -1.6, "unusable": -2.3, "freezes": -1.6, "froze": -1.5, "stuck": -1.4,
+    "sorry": -0.3, "unfortunately": -1.3, "regret": -1.8, "bored": -1.3, "boring": -1.3,
+    "negative": -2.1, ":(": -1.9, ":-(": -1.9,
+}
+
+NEGATORS = {
+    "not", "no", "never", "none", "nothing", "nobody", "neither", "nor", "without",
+    "hardly", "barely", "cannot", "cant", "dont", "doesnt", "didnt", "isnt", "wasnt",
+    "arent", "werent", "wont", "wouldnt", "shouldnt", "couldnt", "aint", "havent", "hasnt",
+}
+# Multipliers for a word right before a sentiment word.
+BOOSTERS = {
+    "very": 1.3, "really": 1.3, "so": 1.25, "extremely": 1.5, "incredibly": 1.5, "super": 1.4,
+    "absolutely": 1.5, "totally": 1.4, "completely": 1.4, "highly": 1.4, "truly": 1.3,
+    "most": 1.3, "quite": 1.1, "slightly": 0.6, "somewhat": 0.7, "fairly": 0.8, "bit": 0.7,
+    "little": 0.7, "kind": 0.7, "sort": 0.7, "barely": 0.5,
+}
+# Text after these counts more than text before ("ok, but slow").
+CONTRAST = {"but", "however", "although", "though", "yet", "except"}
+NEGATION_SCALE = -0.74
+NEGATION_WINDOW = 3
+NORMALIZATION_ALPHA = 15.0
+# Confidence of "Neutral" for text without any lexicon word; below the
+# default threshold, so such texts go to the LLM.
+NO_SIGNAL_CONFIDENCE = 0.3
+
+_TOKEN = re.compile(r"[:;]-?[()dp]|[a-z]+(?:'[a-z]+)?|[!?.,;]")
+
+
+@dataclass
+class SentimentScore:
+    label: str
+    confidence: float  # 0-1
+    compound: float    # -1 (negative) .. 1 (positive)
+    positive: float
+    negative: float
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _valence(token: str) -> Optional[float]:
+    if token in LEXICON:
+        return LEXICON[token]
+    # Light inflection handling: "loved", "loving", "crashes", "problems".
+    for suffix, replacements in (("ing", ("", "e")), ("ed", ("", "e")), ("es", ("", "e")), ("s", ("",))):
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            stem = token[: -len(suffix)]
+            for ending in replacements:
+                if stem + ending in LEXICON:
+                    return LEXICON[stem + ending]
+    return None
+
+
+def _is_negator(token: str) -> bool:
+    return token in NEGATORS or token.endswith("n't")
+
+
+def classify(text: str) -> SentimentScore:
+    """Local lexicon classification."""
+    tokens = tokenize(text)
+    contrast_at = max((i for i, t in enumerate(tokens) if t in CONTRAST), default=None)
+
+    positive = negative = 0.0
+    for i, token in enumerate(tokens):
+        valence = _valence(token)
+        if not valence:
+            continue
+        window = []
+        for previous in reversed(tokens[max(0, i - NEGATION_WINDOW):i]):
+            if previous in ".,;!?" or previous in CONTRAST:
+                break
+            window.append(previous)
+        if window and window[0] in BOOSTERS:
+            valence *= BOOSTERS[window[0]]
+        if any(_is_negator(t) for t in window):
+            valence *= NEGATION_SCALE
+        if contrast_at is not None:
+            valence *= 0.5 if i < contrast_at else 1.5
+        if valence > 0:
+            positive += valence
+        else:
+            negative -= valence
+
+    total = positive - negative
+    if total:
+        total *= 1 + 0.08 * min(tokens.count("!"), 3)
+    compound = total / math.sqrt(total * total + NORMALIZATION_ALPHA)
+
+    if positive == negative == 0:
+        # Nothing to go on: plain factual text, or wording the lexicon lacks
+        # ("stopped charging after two days"). Likely neutral, but not certain.
+        return SentimentScore("Neutral", NO_SIGNAL_CONFIDENCE, 0.0, 0.0, 0.0)
+
+    label = "Positive" if compound >= 0.05 else "Negative" if compound <= -0.05 else "Neutral"
+    # Signals on both sides make the call shaky even when one side wins.
+    mixed = min(positive, negative) / max(positive, negative)
+    confidence = abs(compound) * (1 - mixed) if label != "Neutral" else 1 - mixed - abs(compound) * 5
+    return SentimentScore(label, round(max(confidence, 0.0), 3), round(compound, 3),
+                          round(positive, 3), round(negative, 3))
+
+
+def normalize_label(reply: str) -> str:
+    """The LLM's reply mapped to one of LABELS (left as-is if it isn't one)."""
+    cleaned = reply.strip().strip(".!\"'").strip()
+    for label in LABELS:
+        if cleaned.lower().startswith(label.lower()):
+            return label
+    return cleaned
+
+
+async def classify_with_llm(text: str) -> str:
+    chain = ChatPromptTemplate.from_messages([
+        ("system", "You are a sentiment analysis assistant. Reply with only one word: Positive, Neutral, or Negative."),
+        ("human", "Text: {text}"),
+    ]) | get_llm()
+    result = await chain.ainvoke({"text": text})
+    return normalize_label(result.content)
+
+
+async def analyze(text: str, mode: str = "auto") -> dict:
+    """
+    {"sentiment", "source": "local" | "llm", "confidence"}. Confidence is the
+    local classifier's, and None for LLM answers.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if mode != "llm":
+        score = classify(text)
+        if mode == "local" or score.confidence >= MIN_CONFIDENCE:
+            return {"sentiment": score.label, "source": "local", "confidence": score.confidence}
+    return {"sentiment": await classify_with_llm(text), "source": "llm", "confidence": None}
@@ -0,0 +1,209 @@
+"""
+Worker memory soak test.
+
+Drives a steady mix of requests through the app in-process, the way one
+gunicorn worker would see them, and samples its memory as it goes:
+  - /chat turns on a fixed pool of threads (agent + in-memory checkpointer),
+    or with --new-threads on a new thread for every conversation, the way
+    real users arrive
+  - /upload of a small PDF (text layer, extraction, server-side session)
+  - /refine and /export against that session
+The LLM is a scripted stand-in, so no API keys or network are needed and
+every request does the same work. Memory should level off after warm-up;
+steady growth means something is kept per request.
+
+Usage:
+    python soak_memory.py [requests] [--threads N | --new-threads] [--tracemalloc] [--max-growth-mb MB]
+"""
+import os
+import gc
+import sys
+import json
+import uuid
+import argparse
+import tempfile
+import tracemalloc
+
+# Must be set before the app modules are imported.
+_db_dir = tempfile.mkdtemp(prefix="soak-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_db_dir, 'soak.db')}"
+os.environ.setdefault("GROQ_API_KEY", "soak-placeholder")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class ScriptedModel(BaseChatModel):
+    """Stand-in LLM: answers each kind of prompt the app sends with a fixed, valid response."""
+    turns: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "soak-scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages) -> AIMessage:
+        system = messages[0].content if messages and isinstance(messages[0], SystemMessage) else ""
+        if "data extraction" in system:
+            return AIMessage(content=json.dumps({
+                "summary": "Invoice from Acme",
+                "fields": {"invoice_number": "INV-1042", "total": "1,250.00", "vendor": "Acme"},
+            }))
+        if "data refinement" in system:
+            return AIMessage(content=json.dumps({"set": {"total": "1,350.00"}, "remove": [], "summary": None}))
+        if "running memory" in system:
+            return AIMessage(content="The user is building a CV and has listed several skills.")
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="Saved.")
+        self.turns += 1
+        return AIMessage(content="", tool_calls=[{
+            "name": "update_cv_data",
+            "args": {"skills": [f"Skill {self.turns % 40}"]},
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+        }])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages, stop, **kwargs)
+
+
+def text_pdf(text: str) -> bytes:
+    """A one-page PDF whose text layer holds `text`."""
+    stream = f"BT /F1 11 Tf 40 760 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+PDF = text_pdf("Invoice INV-1042 from Acme Ltd. Total due 1,250.00 EUR by 2026-03-01.")
+
+
+def sample(requests_done: int, checkpoint_stats) -> dict:
+    import memory_diagnostics
+    gc.collect()
+    checkpoints = checkpoint_stats(top=1)
+    return {
+        "requests": requests_done,
+        "rss_mb": memory_diagnostics.rss_bytes() / 2**20,
+        "traced_mb": tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else None,
+        "checkpoint_kb": checkpoints["bytes"] / 1024,
+        "checkpoints": checkpoints["checkpoints"],
+    }
+
+
+def slope_per_thousand(samples: list, key: str) -> float:
+    """Least-squares growth of `key` per 1000 requests."""
+    xs = [s["requests"] for s in samples]
+    ys = [s[key] for s in samples]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    return 1000 * sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var if var else 0.0
+
+
+def run(total: int, threads: int, trace: bool, new_threads: bool = False) -> list:
+    if trace:
+        tracemalloc.start(1)
+
+    import database
+    import llm_factory
+    database.init_db()
+    model = ScriptedModel()
+    llm_factory._registry["default"] = model
+    llm_factory._registry["summary"] = model
+
+    import main
+    from agent import checkpoint_stats
+    from fastapi.testclient import TestClient
+
+    every = max(total // 20, 1)
+    samples = []
+    done = 0
+    session_id = None
+    with TestClient(main.app) as client:
+        while done < total:
+            step = done % 5
+            if step < 2:
+                if new_threads:
+                    # Each 5-request cycle is a new two-turn conversation.
+                    thread = f"soak-new-{done // 5}"
+                else:
+                    thread = f"soak-{(done // 5 * 2 + step) % threads}"
+                response = client.post("/chat", json={
+                    "messages": [{"role": "user", "content": "I also know some more tools"}],
+                    "thread_id": thread,
+                })
+            elif step == 2:
+                response = client.post(
+                    "/upload", files=[("files", ("invoice.pdf", PDF, "application/pdf"))],
+                    data={"schema": "invoice_number, total, vendor"},
+                )
+                session_id = response.json().get("session_id")
+            elif step == 3:
+                response = client.post("/refine", json={
+                    "session_id": session_id, "instructions": "The total is 1,350.00",
+                })
+            else:
+                response = client.post("/export", json={"session_id": session_id, "format": "csv"})
+            if response.status_code != 200:
+                raise RuntimeError(f"request {done} ({response.request.url.path}) failed: "
+                                   f"{response.status_code} {response.text[:200]}")
+            done += 1
+            if done % every == 0 or done == total:
+                samples.append(sample(done, checkpoint_stats))
+                s = samples[-1]
+                traced = f"{s['traced_mb']:8.1f}" if s["traced_mb"] is not None else "       -"
+                print(f"{done:>7} req   rss {s['rss_mb']:7.1f} MB   traced {traced} MB   "
+                      f"checkpoints {s['checkpoints']:>5} ({s['checkpoint_kb']:8.1f} KB)", flush=True)
+    return samples
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("requests", nargs="?", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=50, help="chat threads to cycle through")
+    parser.add_argument("--new-threads", action="store_true",
+                        help="start a new chat thread for every conversation instead of cycling --threads")
+    parser.add_argument("--tracemalloc", action="store_true", help="also track the Python heap (slower)")
+    parser.add_argument("--max-growth-mb", type=float, default=10.0,
+                        help="fail if RSS grows more than this after warm-up")
+    args = parser.parse_args(argv)
+
+    samples = run(args.requests, args.threads, args.tracemalloc, args.new_threads)
+    # The first 20% covers imports, caches and every chat thread's first turns.
+    steady = [s for s in samples if s["requests"] > args.requests * 0.2] or samples
+    growth = steady[-1]["rss_mb"] - steady[0]["rss_mb"]
+    print(f"\nafter warm-up: rss {growth:+.1f} MB over {steady[-1]['requests'] - steady[0]['requests']} requests "
+          f"({slope_per_thousand(steady, 'rss_mb'):+.2f} MB / 1000 req), "
+          f"checkpoints {slope_per_thousand(steady, 'checkpoint_kb'):+.1f} KB / 1000 req")
+    if args.tracemalloc:
+        print(f"traced heap {slope_per_thousand(steady, 'traced_mb'):+.2f} MB / 1000 req")
+    if growth > args.max_growth_mb:
+        print(f"FAIL: grew more than {args.max_growth_mb} MB")
+        return 1
+    print("OK: memory is flat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.agent as agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage, AIMessage
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Fake model that accepts bind_tools() and records the prompts it receives."""
+    prompts: list = []
+    delay: float = 0.0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        time.sleep(self.delay)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def test_split_keeps_whole_turns():
+    print("Testing compaction split...")
+
+    messages = []
+    for i in range(20):
+        messages.append(HumanMessage(content=f"Human message {i} " * 20))
+        messages.append(AIMessage(content=f"AI response {i} " * 20))
+
+    folded, kept = agent._split_for_compaction(messages, keep_tokens=500)
+
+    assert folded + kept == messages, "Split must be a clean prefix/suffix"
+    assert folded and kept
+    assert isinstance(kept[0], HumanMessage), "Kept history should start on a user turn"
+
+    print("Split test passed!")
+
+
+def test_compaction_folds_old_turns():
+    print("Testing background compaction...")
+
+    chat_model = FakeChatModel(messages=iter([AIMessage(content=f"Reply {i} " * 60) for i in range(12)]))
+    summary_model = FakeChatModel(messages=iter([AIMessage(content="- User is Ana, a backend developer")]))
+    saved = {name: getattr(agent, name) for name in
+             ("get_llm", "get_summary_llm", "HISTORY_MODE", "COMPACT_TRIGGER_TOKENS", "COMPACT_KEEP_TOKENS")}
+    agent.get_llm = lambda: chat_model
+    agent.get_summary_llm = lambda: summary_model
+    agent._agent = None
+    agent.HISTORY_MODE = "compact"
+    agent.COMPACT_TRIGGER_TOKENS = 1000
+    agent.COMPACT_KEEP_TOKENS = 300
+
+    async def run():
+        await agent.init_checkpointer()
+        for i in range(6):
+            await agent.get_agent_response(f"Turn {i}: my name is Ana " * 10, thread_id="t1")
+        compacted = await agent.compact_thread("t1")
+        for i in range(6, 12):
+            await agent.get_agent_response(f"Turn {i} " * 10, thread_id="t1")
+        return compacted
+
+    try:
+        compacted = asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(agent, name, value)
+        agent._agent = None
+
+    assert compacted, "Thread over budget should be compacted"
+
+    system_prompt = chat_model.prompts[-1][0].content
+    assert "User is Ana" in system_prompt, "Summary should be injected into the prompt"
+    assert not any("Turn 0:" in str(m.content) for m in chat_model.prompts[-1][1:]), \
+        "Folded turns should no longer be sent"
+
+    print("Compaction test passed!")
+
+
+def test_compaction_overlapping_turn_keeps_both():
+    print("Testing compaction racing a chat turn...")
+
+    chat_model = FakeChatModel(messages=iter([AIMessage(content=f"Reply {i} " * 60) for i in range(7)]))
+    summary_model = FakeChatModel(messages=iter([AIMessage(content="- User is Ana, a backend developer")]))
+    saved = {name: getattr(agent, name) for name in
+             ("get_llm", "get_summary_llm", "HISTORY_MODE", "COMPACT_TRIGGER_TOKENS", "COMPACT_KEEP_TOKENS")}
+    agent.get_llm = lambda: chat_model
+    agent.get_summary_llm = lambda: summary_model
+    agent._agent = None
+    agent.HISTORY_MODE = "compact"
+    agent.COMPACT_TRIGGER_TOKENS = 1000
+    agent.COMPACT_KEEP_TOKENS = 300
+
+    async def late_turn():
+        await asyncio.sleep(0.02)  # compaction has read the state and is summarising
+        await agent.get_agent_response("Turn 6: during compaction", thread_id="t2")
+
+    async def run():
+        await agent.init_checkpointer()
+        for i in range(6):
+            await agent.get_agent_response(f"Turn {i}: my name is Ana " * 10, thread_id="t2")
+        # The turn outlasts the summary call, so compaction's write comes while it runs.
+        summary_model.delay, chat_model.delay = 0.1, 0.2
+        compacted, _ = await asyncio.gather(agent.compact_thread("t2"), late_turn())
+        state = await agent._get_agent().aget_state({"configurable": {"thread_id": "t2"}})
+        return compacted, state.values
+
+    try:
+        compacted, values = asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(agent, name, value)
+        agent._agent = None
+
+    assert compacted
+    assert values.get("summary") == "- User is Ana, a backend developer", "Summary must survive the turn"
+    contents = [str(m.content) for m in values["messages"]]
+    assert "Turn 6: during compaction" in contents, "The turn's message must survive compaction"
+    assert not any(c.startswith("Turn 0:") for c in contents), "Folded turns are removed"
+    assert not agent._thread_locks, "Idle thread locks are dropped"
+
+    print("Compaction race test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_split_keeps_whole_turns()
+        test_compaction_folds_old_turns()
+        test_compaction_overlapping_turn_keeps_both()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
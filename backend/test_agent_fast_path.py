@@ -0,0 +1,131 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.agent as agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+class CountingChatModel(GenericFakeChatModel):
+    """Fake model that accepts bind_tools() and counts its calls."""
+    calls: int = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(messages, *args, **kwargs)
+
+
+def _update_call(call_id: str, **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": "update_cv_data", "args": args, "id": call_id}])
+
+
+def test_next_question_follows_collection_order():
+    print("Testing next-section questions...")
+
+    cv = {"personalInfo": {"firstName": "Ana", "lastName": "Lee", "jobTitle": "Dev",
+                           "email": "a@x.io", "phone": "1"}}
+    assert agent.next_question(cv, ["personalInfo"]) == agent.NEXT_QUESTIONS["summary"]
+
+    partial = {"personalInfo": {"firstName": "Ana"}}
+    question = agent.next_question(partial, ["personalInfo"])
+    assert "last name" in question and "email" in question
+
+    cv["experience"] = [{"title": "Dev", "company": "Acme"}]
+    assert agent.next_question(cv, ["experience"]) == agent.NEXT_QUESTIONS["education"]
+    assert "summary" in agent.next_question({**cv, "languages": [{"name": "English"}]}, ["languages"])
+
+    print("Next-question test passed!")
+
+
+def test_update_turn_takes_one_model_call():
+    print("Testing single-round-trip CV updates...")
+
+    model = CountingChatModel(messages=iter([
+        _update_call("c1", experience=[{"title": "Backend Engineer", "company": "Acme"}]),
+        _update_call("c2", skills=["python", "sql"]),
+        AIMessage(content="Yes — Acme counts as recent experience."),
+    ]))
+    saved = {name: getattr(agent, name) for name in ("get_llm", "UPDATE_MODE")}
+    agent.get_llm = lambda: model
+    agent.UPDATE_MODE = "fast"
+    agent._agent = None
+
+    async def run():
+        await agent.init_checkpointer()
+        first = await agent.get_agent_response("I work as a Backend Engineer at Acme", thread_id="fast")
+        calls_after_first = model.calls
+        second = await agent.get_agent_response("I know python and sql, is that enough?", thread_id="fast")
+        return first, calls_after_first, second
+
+    try:
+        first, calls_after_first, second = asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(agent, name, value)
+        agent._agent = None
+
+    assert calls_after_first == 1, "A plain update should not need a second model call"
+    assert first["reply"].startswith("✅ Saved experience (Backend Engineer @ Acme)")
+    assert agent.NEXT_QUESTIONS["education"] in first["reply"]
+    assert first["cv_update"] == {"experience": [{"title": "Backend Engineer", "company": "Acme"}]}
+
+    assert model.calls == 3, "A question still goes back to the model"
+    assert second["reply"] == "Yes — Acme counts as recent experience."
+    assert second["cv_update"] == {"skills": ["python", "sql"]}
+
+    print("Fast path test passed!")
+
+
+def _after_update(*texts, cv=None) -> dict:
+    """Graph state right after update_cv_data saved an experience entry, following `texts`."""
+    update = {"experience": [{"title": "Backend Engineer", "company": "Acme"}]}
+    return {
+        "messages": [HumanMessage(content=t) for t in texts] + [
+            _update_call("c1", **update),
+            ToolMessage(content="ok", tool_call_id="c1", artifact={"cv_update": update}),
+        ],
+        "cv": {**(cv or {}), **update},
+    }
+
+
+def test_fast_path_only_for_english():
+    print("Testing fast-path language check...")
+
+    english = [
+        ("I work as a Backend Engineer at Acme",),
+        ("I have been a Backend Engineer at Acme since 2019, full-time",),
+        ("I'm Ana", "Backend Engineer, Acme"),  # bare data: the earlier message decides
+    ]
+    for texts in english:
+        reply = agent.fast_path_reply(_after_update(*texts, cv={"personalInfo": {"firstName": "Ana"}}))
+        assert reply is not None and reply.content.startswith("✅ Saved"), texts
+
+    others = [
+        ("Mera naam Ana hai aur main Acme mein Backend Engineer hoon",),
+        ("Main Acme mein Backend Engineer hoon",),
+        ("Trabajo como Backend Engineer en Acme",),
+        ("Ich arbeite bei Acme als Backend Engineer",),
+        ("Mera naam Ana hai", "Backend Engineer, Acme"),
+        ("Backend Engineer, Acme",),  # nothing to tell the language by
+    ]
+    for texts in others:
+        assert agent.fast_path_reply(_after_update(*texts)) is None, f"{texts} should be left to the model"
+
+    print("Fast-path language test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_next_question_follows_collection_order()
+        test_update_turn_takes_one_model_call()
+        test_fast_path_only_for_english()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,76 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.agent as agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+SEEDED = {
+    "personalInfo": {"firstName": "Ana", "lastName": "Lee", "jobTitle": "Backend Engineer"},
+    "experience": [{"title": "Backend Engineer", "company": "Acme", "description": "Built APIs"}],
+    "skills": ["Python", "SQL"],
+}
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Fake model that accepts bind_tools() and records the prompts it receives."""
+    prompts: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def test_seeded_cv_carries_into_chat():
+    print("Testing CV seeding into a thread...")
+
+    model = FakeChatModel(prompts=[], messages=iter([
+        AIMessage(content="", tool_calls=[{"name": "update_cv_data", "args": {"skills": ["Go"]}, "id": "c1"}]),
+        AIMessage(content="Added Go to your skills."),
+    ]))
+    saved = {name: getattr(agent, name) for name in ("get_llm", "UPDATE_MODE")}
+    agent.get_llm = lambda: model
+    agent.UPDATE_MODE = "react"
+    agent._agent = None
+
+    async def run():
+        await agent.init_checkpointer()
+        await agent.seed_cv("seeded", SEEDED)
+        result = await agent.get_agent_response("I also know Go", thread_id="seeded")
+        state = await agent._get_agent().aget_state({"configurable": {"thread_id": "seeded"}})
+        return result, state.values["cv"]
+
+    try:
+        result, cv = asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(agent, name, value)
+        agent._agent = None
+
+    system_prompt = model.prompts[0][0].content
+    assert "Backend Engineer @ Acme" in system_prompt, "The seeded CV should be in the first prompt"
+    assert "Python; SQL" in system_prompt
+
+    assert result["reply"] == "Added Go to your skills."
+    assert result["cv_update"] == {"skills": ["Python", "SQL", "Go"]}, "Touched sections come back merged"
+
+    assert cv["personalInfo"] == SEEDED["personalInfo"], "Seeded sections must not be overwritten"
+    assert cv["experience"] == SEEDED["experience"]
+    assert not agent._thread_locks
+
+    print("CV seeding test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_seeded_cv_carries_into_chat()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
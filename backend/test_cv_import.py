@@ -0,0 +1,127 @@
+import sys
+import os
+import json
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.cv_import as cv_import
+from langchain_core.messages import AIMessage
+
+CV_TEXT = """Ana Lee
+Backend Engineer | ana@example.com | +44 7700 900123
+
+PROFILE
+Backend engineer with 6 years building payment APIs.
+
+Work Experience
+Backend Engineer, Acme Payments, 2020 - Present
+""" + "- Built and operated ledger services handling card settlements.\n" * 60 + """
+EDUCATION:
+BSc Computer Science, University of Leeds, 2014 - 2017
+
+Skills
+Python, Go, PostgreSQL
+
+Languages
+English (Native), Spanish (B2)
+"""
+
+RESPONSES = {
+    "personalInfo": {"personalInfo": {"firstName": "Ana", "lastName": "Lee", "jobTitle": "Backend Engineer",
+                                      "email": "ana@example.com", "github": None,
+                                      "summary": "Backend engineer with 6 years building payment APIs."}},
+    "experience": {"experience": [{"title": "Backend Engineer", "company": "Acme Payments",
+                                   "startDate": "2020", "endDate": "Present", "description": "- Built ledgers"}]},
+    "education": {"education": [{"degree": "BSc Computer Science", "school": "University of Leeds",
+                                 "startDate": "2014", "endDate": "2017"}]},
+    "skills": {"skills": ["Python", "Go", "PostgreSQL"], "certifications": [],
+               "languages": [{"name": "English", "level": "Native"}, {"name": "Spanish", "level": None}]},
+}
+
+
+class SectionLLM:
+    """Answers each extraction call from the section its prompt asks for, and tracks overlap."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, messages):
+        system, human = messages[0].content, messages[1].content
+        self.calls.append(human)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        response = {}
+        for key, value in RESPONSES.items():
+            if f'"{key}"' in system:
+                response.update(value)
+        return AIMessage(content="```json\n" + json.dumps(response) + "\n```")
+
+
+def test_split_sections():
+    print("Testing CV section splitting...")
+
+    sections = cv_import.split_sections(CV_TEXT)
+
+    assert set(sections) == {"header", "summary", "experience", "education", "skills", "languages"}
+    assert sections["header"].startswith("Ana Lee")
+    assert sections["education"] == "BSc Computer Science, University of Leeds, 2014 - 2017"
+    assert cv_import._heading("Backend engineer with 6 years building payment APIs.") is None
+
+    print("Split test passed!")
+
+
+def _run_import(text):
+    llm = SectionLLM()
+    saved = cv_import.get_llm
+    cv_import.get_llm = lambda: llm
+    try:
+        return asyncio.run(cv_import.import_cv_text(text)), llm
+    finally:
+        cv_import.get_llm = saved
+
+
+def test_long_cv_imports_sections_in_parallel():
+    print("Testing section-parallel CV import...")
+
+    cv_update, llm = _run_import(CV_TEXT)
+
+    assert len(llm.calls) == 4 and llm.max_in_flight == 4, "Section groups should be extracted concurrently"
+    assert all(len(call) < len(CV_TEXT) for call in llm.calls), "Each call should get only its sections"
+    assert cv_update["personalInfo"]["summary"].startswith("Backend engineer")
+    assert "github" not in cv_update["personalInfo"], "Nulls should be dropped"
+    assert cv_update["experience"][0]["company"] == "Acme Payments"
+    assert cv_update["education"][0]["school"] == "University of Leeds"
+    assert cv_update["skills"] == ["Python", "Go", "PostgreSQL"]
+    assert cv_update["languages"] == [{"name": "English", "level": "Native"}, {"name": "Spanish"}]
+    assert "certifications" not in cv_update
+
+    print("Parallel import test passed!")
+
+
+def test_short_cv_uses_one_call():
+    print("Testing single-call CV import...")
+
+    short = "Ana Lee\nana@example.com\nSkills\nPython"
+    cv_update, llm = _run_import(short)
+
+    assert len(llm.calls) == 1 and llm.calls[0] == short
+    assert set(cv_update) == {"personalInfo", "experience", "education", "skills", "languages"}
+
+    print("Single-call test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_split_sections()
+        test_long_cv_imports_sections_in_parallel()
+        test_short_cv_uses_one_call()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
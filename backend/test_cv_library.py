@@ -0,0 +1,108 @@
+import sys
+import os
+import datetime
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# No database server needed: the library is exercised against in-memory SQLite.
+os.environ.setdefault("DB_URL", "sqlite://")
+
+import backend.cv_library as cv_library
+import backend.database as database
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+models = cv_library.models
+
+
+def _engine():
+    return create_engine("sqlite://", poolclass=StaticPool)
+
+
+def _db(engine):
+    models.Base.metadata.create_all(bind=engine, tables=[models.User.__table__, models.CV.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def test_keyset_pagination():
+    print("Testing CV library pagination...")
+
+    engine = _engine()
+    db = _db(engine)
+    base = datetime.datetime(2026, 1, 1)
+    for i in range(500):
+        # Pairs share a timestamp, so the id tiebreak matters.
+        db.add(models.CV(user_id=1, filename=f"cv{i}", content="{}",
+                         created_at=base + datetime.timedelta(minutes=i // 2)))
+    db.add(models.CV(user_id=2, filename="other", content="{}", created_at=base))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = cv_library.list_cvs(db, 1, limit=40, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 500 and len({cv.id for cv in seen}) == 500
+    keys = [(cv.created_at, cv.id) for cv in seen]
+    assert keys == sorted(keys, reverse=True), "Pages should be newest first with no gaps"
+    assert all("content" not in cv.__dict__ for cv in seen), "Listing must not load content"
+    assert not any("cvs.content" in sql for sql in statements)
+
+    full = cv_library.get_cv(db, 1, seen[0].id)
+    assert cv_library.cv_content(full) == {}
+    assert cv_library.get_cv(db, 2, seen[0].id) is None, "Other users' CVs are not visible"
+
+    # Server-default timestamps (second resolution on SQLite) must page cleanly too.
+    db.add_all(models.CV(user_id=3, filename=f"new{i}") for i in range(30))
+    db.commit()
+    seen, cursor = [], None
+    for _ in range(10):
+        page, cursor = cv_library.list_cvs(db, 3, limit=7, cursor=cursor)
+        seen.extend(cv.id for cv in page)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(set(seen)) and len(seen) == 30
+
+    try:
+        cv_library.list_cvs(db, 1, cursor="not-a-cursor")
+        assert False, "A malformed cursor should raise ValueError"
+    except ValueError:
+        pass
+
+    print("Pagination test passed!")
+
+
+def test_migration_adds_index_to_existing_table():
+    print("Testing CV index migration...")
+
+    engine = _engine()
+    with engine.begin() as conn:
+        # A cvs table as created before the index existed.
+        conn.execute(text(
+            "CREATE TABLE cvs (id INTEGER PRIMARY KEY, user_id INTEGER, filename VARCHAR, "
+            "content TEXT, original_pdf_path VARCHAR, created_at DATETIME, updated_at DATETIME)"
+        ))
+    with engine.begin() as conn:
+        database.run_migrations(conn)
+    with engine.begin() as conn:
+        database.run_migrations(conn)  # already at head: no-op
+
+    indexes = {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes("cvs")}
+    assert indexes.get("ix_cvs_user_id_created_at") == ["user_id", "created_at"]
+
+    print("Migration test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_keyset_pagination()
+        test_migration_adds_index_to_existing_table()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,117 @@
+import sys
+import os
+import json
+import asyncio
+
+os.environ.setdefault("DB_URL", "sqlite://")
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.cv_polish as cv_polish
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CV = {
+    "personalInfo": {"firstName": "Sam", "jobTitle": "Backend Engineer", "summary": "i write apis"},
+    "experience": [
+        {"title": "Engineer", "company": f"Co{i}", "description": f"did thing {i}" if i != 2 else ""}
+        for i in range(7)
+    ],
+    "skills": ["Python"],
+}
+
+
+class PolishModel(BaseChatModel):
+    """Fake editor: prefixes every text with "Improved:", tracking calls in flight."""
+    calls: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-polish"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        items = json.loads(messages[-1].content)
+        reply = {key: f"Improved: {item['text']}" for key, item in items.items()}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=json.dumps(reply)))])
+
+
+def _polish(cv, hashes=(), concurrency=2):
+    llm = PolishModel()
+    saved = cv_polish.get_llm
+    cv_polish.get_llm = lambda: llm
+
+    async def run():
+        fields = cv_polish.collect_fields(cv)
+        return [event async for event in cv_polish.polish_fields(fields, hashes, concurrency=concurrency)]
+
+    try:
+        return asyncio.run(run()), llm
+    finally:
+        cv_polish.get_llm = saved
+
+
+def test_fields_grouped_by_section():
+    print("Testing CV polish grouping...")
+
+    fields = cv_polish.collect_fields(CV)
+    assert [f.path for f in fields][:3] == ["personalInfo.summary", "experience.0.description",
+                                           "experience.1.description"]
+    assert "experience.2.description" not in [f.path for f in fields], "Empty fields are not polished"
+    groups = cv_polish.group_fields(fields, per_call=4)
+    assert [[f.section for f in g] for g in groups] == [["summary"], ["experience"] * 4, ["experience"] * 2]
+
+    try:
+        cv_polish.collect_fields({"experience": "not a list of entries"})
+        raise AssertionError("Expected ValueError for a malformed CV")
+    except ValueError:
+        pass
+
+    print("CV polish grouping test passed!")
+
+
+def test_polish_streams_and_skips_unchanged():
+    print("Testing CV polish fan-out...")
+
+    events, llm = _polish(CV)
+    improved = {e["path"]: e for e in events if "improved_text" in e}
+    assert len(improved) == 7 and events[-1]["done"] and events[-1]["improved"] == 7
+    assert improved["experience.3.description"]["improved_text"] == "Improved: did thing 3"
+    assert llm.calls == 3, "summary + two experience groups"
+    assert llm.max_in_flight == 2, "Calls run concurrently, up to the limit"
+
+    # Second run: fields still holding their polished text are skipped.
+    cv = json.loads(json.dumps(CV))
+    cv["personalInfo"]["summary"] = improved["personalInfo.summary"]["improved_text"]
+    for i, entry in enumerate(cv["experience"]):
+        if entry["description"]:
+            entry["description"] = improved[f"experience.{i}.description"]["improved_text"]
+    cv["experience"][5]["description"] = "edited since"
+    hashes = [e["hash"] for e in improved.values()]
+
+    events, llm = _polish(cv, hashes)
+    assert [e["path"] for e in events if "improved_text" in e] == ["experience.5.description"]
+    assert events[-1] == {"done": True, "improved": 1, "skipped": 6, "failed": 0, "calls": 1, "partial": False}
+    assert llm.calls == 1
+
+    print("CV polish fan-out test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_fields_grouped_by_section()
+        test_polish_streams_and_skips_unchanged()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
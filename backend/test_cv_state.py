@@ -0,0 +1,85 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.agent import merge_cv_state, summarize_cv, update_cv_data, _collect_turn_artifacts
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+
+def test_merge_cv_state():
+    print("Testing CV state merging...")
+
+    state = merge_cv_state({}, {
+        "personalInfo": {"firstName": "Ana"},
+        "skills": ["Python", "SQL"],
+        "experience": [{"title": "Dev", "company": "Acme"}],
+    })
+    state = merge_cv_state(state, {
+        "personalInfo": {"lastName": "Lee"},
+        "skills": ["python", "Go"],
+        "experience": [
+            {"title": "dev", "company": "ACME", "description": "Built APIs"},
+            {"title": "Intern", "company": "Initech"},
+        ],
+    })
+
+    assert state["personalInfo"] == {"firstName": "Ana", "lastName": "Lee"}
+    assert state["skills"] == ["Python", "SQL", "Go"], "Skills should be a case-insensitive union"
+    assert len(state["experience"]) == 2, "Matching entries should be updated in place"
+    assert state["experience"][0]["description"] == "Built APIs"
+
+    print("Merge test passed!")
+
+
+def test_summary_is_bounded():
+    print("Testing CV summary size...")
+
+    small = summarize_cv({"skills": [f"skill {i}" for i in range(10)]})
+    large = summarize_cv({"skills": [f"skill {i}" for i in range(1000)]})
+
+    assert len(large) - len(small) < 10, "Summary size should not grow with the CV"
+    assert "(+995 more)" in large
+
+    print("Summary test passed!")
+
+
+def test_update_tool_returns_artifact():
+    print("Testing structured tool output...")
+
+    command = update_cv_data.invoke({
+        "type": "tool_call",
+        "id": "call_1",
+        "name": "update_cv_data",
+        "args": {"skills": ["Python"]},
+    })
+    tool_msg = command.update["messages"][0]
+
+    assert command.update["cv"] == {"skills": ["Python"]}
+    assert tool_msg.artifact == {"cv_update": {"skills": ["Python"]}}
+    assert "Python" not in tool_msg.content, "The model should only see a short confirmation"
+
+    messages = [
+        HumanMessage(content="old turn"),
+        ToolMessage(content="ok", artifact={"cv_update": {"education": []}}, tool_call_id="old"),
+        HumanMessage(content="I know Python"),
+        AIMessage(content=""),
+        tool_msg,
+    ]
+    cv_update, download = _collect_turn_artifacts(messages, {"skills": ["SQL", "Python"], "education": []})
+
+    assert cv_update == {"skills": ["SQL", "Python"]}, "Only sections touched this turn are returned"
+    assert download is None
+
+    print("Tool artifact test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_merge_cv_state()
+        test_summary_is_bounded()
+        test_update_tool_returns_artifact()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,229 @@
+import sys
+import os
+import time
+import asyncio
+
+os.environ.setdefault("DB_URL", "sqlite://")
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.llm_factory as llm_factory
+import backend.ocr_service as ocr_service
+import pypdf
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+# The module the LLM and OCR code actually read the budget from.
+deadlines = llm_factory.deadlines
+
+
+class SlowModel(GenericFakeChatModel):
+    delay: float = 5.0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._generate(messages, stop=stop, **kwargs)
+
+
+class FastModel(GenericFakeChatModel):
+    pass
+
+
+class SlowAgentModel(SlowModel):
+    # Annotated like the real models' bind_tools, so the deadline chain re-wraps the result.
+    def bind_tools(self, tools, **kwargs) -> Runnable:
+        return self
+
+
+def _chain():
+    return llm_factory._chain([
+        SlowModel(messages=iter([AIMessage(content="slow")])),
+        FastModel(messages=iter([AIMessage(content="fast")])),
+    ])
+
+
+def test_budget_for_route_and_header():
+    print("Testing request budgets...")
+
+    ceiling = deadlines.REQUEST_DEADLINE_SECONDS
+    assert deadlines.budget_for("/upload") == ceiling
+    assert deadlines.budget_for("/refine") == min(45.0, ceiling)
+    assert deadlines.budget_for("/refine", "12.5") == 12.5
+    assert deadlines.budget_for("/upload", str(ceiling * 10)) == ceiling, "Header can't exceed the ceiling"
+    assert deadlines.budget_for("/refine", "soon") == deadlines.budget_for("/refine", "-3") == min(45.0, ceiling)
+
+    with deadlines.deadline(10) as outer:
+        with deadlines.deadline(60) as inner:
+            assert inner.expires_at == outer.expires_at, "Nested budgets can only tighten"
+            deadlines.note_cut("ocr")
+        assert deadlines.cut_short() == ["ocr"]
+        with deadlines.detached():
+            assert deadlines.remaining() is None
+    assert deadlines.remaining() is None
+
+    print("Budget test passed!")
+
+
+def test_llm_tiers_respect_deadline():
+    print("Testing deadline-aware LLM fallbacks...")
+
+    saved = llm_factory.LLM_MIN_ATTEMPT_SECONDS
+    llm_factory.LLM_MIN_ATTEMPT_SECONDS = 0.2
+    llm_factory._tier_latency.clear()
+
+    async def run():
+        # Nothing known about the tiers yet: the slow one is tried, capped at
+        # the budget, and the fast one no longer fits.
+        with deadlines.deadline(0.5) as budget:
+            started = time.monotonic()
+            try:
+                await _chain().ainvoke("hi")
+                raise AssertionError("Expected DeadlineExceeded")
+            except deadlines.DeadlineExceeded:
+                pass
+            elapsed = time.monotonic() - started
+            cut = list(budget.cut)
+
+        # The slow tier is now known to take at least 0.5 s, so it is skipped up front.
+        with deadlines.deadline(0.4):
+            started = time.monotonic()
+            reply = await _chain().ainvoke("hi")
+            skipped_in = time.monotonic() - started
+
+        # Without a deadline every tier stays in play.
+        unbounded = len(list(_chain().runnables))
+        return elapsed, cut, reply, skipped_in, unbounded
+
+    try:
+        elapsed, cut, reply, skipped_in, unbounded = asyncio.run(run())
+    finally:
+        llm_factory.LLM_MIN_ATTEMPT_SECONDS = saved
+        llm_factory._tier_latency.clear()
+
+    assert elapsed < 1.0, f"Slow tier should be cut off at the deadline, took {elapsed:.2f}s"
+    assert cut == ["llm"]
+    assert reply.content == "fast" and skipped_in < 0.3
+    assert unbounded == 2
+
+    print("LLM deadline test passed!")
+
+
+def test_skipped_tiers_recover():
+    print("Testing tier latency recovery...")
+
+    saved = llm_factory.LLM_MIN_ATTEMPT_SECONDS, llm_factory.LLM_LATENCY_HALF_LIFE_SECONDS
+    llm_factory.LLM_MIN_ATTEMPT_SECONDS = 0.2
+    llm_factory.LLM_LATENCY_HALF_LIFE_SECONDS = 60
+    llm_factory._tier_latency.clear()
+
+    async def run():
+        # Both tiers were once slow on a long route; this route's budget fits neither.
+        llm_factory.record_latency("SlowModel", 40.0)
+        llm_factory.record_latency("FastModel", 20.0)
+        with deadlines.deadline(0.4) as budget:
+            reply = await _chain().ainvoke("hi")
+            cut = list(budget.cut)
+        forced = llm_factory._tier_latency["FastModel"][0]
+
+        # Ten minutes without a call: the slow tier's estimate is back near the floor.
+        seconds, updated = llm_factory._tier_latency["SlowModel"]
+        llm_factory._tier_latency["SlowModel"] = (seconds, updated - 600)
+        decayed = llm_factory.tier_latencies()["SlowModel"]
+        return reply, cut, forced, decayed
+
+    try:
+        reply, cut, forced, decayed = asyncio.run(run())
+    finally:
+        llm_factory.LLM_MIN_ATTEMPT_SECONDS, llm_factory.LLM_LATENCY_HALF_LIFE_SECONDS = saved
+        llm_factory._tier_latency.clear()
+
+    assert reply.content == "fast", "With time left the fastest-looking tier is still tried"
+    assert cut == []
+    assert forced < 20.0, "A fresh call updates the estimate"
+    assert decayed < 2.0, f"Estimate should decay toward the floor, got {decayed}"
+
+    print("Tier recovery test passed!")
+
+
+def _blank_pdf(pages: int) -> bytes:
+    import io
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_pdf_pages_stop_at_deadline():
+    print("Testing OCR page loop deadline...")
+
+    saved = ocr_service.extract_pdf_page, ocr_service.OCR_DEADLINE_RESERVE
+
+    def slow_page(page, engine, preprocess):
+        time.sleep(0.1)
+        return ocr_service.PageResult("page text", 90.0, "test")
+
+    ocr_service.extract_pdf_page = slow_page
+    ocr_service.OCR_DEADLINE_RESERVE = 0.0
+    try:
+        with deadlines.deadline(0.35) as budget:
+            text = ocr_service.extract_text_from_pdf(_blank_pdf(10))
+            cut = list(budget.cut)
+        full = ocr_service.extract_text_from_pdf(_blank_pdf(3))
+    finally:
+        ocr_service.extract_pdf_page, ocr_service.OCR_DEADLINE_RESERVE = saved
+
+    pages_read = text.count("page text")
+    assert 1 <= pages_read < 10
+    assert f"Stopped after {pages_read} of 10 pages" in text
+    assert cut == ["ocr"]
+    assert full.count("page text") == 3 and "Stopped" not in full
+
+    print("OCR deadline test passed!")
+
+
+def test_chat_times_out_with_504():
+    print("Testing /chat deadline...")
+
+    # The app's own module names (not backend.*), as the handlers import them.
+    import main
+    from fastapi.testclient import TestClient
+
+    saved = dict(main.llm_factory._registry)
+    model = SlowAgentModel(messages=iter([AIMessage(content="too late")] * 10), delay=2.0)
+    main.llm_factory._registry["default"] = main.llm_factory._chain([model])
+    main.llm_factory._registry["summary"] = model
+    message = "Why would a recruiter prefer my second project over the first one?"
+    try:
+        with TestClient(main.app) as client:
+            started = time.monotonic()
+            response = client.post(
+                "/chat",
+                json={"messages": [{"role": "user", "content": message}], "thread_id": "deadline"},
+                headers={deadlines.DEADLINE_HEADER: "0.3"},
+            )
+            elapsed = time.monotonic() - started
+    finally:
+        main.llm_factory._registry.clear()
+        main.llm_factory._registry.update(saved)
+
+    assert response.status_code == 504, f"{response.status_code} {response.text}"
+    assert "took too long" in response.json()["detail"]
+    assert elapsed < 1.5, f"Should stop at the deadline, took {elapsed:.2f}s"
+
+    print("/chat deadline test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_budget_for_route_and_header()
+        test_llm_tiers_respect_deadline()
+        test_skipped_tiers_recover()
+        test_pdf_pages_stop_at_deadline()
+        test_chat_times_out_with_504()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
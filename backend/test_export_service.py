@@ -0,0 +1,61 @@
+import sys
+import os
+import io
+import csv
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.export_service import export_columns, iter_csv, iter_xlsx
+from openpyxl import load_workbook
+
+RESULTS = [
+    {"filename": "a.jpg", "summary": "Receipt A", "fields": {"total": 10, "vendor": "Acme"}},
+    {"filename": "b.jpg", "summary": "Receipt B", "fields": {"vendor": "=cmd()", "items": ["x", "y"]}},
+]
+
+
+def test_columns_are_union_of_fields():
+    print("Testing export columns...")
+
+    assert export_columns(RESULTS) == ["filename", "summary", "total", "vendor", "items"]
+
+    print("Columns test passed!")
+
+
+def test_csv_export():
+    print("Testing CSV export...")
+
+    data = b"".join(iter_csv(RESULTS)).decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(data)))
+
+    assert rows[0] == ["filename", "summary", "total", "vendor", "items"]
+    assert rows[1] == ["a.jpg", "Receipt A", "10", "Acme", ""]
+    assert rows[2][3] == "'=cmd()", "Formula-like text should be neutralised"
+    assert rows[2][4] == '["x", "y"]'
+
+    print("CSV test passed!")
+
+
+def test_xlsx_export():
+    print("Testing XLSX export...")
+
+    sheet = load_workbook(io.BytesIO(b"".join(iter_xlsx(RESULTS)))).active
+    rows = list(sheet.iter_rows(values_only=True))
+
+    assert rows[0] == ("filename", "summary", "total", "vendor", "items")
+    assert rows[1][:4] == ("a.jpg", "Receipt A", 10, "Acme")
+    assert sheet["D3"].value == "=cmd()" and sheet["D3"].data_type == "s", \
+        "Formula-like text should be stored as a string"
+
+    print("XLSX test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_columns_are_union_of_fields()
+        test_csv_export()
+        test_xlsx_export()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
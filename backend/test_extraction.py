@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.extraction as extraction
+from backend.extraction import Document, pack_documents
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+def _doc(i: int, chars: int = 400) -> Document:
+    return Document(id=f"doc{i}", filename=f"receipt_{i}.jpg", text=f"Receipt {i} " + "x" * chars)
+
+
+def test_pack_documents():
+    print("Testing document packing...")
+
+    docs = [_doc(i, chars=400) for i in range(30)]
+    batches = pack_documents(docs, token_budget=1000, max_documents=10)
+
+    assert [d for batch in batches for d in batch] == docs, "Packing must keep every document, in order"
+    assert all(sum(extraction.estimate_tokens(d.text) for d in b) <= 1000 for b in batches)
+    assert len(batches) < len(docs)
+
+    big = Document(id="big", filename="big.pdf", text="y" * 20000)
+    assert pack_documents([_doc(0), big, _doc(1)], token_budget=1000) == [[_doc(0)], [big], [_doc(1)]]
+
+    print("Packing test passed!")
+
+
+def test_batch_split_and_fallback():
+    print("Testing batched extraction...")
+
+    batched = {"documents": [
+        {"id": "doc0", "summary": "Receipt 0", "fields": {"total": "10"}},
+        {"id": "doc1", "summary": "Receipt 1", "fields": "not a dict"},  # fails validation
+    ]}  # doc2 missing entirely
+    responses = iter([
+        AIMessage(content="```json\n" + json.dumps(batched) + "\n```"),
+        AIMessage(content=json.dumps({"summary": "Retry", "fields": {"total": "11"}})),
+        AIMessage(content=json.dumps({"summary": "Retry", "fields": {"total": "12"}})),
+    ])
+    fake = GenericFakeChatModel(messages=responses)
+
+    saved = extraction.get_llm
+    extraction.get_llm = lambda: fake
+    try:
+        results = asyncio.run(extraction.extract_batch([_doc(0), _doc(1), _doc(2)]))
+    finally:
+        extraction.get_llm = saved
+
+    assert [r["filename"] for r in results] == ["receipt_0.jpg", "receipt_1.jpg", "receipt_2.jpg"]
+    assert results[0]["fields"] == {"total": "10"}
+    assert results[0]["raw_text"] == _doc(0).text
+    assert results[1]["summary"] == "Retry" and results[2]["summary"] == "Retry", \
+        "Invalid or missing items should be retried one by one"
+
+    print("Batch test passed!")
+
+
+def test_pattern_fields_skip_or_shrink_llm():
+    print("Testing pattern pre-extraction...")
+
+    complete = Document(id="doc0", filename="a.pdf",
+                        text="Invoice No: INV-7\nTotal: EUR 90.00\nContact: ap@acme.com")
+    partial = Document(id="doc1", filename="b.pdf",
+                       text="Acme Ltd, write to us\nInvoice No: INV-8\nTotal: EUR 12.50")
+
+    prompts = []
+
+    class RecordingModel(GenericFakeChatModel):
+        def _generate(self, messages, *args, **kwargs):
+            prompts.append("\n".join(m.content for m in messages))
+            return super()._generate(messages, *args, **kwargs)
+
+    fake = RecordingModel(messages=iter([
+        AIMessage(content=json.dumps({"summary": "Acme invoice",
+                                      "fields": {"email": None, "total": "wrong"}})),
+    ]))
+    saved = extraction.get_llm
+    extraction.get_llm = lambda: fake
+    try:
+        results = asyncio.run(extraction.extract_documents([complete, partial], "invoice_number, total, email"))
+    finally:
+        extraction.get_llm = saved
+
+    assert len(prompts) == 1, "Only the document with an unresolved field goes to the LLM"
+    assert "SPECIFICALLY the following fields: email." in prompts[0]
+    assert '"invoice_number": "INV-8"' in prompts[0], "Pattern results are passed as hints"
+
+    assert results[0]["summary"] == extraction.PATTERN_SUMMARY
+    assert results[0]["fields"] == {"invoice_number": "INV-7", "total": "EUR 90.00", "email": "ap@acme.com"}
+    assert results[0]["raw_text"] == complete.text
+
+    # Pattern values win over the LLM's, and fields keep schema order.
+    assert results[1]["fields"] == {"invoice_number": "INV-8", "total": "EUR 12.50", "email": None}
+    assert results[1]["summary"] == "Acme invoice"
+    assert {"kind": "amount", "field": "total"}.items() <= results[1]["matches"][1].items()
+
+    print("Pattern pre-extraction test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_pack_documents()
+        test_batch_split_and_fallback()
+        test_pattern_fields_skip_or_shrink_llm()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
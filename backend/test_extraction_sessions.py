@@ -0,0 +1,81 @@
+import sys
+import os
+import datetime
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+# No database server needed: sessions are exercised against in-memory SQLite.
+os.environ.setdefault("DB_URL", "sqlite://")
+
+import backend.extraction_sessions as extraction_sessions
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+models = extraction_sessions.models
+
+TEXT = "Invoice INV-7 " + "line item\n" * 2000
+
+
+def _db():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine, tables=[models.ExtractionDocument.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def test_session_roundtrip():
+    print("Testing extraction session storage...")
+
+    db = _db()
+    results = [
+        {"filename": "a.pdf", "summary": "Invoice", "fields": {"total": "10"}, "raw_text": TEXT},
+        {"filename": "b.jpg", "summary": "Error", "fields": {"error": "No text extracted"}, "raw_text": ""},
+    ]
+    session_id, _ = extraction_sessions.create_session(db, results)
+
+    shown = extraction_sessions.preview(results[0], session_id, 0)
+    assert len(shown["raw_text"]) == extraction_sessions.PREVIEW_CHARS and shown["raw_text_truncated"]
+    assert shown["session_id"] == session_id and shown["document"] == 0
+
+    doc = extraction_sessions.get_document(db, session_id, 0)
+    assert extraction_sessions.document_text(doc) == TEXT
+    assert len(doc.raw_text) < len(TEXT) / 10, "Stored text should be compressed"
+
+    extraction_sessions.update_document(db, doc, "Invoice INV-7", {"total": "12"})
+    results = extraction_sessions.session_results(db, session_id)
+    expected = [
+        {"filename": "a.pdf", "summary": "Invoice INV-7", "fields": {"total": "12"}},
+        {"filename": "b.jpg", "summary": "Error", "fields": {"error": "No text extracted"}},
+    ]
+    assert list(results) == expected
+    assert list(results) == expected, "Results can be iterated again (export reads them twice)"
+    assert extraction_sessions.get_document(db, "missing", 0) is None
+
+    print("Session roundtrip test passed!")
+
+
+def test_sessions_expire():
+    print("Testing extraction session expiry...")
+
+    db = _db()
+    session_id, _ = extraction_sessions.create_session(
+        db, [{"filename": "a.pdf", "summary": "", "fields": {}, "raw_text": "x"}]
+    )
+    past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+    db.query(models.ExtractionDocument).update({"expires_at": past})
+    db.commit()
+
+    assert extraction_sessions.get_document(db, session_id, 0) is None
+    assert extraction_sessions.session_results(db, session_id) is None
+    assert extraction_sessions.purge_expired(db) == 1
+
+    print("Expiry test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_session_roundtrip()
+        test_sessions_expire()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,77 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.field_patterns as field_patterns
+
+INVOICE = """ACME Ltd, 12 High Street, London
+Tel: +44 20 7946 0958   Email: billing@acme.co.uk
+Invoice No: INV-2026-0042
+Invoice date: 14/02/2026
+Due date: March 1, 2026
+Widgets               10   125.00
+Subtotal                   1,250.00
+VAT 20%                    250.00
+Total due                  EUR 1,500.00
+Pay to IBAN GB82 WEST 1234 5698 7654 32 BIC WESTGB22
+"""
+
+
+def test_find_matches():
+    print("Testing pattern matches...")
+
+    matches = field_patterns.find_matches(INVOICE)
+    by_kind = {}
+    for match in matches:
+        by_kind.setdefault(match.kind, []).append(match.value)
+        assert INVOICE[match.start:match.end].replace(" ", "") == match.value.replace(" ", ""), "Spans point at the hit"
+
+    assert by_kind["email"] == ["billing@acme.co.uk"]
+    assert by_kind["phone"] == ["+44 20 7946 0958"]
+    assert by_kind["invoice_number"] == ["INV-2026-0042"]
+    assert by_kind["date"] == ["14/02/2026", "March 1, 2026"]
+    # The unlabelled line price is not an amount; the labelled ones are.
+    assert by_kind["amount"] == ["1,250.00", "250.00", "EUR 1,500.00"]
+    # Checksum-verified, without the "BIC" that follows.
+    assert by_kind["iban"] == ["GB82WEST12345698765432"]
+
+    assert not field_patterns.find_matches("GB82 WEST 1234 5698 7654 33 and 2026-13-45")
+    assert not field_patterns.find_matches("Invoice from Acme, call us on 1234")
+
+    print("Pattern matches test passed!")
+
+
+def test_prefill_resolves_by_label():
+    print("Testing schema prefill...")
+
+    prefill = field_patterns.prefill(INVOICE, "invoice_number, due_date, total, vat, iban, email, vendor, date")
+    assert prefill.known_values() == {
+        "invoice_number": "INV-2026-0042",
+        "due_date": "March 1, 2026",
+        "total": "EUR 1,500.00",
+        "vat": "250.00",
+        "iban": "GB82WEST12345698765432",
+        "email": "billing@acme.co.uk",
+    }
+    # No pattern for a vendor; two dates and no label to pick one for "date".
+    assert prefill.missing == ["vendor", "date"] and not prefill.complete
+    assert prefill.hints["date"] == ["14/02/2026"]
+    assert any(m.field == "total" for m in prefill.matches)
+
+    # A qualified amount with no matching label is left to the LLM.
+    assert field_patterns.prefill("Total: $40.00", "tax").missing == ["tax"]
+    assert field_patterns.prefill(INVOICE, "email, iban").complete
+    assert not field_patterns.prefill(INVOICE, None).complete
+
+    print("Schema prefill test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_find_matches()
+        test_prefill_resolves_by_label()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.image_preprocessing import PreprocessOptions, preprocess_image, estimate_skew
+from PIL import Image, ImageDraw, ImageFont
+
+
+def _page(skew: float = 0.0) -> Image.Image:
+    page = Image.new("L", (1200, 1600), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    for i in range(20):
+        draw.text((150, 200 + i * 50), f"The quick brown fox jumps over the lazy dog {i}", fill=0, font=font)
+    return page.rotate(skew, expand=True, fillcolor=255).resize((3000, 4000))
+
+
+def test_deskew_estimate():
+    print("Testing skew estimation...")
+
+    angle = estimate_skew(_page(skew=-4))
+    assert abs(angle - 4) <= 0.5, f"Expected ~4 degrees, got {angle}"
+
+    print("Skew test passed!")
+
+
+def test_pipeline_shrinks_and_binarizes():
+    print("Testing preprocessing pipeline...")
+
+    out = preprocess_image(_page(skew=3), PreprocessOptions(target_dpi=200))
+
+    assert max(out.size) <= 200 * 11.7, "Image should be downscaled to the target DPI"
+    assert set(out.tobytes()) <= {0, 255}, "Image should be binarized"
+    assert out.size[0] < 3000 and out.size[1] < 4000, "Image should be cropped to content"
+
+    untouched = preprocess_image(_page(), PreprocessOptions.disabled())
+    assert untouched.size == (3000, 4000)
+
+    print("Pipeline test passed!")
+
+
+def test_options_from_spec():
+    print("Testing per-request options...")
+
+    assert PreprocessOptions.from_spec(None) == PreprocessOptions()
+    assert not PreprocessOptions.from_spec("none").binarize
+    assert PreprocessOptions.from_spec('{"deskew": false, "target_dpi": 150}').target_dpi == 150
+
+    print("Options test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_deskew_estimate()
+        test_pipeline_shrinks_and_binarizes()
+        test_options_from_spec()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
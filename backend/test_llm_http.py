@@ -0,0 +1,100 @@
+import sys
+import os
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.llm_factory as llm_factory
+import httpx
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_connection_stats_count_reuse():
+    print("Testing connection reuse stats...")
+
+    server, url = _serve()
+    try:
+        stats = llm_factory.ConnectionStats()
+        with httpx.Client(event_hooks=stats.sync_hooks(), **llm_factory._client_options()) as client:
+            for _ in range(5):
+                assert client.get(url).status_code == 200
+
+        async def burst():
+            async with httpx.AsyncClient(event_hooks=stats.async_hooks(), **llm_factory._client_options()) as client:
+                for _ in range(3):
+                    assert (await client.get(url)).status_code == 200
+
+        asyncio.run(burst())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with httpx.Client(event_hooks=stats.sync_hooks(), **llm_factory._client_options()) as client:
+        try:
+            client.get(url)  # server is gone
+        except httpx.ConnectError:
+            pass
+
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 9 and snapshot["responses"] == 8
+    assert snapshot["connections_opened"] == 2, "Each client should open one connection and keep it"
+    assert snapshot["reused_requests"] == 6, "A failed request is not a reuse"
+    assert snapshot["failed_requests"] == 1
+    assert snapshot["http_versions"] == {"HTTP/1.1": 8}
+
+    print("Connection stats test passed!")
+
+
+def test_tiers_share_one_client():
+    print("Testing shared LLM HTTP clients...")
+
+    saved = {k: os.environ.get(k) for k in ("GROQ_API_KEY", "OPENROUTER_API_KEY", "GEMINI_API_KEY")}
+    os.environ.update(GROQ_API_KEY="test", OPENROUTER_API_KEY="test")
+    os.environ.pop("GEMINI_API_KEY", None)
+    try:
+        chain = llm_factory._build_llm()
+        models = [chain.runnable, *chain.fallbacks]
+        assert len(models) == 9  # 2 Groq + 7 OpenRouter
+        assert all(m.http_async_client is llm_factory.get_async_http_client() for m in models)
+        assert all(m.http_client is llm_factory.get_http_client() for m in models)
+        assert all(m.request_timeout.connect == llm_factory.LLM_CONNECT_TIMEOUT for m in models)
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        asyncio.run(llm_factory.close_http_clients())
+
+    print("Shared client test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_connection_stats_count_reuse()
+        test_tiers_share_one_client()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.agent as agent
+import backend.memory_diagnostics as memory_diagnostics
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+class ToolChatModel(GenericFakeChatModel):
+    """Fake model that accepts bind_tools()."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _update_call(call_id: str, **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": "update_cv_data", "args": args, "id": call_id}])
+
+
+def _run_turns(history_mode: str, turns: int = 4):
+    model = ToolChatModel(messages=iter([
+        _update_call(f"c{i}", skills=[f"skill {i}"]) for i in range(turns)
+    ]))
+    saved = {name: getattr(agent, name) for name in ("get_llm", "UPDATE_MODE", "CHECKPOINT_HISTORY")}
+    agent.get_llm = lambda: model
+    agent.UPDATE_MODE = "fast"
+    agent.CHECKPOINT_HISTORY = history_mode
+    agent._agent = None
+
+    async def run():
+        await agent.init_checkpointer()
+        for i in range(turns):
+            await agent.get_agent_response(f"I know skill {i}", thread_id="a" if i % 2 else "b")
+        state = await agent._get_agent().aget_state({"configurable": {"thread_id": "a"}})
+        return agent.checkpoint_stats(), state.values
+
+    try:
+        return asyncio.run(run())
+    finally:
+        for name, value in saved.items():
+            setattr(agent, name, value)
+        agent._agent = None
+
+
+def test_checkpoints_pruned_to_latest():
+    print("Testing checkpoint pruning and accounting...")
+
+    stats, values = _run_turns("latest")
+    assert stats["threads"] == 2 and stats["checkpoints"] == 2, "One checkpoint per thread"
+    assert stats["bytes"] == sum(t["bytes"] for t in stats["largest"]) > 0
+    # The latest state is intact after pruning.
+    assert values["cv"]["skills"] == ["skill 1", "skill 3"]
+    assert len(values["messages"]) == 8  # 2 turns x (human, tool call, tool result, reply)
+
+    full, _ = _run_turns("all")
+    assert full["checkpoints"] > 2 * stats["checkpoints"]
+    assert full["bytes"] > stats["bytes"]
+
+    print("Checkpoint pruning test passed!")
+
+
+def test_admin_token_and_tracemalloc_diff():
+    print("Testing memory diagnostics...")
+
+    saved = memory_diagnostics.MEMORY_DIAGNOSTICS, memory_diagnostics.ADMIN_TOKEN
+    memory_diagnostics.MEMORY_DIAGNOSTICS, memory_diagnostics.ADMIN_TOKEN = True, "s3cret"
+    try:
+        assert memory_diagnostics.token_valid("s3cret")
+        assert not memory_diagnostics.token_valid("wrong") and not memory_diagnostics.token_valid(None)
+        memory_diagnostics.MEMORY_DIAGNOSTICS = False
+        assert not memory_diagnostics.token_valid("s3cret"), "Off unless opted in"
+        assert memory_diagnostics.admin_token_matches("s3cret"), "The token alone guards /llm/stats"
+        assert not memory_diagnostics.admin_token_matches("wrong")
+        memory_diagnostics.ADMIN_TOKEN = ""
+        assert not memory_diagnostics.admin_token_matches(""), "No token configured: nothing matches"
+    finally:
+        memory_diagnostics.MEMORY_DIAGNOSTICS, memory_diagnostics.ADMIN_TOKEN = saved
+
+    gauges = memory_diagnostics.gauges()
+    assert gauges["rss_bytes"] > 0 and gauges["heap"]["allocated_blocks"] > 0
+
+    memory_diagnostics.start_tracing(frames=1)
+    try:
+        retained = [bytearray(1024) for _ in range(2000)]
+        diff = memory_diagnostics.diff_since_baseline(limit=5)
+        assert diff["size_diff_bytes"] > 2000 * 1024
+        assert diff["top"][0]["location"].startswith(__file__.removesuffix("c"))
+        assert memory_diagnostics.top_allocations(limit=1)["top"]
+    finally:
+        memory_diagnostics.stop_tracing()
+    del retained
+
+    try:
+        memory_diagnostics.diff_since_baseline()
+        raise AssertionError("Expected RuntimeError once tracing stopped")
+    except RuntimeError:
+        pass
+
+    print("Memory diagnostics test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_checkpoints_pruned_to_latest()
+        test_admin_token_and_tracemalloc_diff()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
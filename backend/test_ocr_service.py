@@ -0,0 +1,161 @@
+import sys
+import os
+import io
+import types
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.ocr_service as ocr_service
+import pypdf
+from PIL import Image
+
+
+class FakeAPI:
+    created = 0
+
+    def __init__(self, lang="eng", path=None):
+        FakeAPI.created += 1
+        self.ended = False
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        self.ended = True
+
+
+def test_api_pool_reuses_handles():
+    print("Testing Tesseract API handle reuse...")
+
+    saved = ocr_service.tesserocr
+    ocr_service.tesserocr = types.SimpleNamespace(PyTessBaseAPI=FakeAPI)
+    FakeAPI.created = 0
+    try:
+        pool = ocr_service.TesseractAPIPool(size=2, lang="eng")
+        for _ in range(5):
+            with pool.acquire():
+                pass
+        assert FakeAPI.created == 1, "Sequential calls should share one warm handle"
+
+        try:
+            with pool.acquire() as api:
+                raise RuntimeError("OCR failed")
+        except RuntimeError:
+            pass
+        assert api.ended, "A handle that failed mid-call should be discarded"
+
+        with pool.acquire() as fresh:
+            assert fresh is not api
+        pool.close()
+        assert fresh.ended
+    finally:
+        ocr_service.tesserocr = saved
+
+    print("API pool test passed!")
+
+
+TSV = "\n".join([
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext",
+    "1\t1\t0\t0\t0\t0\t0\t0\t100\t100\t-1\t",
+    "5\t1\t1\t1\t1\t1\t0\t0\t10\t10\t90\tInvoice",
+    "5\t1\t1\t1\t1\t2\t0\t0\t10\t10\t60\t42",
+    "5\t1\t1\t1\t2\t1\t0\t0\t10\t10\t90\tTotal",
+    "5\t1\t2\t1\t1\t1\t0\t0\t10\t10\t-1\t ",
+    "5\t1\t2\t1\t1\t2\t0\t0\t10\t10\t30\tDue",
+])
+
+
+def test_parse_tsv():
+    print("Testing TSV parsing...")
+
+    text, confidence = ocr_service.parse_tsv(TSV)
+
+    assert text == "Invoice 42\nTotal\n\nDue", repr(text)
+    expected = (90 * 7 + 60 * 2 + 90 * 5 + 30 * 3) / 17
+    assert abs(confidence - expected) < 1e-6, "Confidence should be weighted by word length"
+    assert ocr_service.parse_tsv("") == ("", 0.0)
+
+    print("TSV test passed!")
+
+
+def test_cli_fallback_uses_ocr_lang():
+    print("Testing Tesseract CLI fallback language...")
+
+    calls = []
+    saved = ocr_service.tesseract_api_available, ocr_service.pytesseract, ocr_service.OCR_LANG
+    ocr_service.tesseract_api_available = lambda: False
+    ocr_service.pytesseract = types.SimpleNamespace(
+        image_to_data=lambda image, **kwargs: calls.append(kwargs) or TSV
+    )
+    ocr_service.OCR_LANG = "deu"
+    try:
+        assert ocr_service._tesseract_tsv(Image.new("L", (10, 10)), 6) == TSV
+    finally:
+        ocr_service.tesseract_api_available, ocr_service.pytesseract, ocr_service.OCR_LANG = saved
+
+    assert calls == [{"lang": "deu", "config": "--psm 6"}], "Same language as the in-process pool"
+
+    print("CLI fallback test passed!")
+
+
+def test_auto_mode_escalates_on_low_confidence():
+    print("Testing confidence-based routing...")
+
+    calls = []
+
+    def fake_engine(engine_id, cost, confidence):
+        def run(image, preprocess=None):
+            calls.append(engine_id)
+            return ocr_service.PageResult(engine_id, confidence, engine_id)
+        return ocr_service.OCREngine(engine_id, engine_id, "", cost, ("image",), lambda: True, run)
+
+    saved = dict(ocr_service.ENGINES)
+    ocr_service.ENGINES.clear()
+    try:
+        ocr_service.register_engine(fake_engine("cheap", 1, 50.0))
+        ocr_service.register_engine(fake_engine("pricey", 5, 95.0))
+        ocr_service.register_engine(fake_engine("medium", 2, 70.0))
+
+        result = ocr_service.ocr_image(Image.new("L", (10, 10)), "auto", min_confidence=80)
+        assert calls == ["cheap", "medium", "pricey"], calls
+        assert result.engine == "pricey"
+
+        calls.clear()
+        result = ocr_service.ocr_image(Image.new("L", (10, 10)), "auto", min_confidence=40)
+        assert calls == ["cheap"], "Confident pages should stop at the cheapest engine"
+
+        calls.clear()
+        ocr_service.ocr_image(Image.new("L", (10, 10)), "medium", min_confidence=99)
+        assert calls == ["medium"], "An explicit engine never escalates"
+    finally:
+        ocr_service.ENGINES.clear()
+        ocr_service.ENGINES.update(saved)
+
+    print("Routing test passed!")
+
+
+def test_scanned_pdf_page_images():
+    print("Testing scanned PDF page images...")
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 600), "white").save(buffer, format="PDF")
+    page = pypdf.PdfReader(io.BytesIO(buffer.getvalue())).pages[0]
+
+    images = ocr_service._pdf_page_images(page)
+    assert len(images) == 1 and images[0].size == (400, 600)
+    assert ocr_service._pdf_text_layer(page).confidence == 0.0, "A scan has no usable text layer"
+
+    print("Scanned PDF test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_api_pool_reuses_handles()
+        test_parse_tsv()
+        test_cli_fallback_uses_ocr_lang()
+        test_auto_mode_escalates_on_low_confidence()
+        test_scanned_pdf_page_images()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
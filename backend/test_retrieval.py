@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.extraction as extraction
+from backend.retrieval import chunk_text, retrieve
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+FILLER = "\n".join(f"Item {i}: widget model W{i} quantity 1 price 9.99" for i in range(200))
+DOCUMENT = (
+    "ACME Supplies Ltd\nInvoice Number: INV-2291\nDate: 12/03/2024\n"
+    + FILLER
+    + "\nBilling Address: 42 Harbour Road, Leith\nGrand Total: 1,998.00 GBP\n"
+)
+
+
+def test_chunking_and_retrieval():
+    print("Testing chunking and BM25 retrieval...")
+
+    chunks = chunk_text(DOCUMENT, max_chars=300)
+    assert all(len(c) <= 300 for c in chunks)
+    assert "Grand Total: 1,998.00 GBP" in chunks[-1]
+
+    passages = retrieve(DOCUMENT, "fix the billing address", max_chars=600)
+    joined = "\n".join(passages)
+    assert "42 Harbour Road" in joined
+    assert len(joined) <= 600
+
+    assert retrieve("short text", "anything", max_chars=600) == ["short text"]
+    fallback = retrieve(DOCUMENT, "zzzz", max_chars=600)
+    assert "ACME Supplies Ltd" in fallback[0], "No match should fall back to the document header"
+
+    print("Retrieval test passed!")
+
+
+class RecordingModel(GenericFakeChatModel):
+    prompts: list = []
+
+    async def _agenerate(self, messages, *args, **kwargs):
+        self.prompts.append("\n".join(m.content for m in messages))
+        return await super()._agenerate(messages, *args, **kwargs)
+
+
+def test_refine_sends_excerpts_and_applies_diff():
+    print("Testing retrieval-scoped refine...")
+
+    diff = {"set": {"billing_address": "42 Harbour Road, Leith"}, "remove": ["notes"], "summary": None}
+    fake = RecordingModel(messages=iter([AIMessage(content=json.dumps(diff))]))
+    fields = {"invoice_number": "INV-2291", "billing_address": "42 Harbor Rd", "notes": "n/a"}
+
+    saved = extraction.get_llm
+    extraction.get_llm = lambda: fake
+    try:
+        result = asyncio.run(extraction.refine_fields(
+            fields, DOCUMENT, "The billing address is misspelled, and drop the notes", summary="Invoice"
+        ))
+    finally:
+        extraction.get_llm = saved
+
+    assert result == {
+        "summary": "Invoice",
+        "fields": {"invoice_number": "INV-2291", "billing_address": "42 Harbour Road, Leith"},
+    }
+    prompt = fake.prompts[0]
+    assert "42 Harbour Road" in prompt
+    assert len(prompt) < len(DOCUMENT) / 2, "Only relevant passages should be sent"
+
+    print("Refine test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_chunking_and_retrieval()
+        test_refine_sends_excerpts_and_applies_diff()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
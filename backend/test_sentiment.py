@@ -0,0 +1,83 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import backend.sentiment as sentiment
+from backend.bench_sentiment import load_fixtures, DEFAULT_FIXTURES
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+def test_local_rules():
+    print("Testing local sentiment rules...")
+
+    assert sentiment.classify("The support team was great").label == "Positive"
+    assert sentiment.classify("The support team was not great").label == "Negative"
+    assert sentiment.classify("Setup was easy, but the app crashes constantly").label == "Negative"
+    assert sentiment.classify("Loved it, works perfectly").label == "Positive"
+    assert (sentiment.classify("It is really good").compound
+            > sentiment.classify("It is good").compound
+            > sentiment.classify("It is slightly good").compound)
+
+    # No sentiment words: neutral, but not confident enough to skip the LLM.
+    plain = sentiment.classify("The meeting moved to Thursday at 3pm")
+    assert plain.label == "Neutral" and plain.confidence < sentiment.MIN_CONFIDENCE
+
+    assert sentiment.normalize_label(" positive.\n") == "Positive"
+    assert sentiment.normalize_label("Negative - the user is upset") == "Negative"
+
+    # Texts answered locally at the default threshold should agree with the labels.
+    handled = [item for item in load_fixtures(DEFAULT_FIXTURES)
+               if sentiment.classify(item["text"]).confidence >= sentiment.MIN_CONFIDENCE]
+    correct = sum(sentiment.classify(item["text"]).label == item["label"] for item in handled)
+    assert len(handled) >= 40 and correct / len(handled) >= 0.95, f"{correct}/{len(handled)}"
+
+    print("Local sentiment rules test passed!")
+
+
+def test_cascade_modes():
+    print("Testing sentiment cascade modes...")
+
+    calls = []
+
+    def fake_llm():
+        calls.append(1)
+        return GenericFakeChatModel(messages=iter([AIMessage(content="Positive.")]))
+
+    saved = sentiment.get_llm
+    sentiment.get_llm = fake_llm
+    try:
+        result = asyncio.run(sentiment.analyze("Absolutely love the new dashboard!"))
+        assert result["source"] == "local" and result["sentiment"] == "Positive" and not calls
+
+        result = asyncio.run(sentiment.analyze("Shipped the package on Monday"))
+        assert result == {"sentiment": "Positive", "source": "llm", "confidence": None}
+        assert len(calls) == 1
+
+        result = asyncio.run(sentiment.analyze("Shipped the package on Monday", mode="local"))
+        assert result["source"] == "local" and result["sentiment"] == "Neutral" and len(calls) == 1
+
+        result = asyncio.run(sentiment.analyze("Absolutely love the new dashboard!", mode="llm"))
+        assert result["source"] == "llm" and len(calls) == 2
+
+        try:
+            asyncio.run(sentiment.analyze("anything", mode="fast"))
+            raise AssertionError("Expected ValueError for an unknown mode")
+        except ValueError:
+            pass
+    finally:
+        sentiment.get_llm = saved
+
+    print("Sentiment cascade modes test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_local_rules()
+        test_cascade_modes()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
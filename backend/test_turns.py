@@ -0,0 +1,99 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.turns import TurnScheduler, TurnQueueFull
+
+
+class FakeAgent:
+    """Records each turn's messages and how many turns overlap, per thread and overall."""
+
+    def __init__(self, fail_on: str = None):
+        self.turns = []
+        self.running = {}
+        self.max_per_thread = 0
+        self.max_overall = 0
+        self.fail_on = fail_on
+
+    async def run_turn(self, thread_id, messages):
+        self.turns.append((thread_id, messages))
+        self.running[thread_id] = self.running.get(thread_id, 0) + 1
+        self.max_per_thread = max(self.max_per_thread, self.running[thread_id])
+        self.max_overall = max(self.max_overall, sum(self.running.values()))
+        try:
+            await asyncio.sleep(0.05)
+            if self.fail_on in messages:
+                raise RuntimeError("agent failed")
+            return {"reply": f"re: {' + '.join(messages)}"}
+        finally:
+            self.running[thread_id] -= 1
+
+
+def test_turns_serialized_and_coalesced():
+    print("Testing per-thread turn scheduling...")
+
+    agent = FakeAgent()
+    scheduler = TurnScheduler(agent.run_turn, max_queued=3)
+
+    async def run():
+        first = asyncio.create_task(scheduler.submit("t1", "a"))
+        other = asyncio.create_task(scheduler.submit("t2", "x"))
+        await asyncio.sleep(0.01)  # "a" is in flight
+        queued = [asyncio.create_task(scheduler.submit("t1", m)) for m in ("b", "c", "d")]
+        await asyncio.sleep(0)
+        try:
+            await scheduler.submit("t1", "e")
+            raise AssertionError("Expected TurnQueueFull past max_queued")
+        except TurnQueueFull:
+            pass
+        results = await asyncio.gather(first, other, *queued)
+        return results
+
+    first, other, *queued = asyncio.run(run())
+
+    assert agent.turns == [("t1", ["a"]), ("t2", ["x"]), ("t1", ["b", "c", "d"])]
+    assert agent.max_per_thread == 1, "One turn at a time per thread"
+    assert agent.max_overall == 2, "Different threads run concurrently"
+    assert first == {"reply": "re: a", "coalesced": 1}
+    assert all(r == {"reply": "re: b + c + d", "coalesced": 3} for r in queued)
+    assert other["coalesced"] == 1
+    assert not scheduler._threads, "Idle threads are dropped"
+
+    print("Turn scheduling test passed!")
+
+
+def test_turn_survives_disconnect_and_errors_reach_waiters():
+    print("Testing turn cancellation and errors...")
+
+    agent = FakeAgent(fail_on="boom")
+    scheduler = TurnScheduler(agent.run_turn)
+
+    async def run():
+        # The only request for a turn goes away: the turn still finishes.
+        gone = asyncio.create_task(scheduler.submit("t1", "a"))
+        await asyncio.sleep(0.01)
+        gone.cancel()
+        after = await scheduler.submit("t1", "b")
+        assert after == {"reply": "re: b", "coalesced": 1}
+
+        failing = [asyncio.create_task(scheduler.submit("t1", m)) for m in ("boom", "z")]
+        return await asyncio.gather(*failing, return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert agent.turns == [("t1", ["a"]), ("t1", ["b"]), ("t1", ["boom", "z"])]
+    assert all(isinstance(e, RuntimeError) for e in errors), "Every waiter sees the turn's error"
+    assert not scheduler._threads
+
+    print("Turn cancellation test passed!")
+
+
+if __name__ == "__main__":
+    try:
+        test_turns_serialized_and_coalesced()
+        test_turn_survives_disconnect_and_errors_reach_waiters()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,102 @@
+"""
+Per-thread turn scheduling for /chat.
+
+Turns for one conversation thread run one at a time, so two quick posts
+can't both read the checkpoint, trim it and invoke the agent on
+half-updated history. Different threads still run concurrently.
+
+Messages that arrive while a thread's turn is in flight are queued into
+a single next turn: they are answered together by one agent call, and
+every request in it gets that reply. At most MAX_QUEUED_MESSAGES can wait
+per thread; past that, submit raises TurnQueueFull. A thread's entry is
+dropped as soon as nothing is running or waiting on it.
+
+State is per worker process, like the in-memory checkpointer it guards.
+"""
+import os
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Messages allowed to wait for a thread's next turn.
+MAX_QUEUED_MESSAGES = int(os.getenv("CHAT_MAX_QUEUED_MESSAGES", "4"))
+
+
+class TurnQueueFull(Exception):
+    """Too many messages are already waiting for this thread's next turn."""
+
+
+@dataclass
+class _Turn:
+    messages: List[str] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class _ThreadTurns:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # The turn still accepting messages (not started yet), if any.
+    waiting: Optional[_Turn] = None
+    # Requests and turn tasks using this entry; it is dropped at 0.
+    users: int = 0
+
+
+class TurnScheduler:
+    """
+    Runs `run_turn(thread_id, messages)` for each turn, one at a time per
+    thread. `messages` holds every message coalesced into the turn.
+    """
+
+    def __init__(
+        self,
+        run_turn: Callable[[str, List[str]], Awaitable[Dict[str, Any]]],
+        max_queued: Optional[int] = None,
+    ):
+        self._run_turn = run_turn
+        self._max_queued = max_queued if max_queued is not None else MAX_QUEUED_MESSAGES
+        self._threads: Dict[str, _ThreadTurns] = {}
+
+    async def submit(self, thread_id: str, message: str) -> Dict[str, Any]:
+        """
+        Queues `message` for the thread's next turn and waits for that turn's
+        result, with "coalesced" set to the number of messages it answered.
+        """
+        turns = self._threads.setdefault(thread_id, _ThreadTurns())
+        turn = turns.waiting
+        if turn is None:
+            turn = turns.waiting = _Turn()
+        elif len(turn.messages) >= self._max_queued:
+            raise TurnQueueFull(f"{len(turn.messages)} messages already waiting on this conversation")
+        turn.messages.append(message)
+        if turn.task is None:
+            # Runs in its own task (with this request's context, so its
+            # deadline) and isn't cancelled if this request goes away:
+            # later requests may be waiting on the same turn.
+            turns.users += 1
+            turn.task = asyncio.create_task(self._run(thread_id, turns, turn))
+            # Its error is raised to the waiters; don't log it as unretrieved if none are left.
+            turn.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        turns.users += 1
+        try:
+            result = await asyncio.shield(turn.task)
+        finally:
+            self._release(thread_id, turns)
+        return {**result, "coalesced": len(turn.messages)}
+
+    async def _run(self, thread_id: str, turns: _ThreadTurns, turn: _Turn) -> Dict[str, Any]:
+        try:
+            async with turns.lock:
+                # Started: anything arriving from now on waits for the next turn.
+                if turns.waiting is turn:
+                    turns.waiting = None
+                return await self._run_turn(thread_id, list(turn.messages))
+        finally:
+            self._release(thread_id, turns)
+
+    def _release(self, thread_id: str, turns: _ThreadTurns) -> None:
+        # A running turn counts as a user too, so the lock is never dropped
+        # while held, even if every request waiting on it has gone away.
+        turns.users -= 1
+        if turns.users == 0 and self._threads.get(thread_id) is turns:
+            del self._threads[thread_id]
@@ -9,6 +9,9 @@ interface ExtractedItem {
     summary: string;
     fields: Record<string, any>;
     raw_text: string;
+    raw_text_truncated?: boolean;
+    session_id?: string;
+    document?: number;
 }
 
 interface DataDisplayProps {
@@ -41,8 +41,9 @@ export const Extractor: React.FC = () => {
                 throw new Error(`Upload failed: ${response.statusText}`);
             }
 
+            // { session_id, results }: full text stays on the server, items carry a preview.
             const result = await response.json();
-            const newData = Array.isArray(result) ? result : [result];
+            const newData = result.results ?? (Array.isArray(result) ? result : [result]);
 
             if (isMerge) {
                 setData(prev => [...prev, ...newData]);
@@ -64,9 +65,16 @@ export const Extractor: React.FC = () => {
             const response = await fetch(`${API_URL}/refine`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
+                body: JSON.stringify(item.session_id ? {
+                    session_id: item.session_id,
+                    document: item.document,
+                    current_data: item.fields,
+                    summary: item.summary,
+                    instructions: instructions
+                } : {
                     current_data: item.fields,
                     raw_text: item.raw_text,
+                    summary: item.summary,
                     instructions: instructions
                 }),
             });
@@ -196,6 +196,7 @@ Type=simple
 User=$ACTUAL_USER
 WorkingDirectory=$ABS_BACKEND_DIR
 Environment="PATH=$ABS_BACKEND_DIR/venv/bin:/usr/local/bin:/usr/bin:/bin"
+ExecStartPre=$ABS_BACKEND_DIR/venv/bin/python init_db.py
 ExecStart=$ABS_BACKEND_DIR/venv/bin/gunicorn main:app \\
     --workers $WORKERS \\
     --worker-class uvicorn.workers.UvicornWorker \\
@@ -282,7 +283,7 @@ server {
     }
 
     # API Routes - proxy to backend
-    location ~ ^/(chat|upload|refine|ocr|extract|improve|signup|token|users|cv|download) {
+    location ~ ^/(chat|upload|refine|ocr|extract|improve|signup|token|users|cv|download|ready|export) {
         proxy_pass http://127.0.0.1:8000;
         proxy_set_header Host \$host;
         proxy_set_header X-Real-IP \$remote_addr;